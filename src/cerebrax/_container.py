@@ -9,6 +9,24 @@ from src.cerebrax.common_depend import (
 class ConfigSnapshot(object):
     lifespan_config: typing.Any = None
     proxy_config: typing.Any = None
+    server_config: typing.Any = None
+    monitor_config: typing.Any = None
+
+
+class ConfigDiff(typing.NamedTuple):
+    changes: typing.Dict[str, typing.Tuple[typing.Any, typing.Any]]  # "Proxy.startup_command" -> (旧值, 新值)
+
+    def changed(self, *paths: str) -> bool:
+        """
+        任一路径（或其上下级字段）发生变化时返回 True，例如 changed("Proxy.pool")
+        """
+        return any(
+            k == p or k.startswith(p + ".") or p.startswith(k + ".") for k in self.changes for p in paths
+        )
+
+    @property
+    def sections(self) -> typing.Set[str]:
+        return {k.split(".", 1)[0] for k in self.changes}
 
 
 @dataclass(frozen=False)
@@ -20,6 +38,30 @@ class Shared(object):
 class Toolkit(object):
     pass
 
+
+@dataclass(frozen=False)
+class SharedInstances(object):
+    proxy_handler: typing.Any = None  # /proxy/start 启动的单个代理
+    proxy_pool: typing.Any = None  # /proxy/pool 创建的代理池
+
+
+@dataclass(frozen=True)
+class ImplementationClasses(object):
+    proxy_handler: typing.Any = None
+    proxy_supervisor: typing.Any = None
+    proxy_pool: typing.Any = None
+
+    @property
+    def CertificateInstaller(self) -> typing.Any:
+        from src.cerebrax.proxy.certificate import CertificateInstaller  # httpx、aiopath 在第一次导出证书时才导入
+        return CertificateInstaller
+
+class ProxyStateChange(typing.NamedTuple):
+    state: str
+    pid: typing.Optional[int]
+    returncode: typing.Optional[int]
+    timestamp: float  # time.monotonic()
+
 class MemorySnapshot(typing.NamedTuple):
     virtual_memory: typing.Any
 
@@ -39,21 +81,61 @@ class CPUSnapshot(typing.NamedTuple):
 
 class NetworkSnapshot(typing.NamedTuple):
     net_io_counters: typing.Any
+    net_io_rates: typing.Any = None  # 每秒增量，首次采样为 None
+    pernic_io_rates: typing.Any = None  # {网卡: 每秒增量}，pernic=True 时才计算
 
 class DiskSnapshot(typing.NamedTuple):
     disk_usages: typing.Any
     disk_partitions: typing.Any
     disk_io_counters: typing.Any
+    disk_io_rates: typing.Any = None  # 每秒增量，首次采样为 None
+    perdisk_io_rates: typing.Any = None  # {磁盘: 每秒增量}，perdisk=True 时才计算
+    quarantined: typing.Any = None  # {挂载点: 剩余隔离时间(s)}，探测超时的挂载点暂时不再探测
+
+class ProcessStat(typing.NamedTuple):
+    kind: str  # "process" 或 "container"
+    pid: int
+    cpu_percent: float  # 相对单个 CPU，包含子进程时求和
+    rss: int
+    num_fds: typing.Optional[int]
+    num_threads: int
+    num_processes: int
+    io_counters: typing.Any  # 无权限或平台不支持时为 None
+
+class ProcessSnapshot(typing.NamedTuple):
+    processes: typing.Any  # {pid 或容器 id: ProcessStat}
+    inaccessible: typing.Any = None  # {pid: 原因}，无权限或已成为僵尸进程而无法采样的 pid
+
+class AlertEvent(typing.NamedTuple):
+    rule: str
+    series: str  # 触发的具体列名（带标签）
+    state: str  # firing / resolved
+    value: float
+    threshold: float
+    timestamp: float  # time.monotonic()
+
+class RecordSchema(typing.NamedTuple):
+    aspect: str
+    version: int  # 列发生变化（如新增挂载点）时递增
+    columns: typing.Tuple[str, ...]  # 与 flatten_snapshot 的列名相同
 
 
 __all__ = [
     "ConfigSnapshot",
+    "ConfigDiff",
     "Shared",
     "Toolkit",
+    "SharedInstances",
+    "ImplementationClasses",
+    "ProxyStateChange",
     "MemorySnapshot",
     "SwapSnapshot",
     "CPUCount",
     "CPUSnapshot",
     "NetworkSnapshot",
     "DiskSnapshot",
+    "ProcessStat",
+    "ProcessSnapshot",
+    "AlertEvent",
+    "RecordSchema",
 ]
@@ -13,6 +13,18 @@ from src.cerebrax._types import (
     DefaultStartupCommand,
     DefaultWaitForExit,
     Patterns,
+    DefaultReadyTimeout,
+    DefaultStopTimeout,
+    BalanceStrategies,
+    DefaultBalanceStrategy,
+    EventLoops,
+    HttpProtocols,
+    DefaultEventLoop,
+    DefaultHttpProtocol,
+    AlertOperators,
+    DefaultAlertMargin,
+    DefaultMonitorInterval,
+    ResourceTypes,
 )
 
 
@@ -21,7 +33,25 @@ class LifespanConfig(BaseModel):
     wait_for_exit: Time = DefaultWaitForExit
 
 
+class RestartPolicy(BaseModel):
+    enabled: bool = False  # 是否由 ProxySupervisor 托管并自动重启
+    max_restarts: int = 5  # 连续失败多少次后放弃，小于 0 表示不限制
+    backoff_initial: Time = 0.05  # 第一次重启前的等待时间
+    backoff_factor: float = 2.0
+    backoff_max: Time = 30
+    reset_after: Time = 10  # 稳定运行超过该时长后连续失败计数清零
+
+
+class ProxyPoolConfig(BaseModel):
+    size: int = 1  # 代理池运行中热更新时的实例数量；实例端口由系统分配
+    strategy: BalanceStrategies = DefaultBalanceStrategy  # 前端负载均衡策略
+
+
 class ProxyConfig(BaseModel):
+    pool: ProxyPoolConfig = ProxyPoolConfig()
+    ready_timeout: Time = DefaultReadyTimeout  # 就绪探测的超时，小于等于 0 时不探测端口
+    stop_timeout: Time = DefaultStopTimeout  # SIGTERM 后等待退出的时间，超时发送 SIGKILL
+    restart_policy: RestartPolicy = RestartPolicy()
     startup_command: typing.Union[str, typing.List[str]] = DefaultStartupCommand
 
     @field_validator("startup_command", mode="before")
@@ -39,6 +69,49 @@ class ProxyConfig(BaseModel):
         return _v
 
 
+class ServerConfig(BaseModel):
+    loop: EventLoops = DefaultEventLoop  # auto: 安装了 uvloop 时使用 uvloop，否则 asyncio
+    http: HttpProtocols = DefaultHttpProtocol  # auto: 安装了 httptools 时使用 httptools，否则 h11
+
+
+class AlertRule(BaseModel):
+    name: str
+    aspect: str  # 例如 cpu、disk
+    metric: str  # 与 /monitor/history 中的列名相同；不带标签时匹配该指标的所有标签组合
+    op: AlertOperators = ">"
+    threshold: float
+    duration: Time = 0  # 条件持续满足多久后才触发
+    margin: float = DefaultAlertMargin  # 接近阈值的相对范围，用于自适应采样
+
+
+class MonitorConfig(BaseModel):
+    enabled: bool = True  # 是否在 lifespan 中启动资源监控
+    interval: Time = DefaultMonitorInterval
+    aspects: typing.List[str] = []  # 为空时采集全部资源类型
+    multiples: typing.Dict[str, int] = {}  # 各 aspect 的采样间隔 = interval * 倍数
+    history: bool = True  # 是否把采样写入磁盘历史日志
+    pernic: bool = False  # 是否采集每块网卡的速率
+    perdisk: bool = False  # 是否采集每块磁盘的速率
+    alerts: typing.List[AlertRule] = []
+
+    @field_validator("aspects")
+    @classmethod
+    def known_aspects(cls, v: typing.List[str]) -> typing.List[str]:
+        unknown = set(v) - ResourceTypes
+        if unknown:
+            raise ValueError(f"{sorted(unknown)} are not valid resource types")
+        return v
+
+
+class ProxyStart(BaseModel):
+    wait_ready: bool = False  # 是否等待代理端口可连接后再返回
+    timeout: Time = DefaultReadyTimeout
+
+
+class ProxyPoolScale(BaseModel):
+    size: int
+
+
 class ShutdownConfirm(BaseModel):
     shutdown: bool = True
     wait_for_exit: Time = DefaultWaitForExit
@@ -1,4 +1,5 @@
 from src.cerebrax.common_depend import (
+    os,
     typing,
 )
 from src.cerebrax.utils import collector
@@ -7,16 +8,30 @@ from src.cerebrax.utils import collector
 Time = typing.Union[int, float]
 DefaultLifeCycle: Time = 0
 DefaultWaitForExit: Time = 0
+DefaultDebounce: Time = 0.1  # 配置文件事件的合并窗口(s)，编辑器一次保存通常触发多个事件
 
 DefaultStartupCommand: typing.List[str] = ["mitmdump"]
 Patterns: typing.Set[str] = {"mitmdump", "mitmproxy", "mitmweb"}
+DefaultProxyHost: str = "127.0.0.1"
+DefaultProxyPort: int = 8080
+DefaultReadyTimeout: Time = 10
+DefaultStopTimeout: Time = 5
+BalanceStrategies = typing.Literal["least-connections", "hash-by-client"]
+DefaultBalanceStrategy: BalanceStrategies = "least-connections"
+ProxyStates = typing.Literal["idle", "starting", "running", "stopping", "exited", "restarting"]
+ProxyActiveStates: typing.Set[str] = {"starting", "running", "stopping", "restarting"}
+
+EventLoops = typing.Literal["auto", "uvloop", "asyncio"]
+HttpProtocols = typing.Literal["auto", "httptools", "h11"]
+DefaultEventLoop: EventLoops = "auto"
+DefaultHttpProtocol: HttpProtocols = "auto"
 
 DockerImageList = typing.Union[typing.List, typing.Dict]
 DefaultContainerQuery: str = "CerebraX-OCR"
 ContainerRunArgs = typing.Optional[typing.Dict[str, typing.Any]]
 
 
-ResourceTypes: typing.Set[str] = {"network", "memory", "swap", "cpu", "disk"}
+ResourceTypes: typing.Set[str] = {"network", "memory", "swap", "cpu", "disk", "process"}
 CPU_COUNT = collector.cpu_count
 CollectionMethods: typing.Dict[str, typing.Callable] = {
     "network": collector.get_network_snapshot,
@@ -24,8 +39,14 @@ CollectionMethods: typing.Dict[str, typing.Callable] = {
     "swap": collector.get_swap_snapshot,
     "cpu": collector.get_cpu_snapshot,
     "disk": collector.get_disk_snapshot,
+    "process": collector.get_process_snapshot,
 }
 Interval = typing.Optional[float]
+DefaultMonitorInterval: float = 1  # 资源采样的基础间隔(s)
+AlertOperators = typing.Literal[">", ">=", "<", "<="]
+AlertStates = typing.Literal["firing", "resolved"]
+DefaultAlertMargin: float = 0.1  # 数值距离阈值在 10% 以内视为接近阈值
+DefaultIdleSlowdown: int = 4  # 空闲时采样间隔最多放慢到配置倍数的 4 倍
 
 CommonIterable = typing.Union[
     typing.List,
@@ -35,3 +56,14 @@ CommonIterable = typing.Union[
 
 Platforms = typing.Literal["windows", "linux", "ios", "android", "firefox", "other-platform", "macos"]
 OtherPlatformFormat = typing.Literal["pem", "p12"]
+CertificateSources = typing.Literal["proxy", "confdir"]
+DefaultProxyConfdir: str = os.path.join(os.path.expanduser("~"), ".mitmproxy")
+CertificateFormats: typing.Tuple[str, ...] = ("pem", "p12", "cer")
+DefaultCertificateCacheDir: str = os.path.join(os.path.expanduser("~"), ".cache", "cerebrax", "certificates")
+DefaultHistoryDir: str = os.path.join(os.path.expanduser("~"), ".cache", "cerebrax", "history")
+# 历史日志的三个分辨率(s)：原始采样 -> 1 分钟均值 -> 1 小时均值
+HistoryResolutions: typing.Tuple[int, ...] = (1, 60, 3600)
+# 每个分辨率单个段文件覆盖的时长(s)
+DefaultSegmentSeconds: typing.Dict[int, int] = {1: 3600, 60: 86400, 3600: 86400 * 30}
+# 每个分辨率保留的时长(s)，None 表示永久保留
+DefaultHistoryRetention: typing.Dict[int, typing.Optional[int]] = {1: 86400 * 2, 60: 86400 * 30, 3600: None}
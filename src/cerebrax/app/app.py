@@ -2,14 +2,29 @@
 注册各个路由器
 """
 from lifespan import lifespan
-from routers import (shutdown, proxy)
+from routers import (shutdown, proxy, monitor)
 from src.cerebrax.common_depend import (
-    FastAPI, Request,
+    time,
+    FastAPI, Request, Response,
+    import_report,
 )
+from src.cerebrax import internal
 from src.cerebrax._container import (
     Shared,
     Toolkit,
+    SharedInstances,
+    ImplementationClasses,
 )
+from src.cerebrax.proxy.handler import ProxyHandler
+from src.cerebrax.proxy.supervisor import ProxySupervisor
+from src.cerebrax.proxy.pool import ProxyPool
+from src.cerebrax.monitor.metrics import (
+    MetricsCollector,
+    ContentType,
+)
+from src.cerebrax.monitor.series import TimeSeriesStore
+from src.cerebrax.monitor.stream import SnapshotStream
+from src.cerebrax.monitor.history import HistoryLog
 
 app = FastAPI(
     title='CerebraX',
@@ -20,15 +35,61 @@ app = FastAPI(
 """
 app.state.shared = Shared()
 app.state.toolkit = Toolkit()
+app.state.shared_instances = SharedInstances()
+app.state.implementation_classes = ImplementationClasses(
+    proxy_handler=ProxyHandler,
+    proxy_supervisor=ProxySupervisor,  # Proxy.restart_policy.enabled 时使用
+    proxy_pool=ProxyPool,
+)
+app.state.workers = 1  # Myfsp 注入实际的 worker 数量
+app.state.worker = None  # 多进程模式下本进程的 worker 序号
+app.state.metrics = MetricsCollector()  # ResourceChangesMonitor(metrics=...) 采样时写入
+app.state.series = TimeSeriesStore()  # ResourceChangesMonitor(series=...) 采样时写入
+app.state.stream = SnapshotStream()  # ResourceChangesMonitor(stream=...) 采样时推送给 /monitor/stream
+app.state.history = HistoryLog()  # ResourceChangesMonitor(history=...) 采样时写入磁盘，第一次写入时才创建目录
 
 app.include_router(shutdown.shutdown_router)
 # app.include_router(database.memory_database_router)
 app.include_router(proxy.proxy_router)
+app.include_router(monitor.monitor_router)
+
+@app.middleware('http')
+async def observe_latency(request: Request, call_next):
+    start = time.perf_counter()
+    try:
+        return await call_next(request)
+    finally:
+        route = request.scope.get('route')
+        tags = getattr(route, 'tags', None)
+        router = tags[0] if tags else ('root' if route else 'unmatched')
+        request.app.state.metrics.observe_request(router, time.perf_counter() - start)
 
 @app.get('/metrics')
-async def metrics():
-    return {'message': 'success'}
+async def metrics(request: Request):
+    shared_instances = getattr(request.app.state, 'shared_instances', None)
+    proxy_handler = getattr(shared_instances, 'proxy_handler', None)
+    return Response(
+        content=request.app.state.metrics.render(proxy_handler=proxy_handler),
+        media_type=ContentType,
+    )
+
+@app.get('/imports')
+async def imports():
+    """
+    按需导入的第三方模块及其首次导入耗时(ms)
+    """
+    return import_report()
+
+@app.get('/resources')
+async def resources():
+    """
+    内部全局对象是否已经被创建
+    """
+    return internal.registry.report()
 
 @app.get('/')
-async def root():
-    return {'message': "Welcome to CerebraX!"}
+async def root(request: Request):
+    return {
+        'message': "Welcome to CerebraX!",
+        'backend': getattr(request.app.state, 'backend', None),  # 实际使用的事件循环与 HTTP 解析器
+    }
@@ -1,32 +1,83 @@
-from server import ServerHandler
+from server import ServerHandler, SubServer, select_backends
 from app import app
 import register
-import asyncio, typing
+import pathlib, typing
 from uvicorn import Server
+from src.cerebrax._models import ServerConfig
+from src.cerebrax.settings.config import Config
 
 DEFAULT_ARGS = {
     'app': app,
     'host': '127.0.0.1',
     'port': 8000,
 }
+DefaultConfigPath = str(pathlib.Path(__file__).resolve().parents[1] / "settings" / "settings.toml")
 
 class Myfsp(object):
-    def __init__(self, args: typing.Dict[str, typing.Any] = None) -> None:
-        self._args = args if isinstance(args, typing.Dict) else DEFAULT_ARGS
-        self._server = ServerHandler(
+    def __init__(self,
+                 args: typing.Dict[str, typing.Any] = None,
+                 workers: int = 1,  # 大于 1 时启用多进程模式：/proxy/* 返回 409，配置监控、倒计时、历史日志只在 0 号 worker
+                 reuse_port: bool = False,  # 多进程模式下每个 worker 使用 SO_REUSEPORT 各自绑定
+                 server_config: typing.Optional[ServerConfig] = None,  # 事件循环与 HTTP 解析器
+                 config_path: typing.Optional[str] = DefaultConfigPath,  # lifespan 监控该文件并热更新
+                 ) -> None:
+        _args = args if isinstance(args, typing.Dict) else DEFAULT_ARGS
+        _server_config = server_config if server_config else ServerConfig()
+        loop, http = select_backends(
+            loop=_server_config.loop,
+            http=_server_config.http,
+        )
+        self._args = {'loop': loop, 'http': http, **_args}  # 显式传入的 args 优先
+        self._backend = {'loop': self._args['loop'], 'http': self._args['http']}
+        self._workers = workers
+        self._config_path = config_path
+        self._handler = ServerHandler(
             args=self._args,
-        ).build_server()
-        register.server = self._server  # injection
+        )
+        self._server: typing.Optional[SubServer] = None
+        if workers <= 1:  # 多进程模式下每个 worker 在 fork 之后创建自己的 server
+            self._server = self._handler.build_server()
+            self._inject(self._server)
+        self._reuse_port = reuse_port
+
+    def _inject(self, server: SubServer, worker: typing.Optional[int] = None) -> None:
+        register.server = server  # injection
         register.server_args = self._args
+        app.state.server = server
+        app.state.backend = self._backend
+        app.state.config_path = self._config_path
+        app.state.workers = self._workers
+        app.state.worker = worker  # 单进程模式为 None
+        return None
 
     @property
-    def server(self) -> Server:
+    def server(self) -> typing.Optional[Server]:
+        """
+        单进程模式下的 server，多进程模式为 None
+        """
         return self._server
 
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    @property
+    def backend(self) -> typing.Dict[str, str]:
+        return self._backend
+
     def run(self) -> None:
-        asyncio.run(self.server.serve())
+        if self._workers > 1:
+            supervisor = self._handler.build_workers(
+                workers=self._workers,
+                initializer=self._inject,  # 每个 worker 注入自己的 server
+                reuse_port=self._reuse_port,
+            )
+            supervisor.run()
+        else:
+            self.server.run()  # 由 uvicorn 按 config.loop 创建事件循环
         return None
 
-atc = Myfsp()
+atc = Myfsp(
+    server_config=Config(DefaultConfigPath).get().server_config,
+)
 atc.run()
-
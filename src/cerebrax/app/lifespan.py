@@ -11,7 +11,15 @@ from src.cerebrax.common_depend import (
     asynccontextmanager,
     FastAPI,
 )
-import register, tools
+from src.cerebrax import internal
+from src.cerebrax.proxy.handler import stop_all
+from src.cerebrax._container import ConfigSnapshot
+from src.cerebrax._models import LifespanConfig, MonitorConfig, ProxyConfig
+from src.cerebrax.settings.config import Config
+from src.cerebrax.monitor.cfg import ConfigFileEventMonitor
+from routers.util import primary_worker
+import register, tools, reconfigure
+import os
 
 
 DefaultCfgDir = "/home/ckr-ubuntu/桌面/MyProject/CerebraX/src/cerebrax/utils"
@@ -21,23 +29,65 @@ PyPath = DefaultCfgDir + "settings.py"
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> typing.AsyncGenerator:
-    shutdown_task = asyncio.create_task(  # 创建定时关闭服务任务
+    config_path = getattr(app.state, "config_path", None)
+    config_monitor = None
+    primary = primary_worker(app)  # 多进程模式下只有 0 号 worker 监控配置、倒计时关机
+    if config_path and primary:  # 监控配置文件，保存后只重新配置受影响的子系统
+        app.state.config_dispatcher = reconfigure.build_dispatcher(app)
+        config_monitor = ConfigFileEventMonitor(
+            path=os.path.dirname(config_path),
+            name=os.path.basename(config_path),
+            reload=app.state.config_dispatcher,
+            shared_instances=getattr(app.state, "shared_instances", None),
+            config=Config(config_path),
+        )
+        snapshot = config_monitor.reloader.prime()
+        app.state.config_dispatcher.snapshot = snapshot
+    elif config_path:
+        snapshot = Config(config_path).get()
+    else:
+        snapshot = ConfigSnapshot(
+            lifespan_config=LifespanConfig(),
+            proxy_config=ProxyConfig(),
+            monitor_config=MonitorConfig(),
+        )
+    app.state.config_snapshot = snapshot  # 没有 ConfigDispatcher 时路由读取的配置
+    app.state.started_at = asyncio.get_running_loop().time()  # 热更新后按已运行时长重新计时
+    app.state.shutdown_task = asyncio.create_task(  # 创建定时关闭服务任务，到期后通过共享事件停止所有 worker
         tools.countdown(
             server=register.server,  # server 对象
-            life_cycle=cfg_parser.lifespan_cfg.life_cycle,  # 服务的生命周期
-            wait_for_exit=cfg_parser.lifespan_cfg.wait_for_exit,  # 等待退出的时间
+            life_cycle=snapshot.lifespan_config.life_cycle if primary else 0,  # 服务的生命周期
+            wait_for_exit=snapshot.lifespan_config.wait_for_exit,  # 等待退出的时间
         )
     )
+    app.state.resource_monitor = reconfigure.build_resource_monitor(app, snapshot)  # 采样写入 /metrics、/monitor/*，只在 0 号 worker
+    if app.state.resource_monitor is not None:
+        await app.state.resource_monitor.start()
+    if config_monitor is not None:
+        config_monitor.start()
     # -------------------------------------------------------------
     yield
     # -------------------------------------------------------------
+    if config_monitor is not None:
+        await config_monitor.stop()
     try:
         await asyncio.wait_for(
-            fut=shutdown_task,  # 等待关机任务
+            fut=app.state.shutdown_task,  # 等待关机任务（热更新时可能已被替换）
             timeout=0  # 立马返回
         )
     except asyncio.TimeoutError:
         pass  # 未到达设置时长手动退出
+    finally:
+        shared_instances = getattr(app.state, "shared_instances", None)
+        await stop_all([  # 停止所有代理子进程并回收
+            getattr(shared_instances, "proxy_handler", None),
+            getattr(shared_instances, "proxy_pool", None),
+        ])
+        resource_monitor = getattr(app.state, "resource_monitor", None)
+        if resource_monitor is not None:
+            await resource_monitor.stop()
+        await asyncio.to_thread(app.state.history.close)  # 写出未完成的汇总桶并关闭历史段文件
+        await internal.registry.aclose()  # 关闭已经创建的内部客户端与池
 
 
 
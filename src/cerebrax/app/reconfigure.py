@@ -0,0 +1,134 @@
+"""
+配置热更新时只重新配置受影响的子系统：
+    Proxy.startup_command      -> 重启正在运行的代理 / 重建代理池
+    Proxy.pool                 -> 调整代理池实例数量（策略变化时重建）
+    Lifespan.life_cycle 等     -> 按已经运行的时长重新设置关机计时
+    Monitor                    -> 按新配置重建资源监控
+其他配置项只更新快照，下次创建对象时生效，不会打断正在转发的流量。
+"""
+from src.cerebrax.common_depend import (
+    typing, asyncio,
+    FastAPI,
+)
+from src.cerebrax._container import ConfigDiff, ConfigSnapshot
+from src.cerebrax._types import ProxyActiveStates
+from src.cerebrax.monitor.cfg import ConfigDispatcher
+from src.cerebrax.monitor.resmon import ResourceChangesMonitor
+from src.cerebrax.monitor.alerts import AlertEngine
+from routers.proxy import build_proxy_handler, build_proxy_pool
+from routers.util import primary_worker
+import register, tools
+
+
+def restart_proxy(app: FastAPI) -> typing.Callable[[ConfigDiff, ConfigSnapshot], typing.Awaitable[None]]:
+    async def reconfigure(diff: ConfigDiff, snapshot: ConfigSnapshot) -> None:
+        shared_instances = getattr(app.state, "shared_instances", None)
+        proxy_handler = getattr(shared_instances, "proxy_handler", None)
+        if not (proxy_handler and proxy_handler.state in ProxyActiveStates):
+            return None  # 没有运行中的代理，下次启动时使用新配置
+        await proxy_handler.stop()
+        proxy_handler = build_proxy_handler(
+            implementation_classes=app.state.implementation_classes,
+            proxy_cfg=snapshot.proxy_config,
+        )
+        shared_instances.proxy_handler = proxy_handler
+        await proxy_handler.start()
+        return None
+    return reconfigure
+
+
+def rescale_proxy_pool(app: FastAPI) -> typing.Callable[[ConfigDiff, ConfigSnapshot], typing.Awaitable[None]]:
+    async def reconfigure(diff: ConfigDiff, snapshot: ConfigSnapshot) -> None:
+        shared_instances = getattr(app.state, "shared_instances", None)
+        proxy_pool = getattr(shared_instances, "proxy_pool", None)
+        if not proxy_pool:
+            return None
+        size = snapshot.proxy_config.pool.size
+        if diff.changed("Proxy.startup_command", "Proxy.pool.strategy"):  # 只改数量时不重建
+            await proxy_pool.scale(0)
+            proxy_pool = build_proxy_pool(
+                implementation_classes=app.state.implementation_classes,
+                proxy_cfg=snapshot.proxy_config,
+            )
+            shared_instances.proxy_pool = proxy_pool
+        await proxy_pool.scale(size)
+        if size <= 0:
+            shared_instances.proxy_pool = None
+        return None
+    return reconfigure
+
+
+def rearm_countdown(app: FastAPI) -> typing.Callable[[ConfigDiff, ConfigSnapshot], typing.Awaitable[None]]:
+    async def reconfigure(diff: ConfigDiff, snapshot: ConfigSnapshot) -> None:
+        shutdown_task = getattr(app.state, "shutdown_task", None)
+        if shutdown_task is not None:
+            shutdown_task.cancel()
+        lifespan_cfg = snapshot.lifespan_config
+        elapsed = asyncio.get_running_loop().time() - app.state.started_at
+        remaining = lifespan_cfg.life_cycle - elapsed
+        if lifespan_cfg.life_cycle > 0 and remaining <= 0:  # 新的生命周期已经到期
+            coroutine = tools.async_set_exit(wait_for_exit=lifespan_cfg.wait_for_exit, server=register.server)
+        else:
+            coroutine = tools.countdown(
+                server=register.server,
+                life_cycle=remaining if lifespan_cfg.life_cycle > 0 else 0,
+                wait_for_exit=lifespan_cfg.wait_for_exit,
+            )
+        app.state.shutdown_task = asyncio.create_task(coroutine)
+        return None
+    return reconfigure
+
+
+async def _discard(async_generators: typing.Dict[str, typing.Any]) -> None:
+    return None  # 指标、历史、推送都在采样时写入，不需要额外的消费者
+
+
+def build_resource_monitor(app: FastAPI, snapshot: ConfigSnapshot) -> typing.Optional[ResourceChangesMonitor]:
+    """
+    按 [Monitor] 配置创建资源监控，采样结果写入 app.state 上的 metrics / series / stream / history；
+    多进程模式下与配置监控一样只在 0 号 worker 中运行，避免每个 worker 各自采样同一台机器
+    """
+    monitor_cfg = snapshot.monitor_config
+    if monitor_cfg is None or not monitor_cfg.enabled or not primary_worker(app):
+        return None
+    return ResourceChangesMonitor(
+        call=_discard,
+        aspect=monitor_cfg.aspects or None,
+        interval=monitor_cfg.interval,
+        metrics=app.state.metrics,
+        series=app.state.series,
+        multiples=monitor_cfg.multiples,
+        alerts=AlertEngine(monitor_cfg.alerts) if monitor_cfg.alerts else None,
+        stream=app.state.stream,
+        history=app.state.history if monitor_cfg.history else None,
+        pernic=monitor_cfg.pernic,
+        perdisk=monitor_cfg.perdisk,
+    )
+
+
+def restart_monitor(app: FastAPI) -> typing.Callable[[ConfigDiff, ConfigSnapshot], typing.Awaitable[None]]:
+    async def reconfigure(diff: ConfigDiff, snapshot: ConfigSnapshot) -> None:
+        resource_monitor = getattr(app.state, "resource_monitor", None)
+        if resource_monitor is not None:
+            await resource_monitor.stop()
+        resource_monitor = build_resource_monitor(app, snapshot)
+        app.state.resource_monitor = resource_monitor
+        if resource_monitor is not None:
+            await resource_monitor.start()
+        return None
+    return reconfigure
+
+
+def build_dispatcher(app: FastAPI, snapshot: typing.Optional[ConfigSnapshot] = None) -> ConfigDispatcher:
+    dispatcher = ConfigDispatcher(snapshot=snapshot)
+    dispatcher.register("proxy", ("Proxy.startup_command",), restart_proxy(app))
+    dispatcher.register("proxy_pool", ("Proxy.startup_command", "Proxy.pool"), rescale_proxy_pool(app))
+    dispatcher.register("lifespan", ("Lifespan.life_cycle", "Lifespan.wait_for_exit"), rearm_countdown(app))
+    dispatcher.register("monitor", ("Monitor",), restart_monitor(app))
+    return dispatcher
+
+
+__all__ = [
+    "build_dispatcher",
+    "build_resource_monitor",
+]
@@ -0,0 +1,116 @@
+"""
+资源监控对外暴露的接口
+"""
+from fastapi import APIRouter, Request, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse, Response
+from pydantic import Field
+from src.cerebrax.monitor.stream import DefaultBufferSize
+from src.cerebrax.monitor.records import RecordBatch
+from src.cerebrax._container import RecordSchema
+import asyncio
+import typing
+
+Percentile = typing.Annotated[float, Field(ge=0, le=100)]  # Query 的 ge/le 不能作用于列表中的每一项
+
+monitor_router = APIRouter(
+    prefix="/monitor",
+    tags=["monitor"],
+)
+
+@monitor_router.get("/history/{aspect}")
+async def history(request: Request,
+                  aspect: str,
+                  seconds: typing.Optional[float] = None,  # 只统计最近 seconds 秒，默认全部
+                  percentiles: typing.List[Percentile] = Query(default=[50, 90, 99]),  # 超出 [0, 100] 返回 422
+                  ):
+    series = request.app.state.series
+    stats = series.stats(aspect=aspect, seconds=seconds, percentiles=percentiles)
+    if stats is None:
+        return {}
+    return stats
+
+@monitor_router.get("/replay/{aspect}")
+async def replay(request: Request,
+                 aspect: str,
+                 start: typing.Optional[float] = None,  # Unix 时间戳，默认最早
+                 end: typing.Optional[float] = None,  # Unix 时间戳，默认最新
+                 columns: typing.Optional[typing.List[str]] = Query(default=None),  # 默认全部列
+                 resolution: typing.Optional[float] = None,  # 1（原始采样）/ 60 / 3600，默认取覆盖 start 的最细分辨率
+                 ):
+    """
+    从磁盘历史日志中读取一段时间的采样，重启之后依然可以查询；
+    返回与 /monitor/stream 相同的列式 JSON，另带 resolution
+    """
+    result = await asyncio.to_thread(
+        request.app.state.history.query,
+        aspect=aspect, start=start, end=end, columns=columns, resolution=resolution,
+    )
+    batch = RecordBatch.from_columns(
+        RecordSchema(result["aspect"], result["version"], tuple(result["values"])),
+        result["timestamp"],
+        result["values"],
+    )
+    return Response(content=batch.to_json(resolution=result["resolution"]), media_type="application/json")
+
+@monitor_router.get("/sampler")
+async def sampler(request: Request):
+    """
+    采样器自身的开销：每轮与每个 aspect 的采集耗时、跳过的 tick 数
+    """
+    resource_monitor = getattr(request.app.state, "resource_monitor", None)
+    if resource_monitor is None:
+        return {}
+    return resource_monitor.stats()
+
+@monitor_router.get("/alerts")
+async def alerts(request: Request):
+    """
+    当前处于触发状态的告警
+    """
+    resource_monitor = getattr(request.app.state, "resource_monitor", None)
+    if resource_monitor is None or resource_monitor.alerts is None:
+        return []
+    return [event._asdict() for event in resource_monitor.alerts.active()]
+
+@monitor_router.get("/stream")
+async def stream(request: Request,
+                 aspects: typing.Optional[typing.List[str]] = Query(default=None),  # 默认订阅全部 aspect
+                 every: int = 1,  # 降采样：每 every 个快照推送一个
+                 buffer: int = DefaultBufferSize,  # 客户端跟不上时最多缓存的帧数，超出丢弃最旧的
+                 ):
+    """
+    以 SSE 推送实时快照
+    """
+    frames = request.app.state.stream.frames(aspects=aspects, every=every, maxsize=buffer)
+
+    async def events():
+        try:
+            async for frame in frames:
+                yield frame.sse
+        finally:
+            await frames.aclose()
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@monitor_router.websocket("/ws")
+async def stream_ws(websocket: WebSocket,
+                    aspects: typing.Optional[typing.List[str]] = Query(default=None),
+                    every: int = 1,
+                    buffer: int = DefaultBufferSize,
+                    ):
+    """
+    以 WebSocket 推送实时快照，每条消息是一个 JSON 帧
+    """
+    await websocket.accept()
+    frames = websocket.app.state.stream.frames(aspects=aspects, every=every, maxsize=buffer)
+    try:
+        async for frame in frames:
+            await websocket.send_text(frame.text)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await frames.aclose()
+
+__all__ = [
+    "monitor_router",
+]
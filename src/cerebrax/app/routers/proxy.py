@@ -1,31 +1,89 @@
 """
 Proxy功能对外暴露的接口
 """
-from fastapi import APIRouter, Request
+from fastapi import APIRouter, Request, Response, Depends, HTTPException
 from pydantic import BaseModel
 from src.cerebrax.app.routers import util
+from src.cerebrax._types import ProxyActiveStates, CertificateSources
+from src.cerebrax.proxy.handler import proxy_confdir, listen_address
+from src.cerebrax._models import ProxyPoolScale, ProxyStart
 import typing
 
 proxy_router = APIRouter(
     prefix="/proxy",
     tags=["proxy"],
+    dependencies=[Depends(util.single_process)],  # workers > 1 时返回 409
 )
 
+def build_proxy_handler(implementation_classes: typing.Any,
+                        proxy_cfg: typing.Any,
+                        startup_command: typing.Optional[typing.List[str]] = None,
+                        ready_timeout: typing.Optional[float] = None,
+                        ) -> typing.Any:
+    """
+    按配置创建代理实例，启用 restart_policy 时由 ProxySupervisor 托管
+    """
+    _startup_command = startup_command if startup_command else proxy_cfg.startup_command
+    _ready_timeout = proxy_cfg.ready_timeout if ready_timeout is None else ready_timeout
+    if proxy_cfg.restart_policy.enabled:
+        return implementation_classes.proxy_supervisor(
+            startup_command=_startup_command,
+            restart_policy=proxy_cfg.restart_policy,
+            ready_timeout=_ready_timeout,
+            stop_timeout=proxy_cfg.stop_timeout,
+        )
+    return implementation_classes.proxy_handler(
+        startup_command=_startup_command,
+        ready_timeout=_ready_timeout,
+        stop_timeout=proxy_cfg.stop_timeout,
+    )
+
+def build_proxy_pool(implementation_classes: typing.Any, proxy_cfg: typing.Any) -> typing.Any:
+    return implementation_classes.proxy_pool(
+        startup_command=proxy_cfg.startup_command,
+        factory=lambda command: build_proxy_handler(
+            implementation_classes=implementation_classes,
+            proxy_cfg=proxy_cfg,
+            startup_command=command,
+        ),
+        strategy=proxy_cfg.pool.strategy,
+    )
+
+def new_proxy_handler(request: Request, ready_timeout: typing.Optional[float] = None) -> typing.Any:
+    proxy_cfg = util.get_proxy_config(request=request)
+    if ready_timeout is not None and proxy_cfg.ready_timeout > 0:
+        ready_timeout = None  # 配置中已经开启探测，沿用配置
+    return build_proxy_handler(
+        implementation_classes=util.get_implementation_classes(request=request),
+        proxy_cfg=proxy_cfg,
+        ready_timeout=ready_timeout,
+    )
+
 @proxy_router.post("/start")
-async def start_proxy(request: Request):
-    implementation_classes = util.get_implementation_classes(request=request)
+async def start_proxy(request: Request, item: typing.Optional[ProxyStart] = None):
+    """
+    启动代理；wait_ready 为 True 时等待端口可连接后返回就绪状态与启动耗时
+    """
     shared_instances = util.get_shared_instances(request=request)
+    if getattr(shared_instances, "proxy_pool", None):  # 代理池的前端占用监听端口
+        raise HTTPException(status_code=409, detail="A proxy pool is running on the listen port; scale it to 0 first.")
     proxy_handler = shared_instances.proxy_handler
-    if proxy_handler:
-        if proxy_handler.running:
-            return None
-    cfg_parser = shared_instances.cfg_parser
-    proxy_handler = implementation_classes.proxy_handler(
-        startup_command=cfg_parser.proxy_cfg.startup_command
-    )
-    request.app.state.shared_instances.proxy_handler = proxy_handler
-    proxy_handler.start()
-    return None
+    wait_ready = item is not None and item.wait_ready
+    if not (proxy_handler and proxy_handler.state in ProxyActiveStates):
+        proxy_handler = new_proxy_handler(
+            request=request,
+            ready_timeout=item.timeout if wait_ready else None,
+        )
+        request.app.state.shared_instances.proxy_handler = proxy_handler
+        await proxy_handler.start()
+    if not wait_ready:
+        return None
+    ready = await proxy_handler.wait_ready(timeout=item.timeout)
+    return {
+        "ready": ready,
+        "state": proxy_handler.state,
+        "latency": proxy_handler.ready_latency,
+    }
 
 @proxy_router.post("/stop")
 async def stop_proxy(request: Request):
@@ -33,25 +91,23 @@ async def stop_proxy(request: Request):
     if not shared_instances.proxy_handler:
         return None
     proxy_handler = shared_instances.proxy_handler
-    if proxy_handler.running:
+    if proxy_handler.state in ProxyActiveStates:
         await proxy_handler.stop()
     request.app.state.shared_instances.proxy_handler = None
     return None
 
 @proxy_router.post("/restart")
 async def restart_proxy(request: Request):
-    implementation_classes = util.get_implementation_classes(request=request)
     shared_instances = util.get_shared_instances(request=request)
+    if getattr(shared_instances, "proxy_pool", None):
+        raise HTTPException(status_code=409, detail="A proxy pool is running on the listen port; scale it to 0 first.")
     proxy_handler = shared_instances.proxy_handler
     if proxy_handler:
-        if proxy_handler.running:
-            proxy_handler.stop()
-    cfg_parser = shared_instances.cfg_parser
-    new_proxy_handler = implementation_classes.proxy_handler(
-        startup_command=cfg_parser.proxy_cfg.startup_command
-    )
-    request.app.state.shared_instances.proxy_handler = new_proxy_handler
-    new_proxy_handler.start()
+        if proxy_handler.state in ProxyActiveStates:
+            await proxy_handler.stop()
+    _proxy_handler = new_proxy_handler(request=request)
+    request.app.state.shared_instances.proxy_handler = _proxy_handler
+    await _proxy_handler.start()
     return None
 
 @proxy_router.get("/running")
@@ -63,23 +119,99 @@ async def running_proxy(request: Request):
     else:
         return proxy_handler.running
 
+@proxy_router.get("/supervisor")
+async def supervisor_proxy(request: Request):
+    shared_instance = util.get_shared_instances(request=request)
+    proxy_handler = shared_instance.proxy_handler
+    if not proxy_handler or not hasattr(proxy_handler, "stats"):
+        return None
+    return proxy_handler.stats()
+
+@proxy_router.get("/pool")
+async def pool_proxy(request: Request):
+    shared_instance = util.get_shared_instances(request=request)
+    proxy_pool = getattr(shared_instance, "proxy_pool", None)
+    if not proxy_pool:
+        return None
+    return proxy_pool.stats()
+
+@proxy_router.post("/pool")
+async def scale_pool_proxy(request: Request, item: ProxyPoolScale):
+    """
+    调整代理池的实例数量，size 为 0 时停止整个代理池。
+    代理池的前端占用监听端口，与 /proxy/start 启动的单实例互斥。
+    """
+    implementation_classes = util.get_implementation_classes(request=request)
+    shared_instances = util.get_shared_instances(request=request)
+    proxy_handler = shared_instances.proxy_handler
+    if proxy_handler and proxy_handler.state in ProxyActiveStates:
+        raise HTTPException(status_code=409, detail="A single proxy is running on the listen port; stop it first.")
+    proxy_pool = getattr(shared_instances, "proxy_pool", None)
+    if not proxy_pool:
+        if item.size <= 0:
+            return None
+        proxy_pool = build_proxy_pool(
+            implementation_classes=implementation_classes,
+            proxy_cfg=util.get_proxy_config(request=request),
+        )
+        request.app.state.shared_instances.proxy_pool = proxy_pool
+    await proxy_pool.scale(item.size)
+    if item.size <= 0:
+        request.app.state.shared_instances.proxy_pool = None
+    return proxy_pool.stats()
+
 Platforms = typing.Literal["windows", "linux", "ios", "android", "firefox", "other-platform", "macos"]
 OtherPlatformFormat = typing.Literal["pem", "p12"]
+CertificateMediaTypes = {"p12": "application/x-pkcs12"}  # pem / cer 使用 application/x-x509-ca-cert
+
+def proxy_url(request: Request, proxy: typing.Optional[str] = None) -> str:
+    """
+    下载证书时经过的代理：请求中指定的地址，否则为 Proxy.startup_command 中的 -p/--listen-host
+    """
+    if proxy:
+        return proxy
+    host, port = listen_address(util.get_proxy_config(request=request).startup_command)
+    return f"http://{host}:{port}"
 
 class Item(BaseModel):
-    proxy: str = "http://localhost:8080"
+    proxy: typing.Optional[str] = None  # 默认使用启动命令中的监听地址
     platform: typing.Optional[Platforms] = None
     other_platform_format: typing.Optional[OtherPlatformFormat] = None
     save_dir: typing.Optional[str] = None
+    source: CertificateSources = "proxy"  # confdir: 直接读取 mitmproxy 配置目录，不需要代理在运行
 
 @proxy_router.post("/certificate")
 async def get_cert(request: Request, item: Item):
+    """
+    source 为 confdir 且未指定 save_dir 时，直接在响应体中返回证书内容
+    """
     implementation_classes = util.get_implementation_classes(request=request)
     shared_instance = util.get_shared_instances(request=request)
     proxy_handler = shared_instance.proxy_handler
+    if item.source == "confdir":
+        certificate_installer = implementation_classes.CertificateInstaller(
+            proxy=proxy_url(request=request, proxy=item.proxy),
+            confdir=proxy_confdir(util.get_proxy_config(request=request).startup_command),
+        )
+        if item.save_dir is None:
+            filename, data = await certificate_installer.export(
+                platform=item.platform,
+                other_platform_format=item.other_platform_format,
+            )
+            return Response(
+                content=data,
+                media_type=CertificateMediaTypes.get(filename.rsplit(".", 1)[-1], "application/x-x509-ca-cert"),
+                headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+            )
+        return await certificate_installer.install(
+            platform=item.platform,
+            other_platform_format=item.other_platform_format,
+            save_dir=item.save_dir,
+        )
     if proxy_handler and proxy_handler.running:
         certificate_installer = implementation_classes.CertificateInstaller(
-            proxy=item.proxy
+            proxy=proxy_url(request=request, proxy=item.proxy),
+            generation=(proxy_handler.pid, proxy_handler.started_at),  # 代理重启后重新校验 CA 指纹
         )
         save_path = await certificate_installer.install(
             platform=item.platform,
@@ -88,3 +220,38 @@ async def get_cert(request: Request, item: Item):
         )
         return save_path
     return ""
+
+
+class BatchTarget(BaseModel):
+    platform: typing.Optional[Platforms] = None
+    other_platform_format: typing.Optional[OtherPlatformFormat] = None
+    save_dir: str
+
+class BatchItem(BaseModel):
+    proxy: typing.Optional[str] = None  # 默认使用启动命令中的监听地址
+    source: CertificateSources = "proxy"
+    targets: typing.List[BatchTarget]
+
+@proxy_router.post("/certificate/batch")
+async def get_cert_batch(request: Request, item: BatchItem):
+    """
+    一次请求为多个平台/目录安装证书，返回与 targets 一一对应的结果清单
+    """
+    implementation_classes = util.get_implementation_classes(request=request)
+    shared_instance = util.get_shared_instances(request=request)
+    proxy_handler = shared_instance.proxy_handler
+    if item.source == "confdir":
+        certificate_installer = implementation_classes.CertificateInstaller(
+            proxy=proxy_url(request=request, proxy=item.proxy),
+            confdir=proxy_confdir(util.get_proxy_config(request=request).startup_command),
+        )
+    elif proxy_handler and proxy_handler.running:
+        certificate_installer = implementation_classes.CertificateInstaller(
+            proxy=proxy_url(request=request, proxy=item.proxy),
+            generation=(proxy_handler.pid, proxy_handler.started_at),
+        )
+    else:
+        return []
+    return await certificate_installer.install_many(
+        (t.platform, t.other_platform_format, t.save_dir) for t in item.targets
+    )
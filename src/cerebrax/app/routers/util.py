@@ -8,3 +8,29 @@ def get_shared_instances(request: fastapi.Request) -> typing.Any:
     shared_instance = request.app.state.shared_instances
     return shared_instance
 
+def primary_worker(app: typing.Any) -> bool:
+    """
+    单进程模式，或多进程模式下的 0 号 worker：配置监控、关机倒计时、历史日志只在这里运行
+    """
+    return getattr(app.state, "worker", None) in (None, 0)
+
+def single_process(request: fastapi.Request) -> None:
+    """
+    代理子进程与代理池由单个进程持有；多进程模式下请求被分到不同 worker，
+    /proxy/start 与 /proxy/stop 可能落在不同进程，因此直接拒绝
+    """
+    if getattr(request.app.state, "workers", 1) > 1:
+        raise fastapi.HTTPException(
+            status_code=409,
+            detail="Proxy management is only available when serving with a single worker.",
+        )
+    return None
+
+def get_proxy_config(request: fastapi.Request) -> typing.Any:
+    """
+    配置热更新后以 ConfigDispatcher 中已经生效的快照为准，否则使用 lifespan 启动时加载的快照
+    """
+    config_dispatcher = getattr(request.app.state, "config_dispatcher", None)
+    if config_dispatcher is not None and config_dispatcher.snapshot is not None:
+        return config_dispatcher.snapshot.proxy_config
+    return request.app.state.config_snapshot.proxy_config
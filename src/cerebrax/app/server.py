@@ -1,11 +1,27 @@
 from uvicorn import Server, Config
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable, Tuple
+from importlib import util
+import multiprocessing, signal, socket
+
+
+def select_backends(loop: str = "auto", http: str = "auto") -> Tuple[str, str]:
+    """
+    根据已安装的依赖选择事件循环与 HTTP 解析器，显式指定但未安装时回退到 asyncio/h11
+    """
+    has_uvloop = util.find_spec("uvloop") is not None
+    has_httptools = util.find_spec("httptools") is not None
+    if loop == "auto" or (loop == "uvloop" and not has_uvloop):
+        loop = "uvloop" if has_uvloop else "asyncio"
+    if http == "auto" or (http == "httptools" and not has_httptools):
+        http = "httptools" if has_httptools else "h11"
+    return loop, http
 
 
 class SubServer(Server):
-    def __init__(self, config: Config) -> None:
+    def __init__(self, config: Config, shutdown_event: Optional[Any] = None) -> None:
         super().__init__(config=config)
         self._running = False
+        self._shutdown_event = shutdown_event  # 多进程模式下所有 worker 共享的关机事件
 
     @property
     def running(self) -> bool:
@@ -16,6 +32,16 @@ class SubServer(Server):
         if isinstance(value, bool):
             self._running = value
 
+    async def on_tick(self, counter: int) -> bool:
+        should_exit = await super().on_tick(counter)
+        if self._shutdown_event is not None:
+            if should_exit:
+                self._shutdown_event.set()  # 本 worker 退出时通知其他 worker
+            elif self._shutdown_event.is_set():
+                self.should_exit = True
+                should_exit = True
+        return should_exit
+
     async def serve(self, sockets: Optional[List] = None) -> None:
         self.running = True
         try:
@@ -30,16 +56,138 @@ class ServerHandler(object):
     def __init__(self, args: Dict[str, Any])-> None:
         self._args = args
 
-    def build_server(self) -> Server:
+    def build_server(self, shutdown_event: Optional[Any] = None) -> SubServer:
         config = Config(
             **self._args
         )
-        server = SubServer(config=config)
+        server = SubServer(config=config, shutdown_event=shutdown_event)
         return server
 
+    def build_socket(self, reuse_port: bool = False) -> socket.socket:
+        host = self._args.get("host", "127.0.0.1")
+        port = self._args.get("port", 8000)
+        family = socket.AF_INET6 if ":" in host else socket.AF_INET
+        sock = socket.socket(family=family, type=socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        if reuse_port:
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        sock.bind((host, port))
+        sock.listen(self._args.get("backlog", 2048))
+        sock.set_inheritable(True)
+        return sock
+
+    def build_workers(self,
+                      workers: int,
+                      initializer: Optional[Callable[[SubServer, int], None]] = None,
+                      reuse_port: bool = False,
+                      ) -> "WorkerSupervisor":
+        supervisor = WorkerSupervisor(
+            handler=self,
+            workers=workers,
+            initializer=initializer,
+            reuse_port=reuse_port,
+        )
+        return supervisor
+
+
+def _run_worker(handler: ServerHandler,
+                sock: Optional[socket.socket],
+                shutdown_event: Any,
+                initializer: Optional[Callable[[SubServer, int], None]],
+                reuse_port: bool,
+                index: int,
+                ) -> None:
+    if sock is None:  # SO_REUSEPORT: 每个 worker 自己绑定，由内核分配连接
+        sock = handler.build_socket(reuse_port=reuse_port)
+    server = handler.build_server(shutdown_event=shutdown_event)
+    if initializer is not None:
+        initializer(server, index)
+    server.run(sockets=[sock])  # 由 uvicorn 按 config.loop 创建事件循环
+    return None
+
+
+class WorkerSupervisor(object):
+    """
+    预先 fork 出多个 worker 进程共享同一个监听端口。
+    任意 worker 触发退出（/shutdown/confirm、lifespan 倒计时）都会通过共享事件让所有 worker 一起退出。
+    initializer(server, index) 在每个 worker 中调用，index 从 0 开始，0 号 worker 负责只能有一份的后台任务。
+    """
+    def __init__(self,
+                 handler: ServerHandler,
+                 workers: int,
+                 initializer: Optional[Callable[[SubServer, int], None]] = None,
+                 reuse_port: bool = False,
+                 ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be greater than 0.")
+        self._handler = handler
+        self._workers = workers
+        self._initializer = initializer
+        self._reuse_port = reuse_port and hasattr(socket, "SO_REUSEPORT")
+        self._context = multiprocessing.get_context("fork")  # app 对象与监听 socket 通过 fork 继承
+        self.shutdown_event = self._context.Event()
+        self.processes: List[multiprocessing.Process] = []
+
+    @property
+    def workers(self) -> int:
+        return self._workers
+
+    def _handle_signal(self, signum: int, frame: Any) -> None:
+        self.shutdown_event.set()
+        return None
+
+    def start(self) -> None:
+        sock = None if self._reuse_port else self._handler.build_socket()
+        try:
+            for index in range(self._workers):
+                process = self._context.Process(
+                    target=_run_worker,
+                    args=(self._handler, sock, self.shutdown_event, self._initializer, self._reuse_port, index),
+                    daemon=False,
+                )
+                process.start()
+                self.processes.append(process)
+        finally:
+            if sock is not None:
+                sock.close()  # 父进程不参与 accept
+        return None
+
+    def join(self, timeout: Optional[float] = None) -> None:
+        for process in self.processes:
+            process.join(timeout=timeout)
+        return None
+
+    def stop(self, timeout: float = 10) -> None:
+        self.shutdown_event.set()
+        self.join(timeout=timeout)
+        for process in self.processes:
+            if process.is_alive():
+                process.terminate()
+                process.join()
+        self.processes.clear()
+        return None
+
+    def run(self) -> None:
+        previous = {
+            s: signal.signal(s, self._handle_signal) for s in (signal.SIGINT, signal.SIGTERM)
+        }
+        try:
+            self.start()
+            while self.processes and not self.shutdown_event.is_set():
+                # 某个 worker 意外退出时同样停掉其余 worker
+                if any(not p.is_alive() for p in self.processes):
+                    break
+                self.shutdown_event.wait(timeout=0.5)
+        finally:
+            self.stop()
+            for s, handler in previous.items():
+                signal.signal(s, handler)
+        return None
+
 
 __all__ = [
     'SubServer',
     'ServerHandler',
+    'WorkerSupervisor',
+    'select_backends',
 ]
-
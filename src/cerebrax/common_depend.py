@@ -1,74 +1,148 @@
 # ----------------------- standard library ----------------------------
-import asyncio, time, os, sys, typing, types, uuid, inspect, signal, shlex, tomllib, json
+import asyncio, time, os, sys, typing, types, uuid, inspect, signal, shlex, tomllib, json, threading
 import pathlib
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed, ProcessPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed, ProcessPoolExecutor, Future, wait
+import importlib
 from importlib import util
 from dataclasses import dataclass
 from enum import Enum
 import contextlib
 from contextlib import asynccontextmanager
 import collections
+import re
+import hashlib
+import zlib
+import bisect
+import operator
+import struct
+import functools
+import mmap
+import select
+import socket
+import queue
 from collections import namedtuple
 import platform, subprocess
 
-# ----------------------- third-party library ----------------------------
-import fastapi, uvicorn
-from fastapi import (
-    APIRouter,
-    FastAPI,
-    Request,
-    Response,
-    BackgroundTasks,
-)
-from uvicorn import Server, Config
-import httpx, requests, aiohttp
-from playwright.async_api import async_playwright
-import aiofile, aiofiles, aiopath
-from aiostream import stream
-import psutil
-import pydantic
-from pydantic import (
-    BaseModel,
-    field_validator,
-    ValidationError,
-    ValidationInfo,
-)
-import watchdog
-from watchdog.observers import Observer
-from watchdog.events import (
-    FileSystemEventHandler,
-    PatternMatchingEventHandler,
-    RegexMatchingEventHandler,
-    LoggingEventHandler,
-)
-import lxml
-from lxml import etree, html
-import ijson
-import bs4
-from bs4 import BeautifulSoup
+# ----------------------- third-party library (lazy) ----------------------------
+"""
+第三方依赖按需导入：模块级 __getattr__ 在首次访问时才真正 import，
+这样只使用 /shutdown 的进程不必为 playwright、docker、redis 等付出导入开销。
+name -> (module, attribute)，attribute 为 None 时返回模块本身。
+"""
+_LAZY_ATTRIBUTES: typing.Dict[str, typing.Tuple[str, typing.Optional[str]]] = {
+    "fastapi": ("fastapi", None),
+    "uvicorn": ("uvicorn", None),
+    "APIRouter": ("fastapi", "APIRouter"),
+    "FastAPI": ("fastapi", "FastAPI"),
+    "Request": ("fastapi", "Request"),
+    "Response": ("fastapi", "Response"),
+    "BackgroundTasks": ("fastapi", "BackgroundTasks"),
+    "Server": ("uvicorn", "Server"),
+    "Config": ("uvicorn", "Config"),
+    "httpx": ("httpx", None),
+    "requests": ("requests", None),
+    "aiohttp": ("aiohttp", None),
+    "async_playwright": ("playwright.async_api", "async_playwright"),
+    "aiofile": ("aiofile", None),
+    "aiofiles": ("aiofiles", None),
+    "aiopath": ("aiopath", None),
+    "stream": ("aiostream", "stream"),
+    "psutil": ("psutil", None),
+    "pydantic": ("pydantic", None),
+    "BaseModel": ("pydantic", "BaseModel"),
+    "field_validator": ("pydantic", "field_validator"),
+    "ValidationError": ("pydantic", "ValidationError"),
+    "ValidationInfo": ("pydantic", "ValidationInfo"),
+    "watchdog": ("watchdog", None),
+    "Observer": ("watchdog.observers", "Observer"),
+    "FileSystemEventHandler": ("watchdog.events", "FileSystemEventHandler"),
+    "PatternMatchingEventHandler": ("watchdog.events", "PatternMatchingEventHandler"),
+    "RegexMatchingEventHandler": ("watchdog.events", "RegexMatchingEventHandler"),
+    "LoggingEventHandler": ("watchdog.events", "LoggingEventHandler"),
+    "lxml": ("lxml", None),
+    "etree": ("lxml.etree", None),
+    "html": ("lxml.html", None),
+    "ijson": ("ijson", None),
+    "bs4": ("bs4", None),
+    "BeautifulSoup": ("bs4", "BeautifulSoup"),
+    "redis": ("redis", None),
+    "Redis": ("redis", "Redis"),
+    "AsyncRedis": ("redis.asyncio", "Redis"),
+    "docker": ("docker", None),
+    "errors": ("docker.errors", None),
+    "ImageNotFound": ("docker.errors", "ImageNotFound"),
+    "APIError": ("docker.errors", "APIError"),
+    "DockerException": ("docker.errors", "DockerException"),
+    "NotFound": ("docker.errors", "NotFound"),
+    "np": ("numpy", None),
+    "x509": ("cryptography.x509", None),
+    "pkcs12": ("cryptography.hazmat.primitives.serialization.pkcs12", None),
+    "serialization": ("cryptography.hazmat.primitives.serialization", None),
+}
 
-import redis
-from redis import Redis
-from redis.asyncio import Redis as AsyncRedis
+_import_costs: typing.Dict[str, float] = {}  # module -> 首次导入耗时(ms)
 
-import docker
-from docker import errors
-from docker.errors import ImageNotFound, APIError, DockerException, NotFound
+
+def _load_module(module_name: str) -> types.ModuleType:
+    module = sys.modules.get(module_name)
+    if module is None:
+        start = time.perf_counter()
+        module = importlib.import_module(module_name)
+        _import_costs[module_name] = (time.perf_counter() - start) * 1000
+    return module
+
+
+def __getattr__(name: str) -> typing.Any:
+    try:
+        module_name, attribute = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    module = _load_module(module_name)
+    value = module if attribute is None else getattr(module, attribute)
+    globals()[name] = value  # 缓存，之后的访问不再经过 __getattr__
+    return value
+
+
+def __dir__() -> typing.List[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+
+
+def import_report() -> typing.Dict[str, float]:
+    """
+    返回已经按需导入的第三方模块及其导入耗时(ms)，按耗时降序排列
+    """
+    return {
+        k: round(v, 3) for k, v in sorted(
+            _import_costs.items(), key=lambda kv: kv[1], reverse=True
+        )
+    }
 
 
 __all__ = [
     # standard library
     "asyncio", "time", "os", "sys", "typing", "types", "uuid", "inspect", "signal", "shlex", "tomllib", "json",
+    "threading",
     "contextlib",
     "pathlib",
     "Path",
-    "ThreadPoolExecutor", "as_completed", "ProcessPoolExecutor",
+    "ThreadPoolExecutor", "as_completed", "ProcessPoolExecutor", "Future", "wait",
     "util",
     "dataclass",
     "Enum",
     "asynccontextmanager",
     "collections",
+    "re",
+    "hashlib",
+    "zlib",
+    "bisect",
+    "operator",
+    "struct",
+    "functools",
+    "mmap",
+    "select",
+    "socket",
+    "queue",
     "namedtuple",
     "platform", "subprocess",
 
@@ -92,4 +166,9 @@ __all__ = [
     "bs4", "BeautifulSoup",
     "redis", "Redis", "AsyncRedis",
     "docker", "errors", "ImageNotFound", "APIError", "DockerException", "NotFound",
+    "np",
+    "x509", "pkcs12", "serialization",
+
+    # report
+    "import_report",
 ]
@@ -1,26 +1,156 @@
 """
 定义内部可复用的全局对象
+
+所有对象都登记在 registry 中，只有在首次访问时才会真正创建，
+避免在导入阶段阻塞在 Docker socket 上或者预先拉起无人使用的进程/线程池。
+模块级 __getattr__ 保证 internal.httpx_client 这类写法依旧可用。
 """
+from src.cerebrax import common_depend as depend  # 第三方依赖在工厂函数中才解析
 from src.cerebrax.common_depend import (
-    httpx,
-    docker,
-    AsyncRedis,
+    typing,
+    inspect,
+    threading,
     ProcessPoolExecutor,
     ThreadPoolExecutor,
 )
+from src.cerebrax.utils import collector
+from src.cerebrax._types import (
+    DefaultProxyHost,
+    DefaultProxyPort,
+)
+
+
+class ResourceRegistry(object):
+    def __init__(self) -> None:
+        self._factories: typing.Dict[str, typing.Callable[[], typing.Any]] = {}
+        self._closers: typing.Dict[str, typing.Optional[typing.Callable[[typing.Any], typing.Any]]] = {}
+        self._instances: typing.Dict[str, typing.Any] = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._factories
+
+    @property
+    def registered(self) -> typing.List[str]:
+        return list(self._factories.keys())
+
+    @property
+    def materialized(self) -> typing.List[str]:
+        return list(self._instances.keys())
+
+    def register(self,
+                 name: str,
+                 factory: typing.Callable[[], typing.Any],
+                 closer: typing.Optional[typing.Callable[[typing.Any], typing.Any]] = None,
+                 ) -> None:
+        self._factories[name] = factory
+        self._closers[name] = closer
+        return None
+
+    def get(self, name: str) -> typing.Any:
+        try:
+            return self._instances[name]
+        except KeyError:
+            pass
+        if name not in self._factories:
+            raise KeyError(f"{name} is not a registered resource.")
+        with self._lock:  # 线程池中的并发首次访问只创建一次
+            if name not in self._instances:
+                self._instances[name] = self._factories[name]()
+            return self._instances[name]
+
+    def report(self) -> typing.Dict[str, bool]:
+        return {name: name in self._instances for name in self._factories}
+
+    async def aclose(self) -> None:
+        # 只关闭真正创建过的对象，关闭后再次访问会重新创建
+        while self._instances:
+            name, instance = self._instances.popitem()
+            closer = self._closers.get(name)
+            if closer is None:
+                continue
+            result = closer(instance)
+            if inspect.isawaitable(result):
+                await result
+        return None
+
+
+def _shutdown_pool(pool: typing.Union[ProcessPoolExecutor, ThreadPoolExecutor]) -> None:
+    pool.shutdown(wait=False, cancel_futures=True)
+    return None
 
+
+# 池的大小跟随 CPU 数量，而不是写死
+_LOGICAL_CPUS = collector.cpu_count.logical or 1
+ProcessPoolWorkers = _LOGICAL_CPUS
+ThreadPoolWorkers = min(32, _LOGICAL_CPUS + 4)
+
+registry = ResourceRegistry()
 # -------------------------- Httpx ----------------------------------
-httpx_client = httpx.AsyncClient()  # 内部http的异步客户端
-httpx_proxy_client = httpx.AsyncClient(
-    proxy="http://127.0.0.1:8000",
-    verify=False
+registry.register(
+    "httpx_client",  # 内部http的异步客户端
+    lambda: depend.httpx.AsyncClient(),
+    lambda client: client.aclose(),
+)
+registry.register(
+    "httpx_proxy_client",
+    lambda: depend.httpx.AsyncClient(
+        proxy=f"http://{DefaultProxyHost}:{DefaultProxyPort}",  # 经过 mitmproxy 访问 mitm.it
+        verify=False
+    ),
+    lambda client: client.aclose(),
 )
 # -------------------------- Redis ----------------------------------
-redis_client = AsyncRedis() # 内部redis连接客户端
+registry.register(
+    "redis_client",  # 内部redis连接客户端
+    lambda: depend.AsyncRedis(),
+    lambda client: client.aclose(),
+)
 # -------------------------- Process Pool ---------------------------
-process_pool = ProcessPoolExecutor(max_workers=10)
+registry.register(
+    "process_pool",
+    lambda: ProcessPoolExecutor(max_workers=ProcessPoolWorkers),
+    _shutdown_pool,
+)
 # -------------------------- Thread Pool ----------------------------
-thread_pool = ThreadPoolExecutor(max_workers=70)
+registry.register(
+    "thread_pool",
+    lambda: ThreadPoolExecutor(max_workers=ThreadPoolWorkers),
+    _shutdown_pool,
+)
 # -------------------------- Docker ---------------------------------
-docker_client = docker.from_env()
+registry.register(
+    "docker_client",
+    lambda: depend.docker.from_env(),
+    lambda client: client.close(),
+)
+
+
+def proxy_client(proxy: typing.Optional[str] = None) -> typing.Any:
+    """
+    经过指定代理（例如 http://127.0.0.1:8081）的客户端，每个代理地址创建一次，
+    未指定时使用默认监听地址的 httpx_proxy_client
+    """
+    if not proxy:
+        return registry.get("httpx_proxy_client")
+    name = f"httpx_proxy_client:{proxy}"
+    if name not in registry:
+        registry.register(
+            name,
+            lambda: depend.httpx.AsyncClient(proxy=proxy, verify=False),
+            lambda client: client.aclose(),
+        )
+    return registry.get(name)
+
+
+def __getattr__(name: str) -> typing.Any:
+    if name in registry:
+        return registry.get(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
+__all__ = [
+    "ResourceRegistry",
+    "registry",
+    "proxy_client",
+]
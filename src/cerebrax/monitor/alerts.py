@@ -0,0 +1,147 @@
+"""
+基于阈值规则的资源告警
+
+规则在每次采样后增量评估（只比较本次快照与规则状态，不回看历史），
+评估发生在采样线程中，告警事件回到事件循环后再分发给订阅者。
+"""
+from src.cerebrax.common_depend import (
+    asyncio,
+    typing,
+    time,
+    operator,
+    threading,
+)
+from src.cerebrax._models import AlertRule
+from src.cerebrax._container import AlertEvent
+from src.cerebrax.monitor.metrics import flatten_snapshot
+
+Comparators: typing.Dict[str, typing.Callable[[float, float], bool]] = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+}
+
+
+def _matches(metric: str, series: str) -> bool:
+    return series == metric or (series.startswith(metric) and series[len(metric):].startswith("{"))
+
+
+def _near(rule: AlertRule, value: float) -> bool:
+    slack = abs(rule.threshold) * rule.margin
+    if rule.op in {">", ">="}:
+        return value >= rule.threshold - slack
+    return value <= rule.threshold + slack
+
+
+class AlertEngine(object):
+    def __init__(self, rules: typing.Iterable[AlertRule] = ()) -> None:
+        self._rules: typing.Dict[str, AlertRule] = {}
+        self._pending: typing.Dict[typing.Tuple[str, str], float] = {}  # (规则, 列) -> 条件开始满足的时间
+        self._firing: typing.Dict[typing.Tuple[str, str], AlertEvent] = {}
+        self._near: typing.Set[str] = set()  # 有列接近阈值的 aspect
+        self._subscribers: typing.Set[asyncio.Queue] = set()
+        self._lock = threading.Lock()  # evaluate 在采样线程中调用
+        for rule in rules:
+            self.add_rule(rule)
+
+    @property
+    def aspects(self) -> typing.Set[str]:
+        return {r.aspect for r in self._rules.values()}
+
+    @property
+    def rules(self) -> typing.List[AlertRule]:
+        return list(self._rules.values())
+
+    def add_rule(self, rule: AlertRule) -> None:
+        with self._lock:
+            self._rules[rule.name] = rule
+        return None
+
+    def remove_rule(self, name: str) -> None:
+        with self._lock:
+            self._rules.pop(name, None)
+            for key in [k for k in self._pending if k[0] == name]:
+                del self._pending[key]
+            for key in [k for k in self._firing if k[0] == name]:
+                del self._firing[key]
+        return None
+
+    def near(self, aspect: str) -> bool:
+        """
+        aspect 是否有列接近阈值、正在等待 duration 或已经触发，用于加快采样
+        """
+        return aspect in self._near
+
+    def active(self) -> typing.List[AlertEvent]:
+        with self._lock:
+            return list(self._firing.values())
+
+    def evaluate(self, aspect: str, snapshot: typing.Any, now: typing.Optional[float] = None) -> typing.List[AlertEvent]:
+        _now = time.monotonic() if now is None else now
+        rules = [r for r in self.rules if r.aspect == aspect]
+        if not rules:
+            return []
+        row = dict(flatten_snapshot(aspect, snapshot))
+        events, near = [], False
+        with self._lock:
+            for rule in rules:
+                compare = Comparators[rule.op]
+                for series, value in row.items():
+                    if not _matches(rule.metric, series):
+                        continue
+                    key = (rule.name, series)
+                    if compare(value, rule.threshold):
+                        near = True
+                        since = self._pending.setdefault(key, _now)
+                        if key not in self._firing and _now - since >= rule.duration:
+                            event = AlertEvent(rule.name, series, "firing", value, rule.threshold, _now)
+                            self._firing[key] = event
+                            events.append(event)
+                        continue
+                    self._pending.pop(key, None)
+                    if key in self._firing:
+                        del self._firing[key]
+                        events.append(AlertEvent(rule.name, series, "resolved", value, rule.threshold, _now))
+                    near = near or _near(rule, value)
+            if near:
+                self._near.add(aspect)
+            else:
+                self._near.discard(aspect)
+        return events
+
+    # ------------------------------ 订阅 ------------------------------
+    def subscribe(self, maxsize: int = 64) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=maxsize)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+        return None
+
+    async def alerts(self, maxsize: int = 64) -> typing.AsyncGenerator[AlertEvent, None]:
+        queue = self.subscribe(maxsize=maxsize)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.unsubscribe(queue)
+
+    def publish(self, events: typing.Iterable[AlertEvent]) -> None:
+        """
+        在事件循环中分发告警，订阅者慢时丢弃最旧的事件
+        """
+        for event in events:
+            for queue in self._subscribers:
+                try:
+                    queue.put_nowait(event)
+                except asyncio.QueueFull:
+                    queue.get_nowait()
+                    queue.put_nowait(event)
+        return None
+
+
+__all__ = [
+    "AlertEngine",
+]
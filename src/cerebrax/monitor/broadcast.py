@@ -0,0 +1,117 @@
+"""
+单生产者、多消费者的广播通道
+
+生产者把数据写入固定大小的环形缓冲，从不等待；每个消费者持有自己的游标独立读取。
+消费者落后超过一圈时直接跳到仍在缓冲中的最旧数据，并记录丢失的条数。
+"""
+from src.cerebrax.common_depend import (
+    asyncio,
+    typing,
+)
+
+DefaultChannelCapacity: int = 128
+
+
+class ChannelClosed(Exception):
+    pass
+
+
+class BroadcastChannel(object):
+    def __init__(self, capacity: int = DefaultChannelCapacity) -> None:
+        self.capacity = max(int(capacity), 1)
+        self._ring: typing.List[typing.Any] = [None] * self.capacity
+        self._seq = 0  # 下一条数据的序号
+        self._changed = asyncio.Event()
+        self._closed = False
+
+    @property
+    def seq(self) -> int:
+        return self._seq
+
+    @property
+    def oldest(self) -> int:
+        return max(self._seq - self.capacity, 0)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def publish(self, item: typing.Any) -> None:
+        if self._closed:
+            raise ChannelClosed()
+        self._ring[self._seq % self.capacity] = item
+        self._seq += 1
+        # 唤醒所有等待者，之后的等待者使用新的 Event
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+        return None
+
+    def close(self) -> None:
+        self._closed = True
+        self._changed.set()
+        return None
+
+    def reopen(self) -> None:
+        if self._closed:
+            self._closed = False
+            self._changed = asyncio.Event()
+        return None
+
+    def cursor(self, latest: bool = True) -> "Cursor":
+        """
+        latest 为 True 时只读取之后发布的数据，否则从缓冲中最旧的数据开始
+        """
+        return Cursor(self, self._seq if latest else self.oldest)
+
+    async def _wait(self, position: int) -> None:
+        while position >= self._seq:
+            if self._closed:
+                raise ChannelClosed()
+            await self._changed.wait()
+        return None
+
+
+class Cursor(object):
+    __slots__ = ("channel", "position", "lagged")
+
+    def __init__(self, channel: BroadcastChannel, position: int) -> None:
+        self.channel = channel
+        self.position = position
+        self.lagged = 0  # 因为落后被覆盖而没有读到的条数
+
+    def pending(self) -> int:
+        return self.channel.seq - self.position
+
+    def skip(self) -> None:
+        """
+        丢弃尚未读取的数据，下次从最新发布的数据开始读
+        """
+        self.position = self.channel.seq
+        return None
+
+    async def get(self) -> typing.Any:
+        channel = self.channel
+        if self.position >= channel.seq:
+            await channel._wait(self.position)
+        if self.position < channel.oldest:
+            self.lagged += channel.oldest - self.position
+            self.position = channel.oldest
+        item = channel._ring[self.position % channel.capacity]
+        self.position += 1
+        return item
+
+    def __aiter__(self) -> "Cursor":
+        return self
+
+    async def __anext__(self) -> typing.Any:
+        try:
+            return await self.get()
+        except ChannelClosed:
+            raise StopAsyncIteration
+
+
+__all__ = [
+    "BroadcastChannel",
+    "Cursor",
+    "ChannelClosed",
+]
@@ -3,7 +3,10 @@
 """
 from watchdog.events import FileSystemEventHandler
 from watchdog.observers import Observer
-import asyncio, typing
+import asyncio, typing, hashlib, pathlib
+from src.cerebrax._types import Time, DefaultDebounce
+from src.cerebrax._container import ConfigSnapshot, ConfigDiff
+from src.cerebrax.settings.config import Config, diff_config
 
 """
 监控目标文件并返回事件流迭代器
@@ -12,32 +15,74 @@ class ConfigFileEventHandler(FileSystemEventHandler):
     def __init__(self,
                  key_path: str,
                  loop: asyncio.AbstractEventLoop,
-                 queue: asyncio.Queue
+                 queue: asyncio.Queue,
+                 debounce: Time = DefaultDebounce,  # 最后一个事件之后静默 debounce 秒才交付
                  ) -> None:
         self.key_path = key_path
         self.loop = loop
         self.queue = queue
+        self.debounce = debounce
         self.exit = True
+        self.events = 0  # 收到的文件事件数
+        self.batches = 0  # 合并后交付的次数
+        self._last = 0.0
+        self._timer: typing.Optional[asyncio.TimerHandle] = None
+
+    def _signal(self, file_path: str) -> None:
+        """
+        在 watchdog 线程中调用：只把事件转交给事件循环，不等待
+        """
+        if file_path == self.key_path:
+            try:
+                self.loop.call_soon_threadsafe(self._touch)
+            except RuntimeError:  # 事件循环已经关闭
+                pass
+        return None
 
     def on_modified(self, event) -> None:
         if not event.is_directory:
-            file_path = event.src_path
-            if file_path == self.key_path:
-                future = asyncio.run_coroutine_threadsafe(
-                    self.put_new_item(item=file_path), loop=self.loop
-                )
-                try:
-                    future.result(timeout=5)
-                except asyncio.TimeoutError:
-                    pass
+            self._signal(event.src_path)
+        return None
+
+    def on_created(self, event) -> None:
+        if not event.is_directory:
+            self._signal(event.src_path)
+        return None
+
+    def on_moved(self, event) -> None:
+        if not event.is_directory:  # 编辑器先写临时文件再重命名覆盖
+            self._signal(event.dest_path)
+        return None
+
+    def _touch(self) -> None:
+        self.events += 1
+        self._last = self.loop.time()
+        if self._timer is None:
+            self._timer = self.loop.call_later(self.debounce, self._fire)
+        return None
+
+    def _fire(self) -> None:
+        remaining = self._last + self.debounce - self.loop.time()
+        if remaining > 0:  # 窗口内又有新事件，顺延
+            self._timer = self.loop.call_later(remaining, self._fire)
+            return None
+        self._timer = None
+        self.batches += 1
+        self.put_new_item(item=self.key_path)
         return None
 
-    async def put_new_item(self, item: str) -> None:
+    def cancel(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        return None
+
+    def put_new_item(self, item: str) -> None:
         try:
-            self.queue.put_nowait(item)  # 队列已经满
-        except asyncio.QueueFull:
-            self.queue.get_nowait()  # 丢弃过期数据
-            await self.put_new_item(item)  # 回调放入新的数据（防止其他地方意外往队列里面传数据）
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:  # 队列已经满
+            self.queue.get_nowait()  # 丢弃过期数据，保持最新
+            self.queue.put_nowait(item)
         return None
 
     async def get_new_item(self) -> str:
@@ -54,12 +99,111 @@ class ConfigFileEventHandler(FileSystemEventHandler):
             yield item
 
 
+class ConfigReloader(object):
+    """
+    按内容哈希判断配置是否真的变化，变化时重新解析并整体替换 ConfigSnapshot。
+    ConfigSnapshot 是不可变对象，替换只是一次属性赋值，读取方要么看到旧快照，要么看到新快照。
+    """
+    def __init__(self, config: Config, path: str) -> None:
+        self.config = config
+        self.path = path
+        self.version = 0
+        self.skipped = 0  # 内容未变化而跳过的次数
+        self.error: typing.Optional[str] = None  # 最近一次解析失败的原因，成功后清空
+        self._snapshot: typing.Optional[ConfigSnapshot] = None
+        self._digest: typing.Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def snapshot(self) -> typing.Optional[ConfigSnapshot]:
+        return self._snapshot
+
+    def _read_digest(self) -> typing.Optional[str]:
+        try:
+            return hashlib.sha256(pathlib.Path(self.path).read_bytes()).hexdigest()
+        except OSError:
+            return None
+
+    def prime(self) -> ConfigSnapshot:
+        """
+        同步加载初始配置，作为之后比较的基准
+        """
+        self._digest = self._read_digest()
+        self._snapshot = self.config.get()
+        return self._snapshot
+
+    async def reload(self) -> typing.Optional[ConfigSnapshot]:
+        """
+        返回新的快照；内容未变化、文件暂时不可读或解析失败时返回 None 并保留旧快照
+        """
+        async with self._lock:
+            digest = await asyncio.to_thread(self._read_digest)
+            if digest is None:
+                return None
+            if digest == self._digest:
+                self.skipped += 1
+                return None
+            try:
+                snapshot = await self.config.async_get()
+            except Exception as e:  # 保存到一半的文件、校验失败：等待下一次保存
+                self.error = str(e)
+                return None
+            self.error = None
+            self._digest = digest
+            self._snapshot = snapshot
+            self.version += 1
+            return snapshot
+
+
+Reconfigure = typing.Callable[[ConfigDiff, ConfigSnapshot], typing.Awaitable[None]]
+
+
+class ConfigDispatcher(object):
+    """
+    比较新旧 ConfigSnapshot，只调用受影响的子系统；
+    可以直接作为 ConfigFileEventMonitor 的 reload 使用（需要传入 config，event_flow 交付快照）
+    """
+    def __init__(self, snapshot: typing.Optional[ConfigSnapshot] = None) -> None:
+        self.snapshot = snapshot  # 已经生效的配置
+        self._handlers: typing.List[typing.Tuple[str, typing.Tuple[str, ...], Reconfigure]] = []
+        self.last: typing.Dict[str, typing.Optional[str]] = {}  # 最近一次调度的子系统 -> 错误信息
+
+    def register(self, name: str, paths: typing.Iterable[str], handler: Reconfigure) -> None:
+        """
+        paths 中任一配置项变化时调用 handler(diff, snapshot)，例如 ("Proxy.startup_command",)
+        """
+        self._handlers.append((name, tuple(paths), handler))
+        return None
+
+    async def dispatch(self, snapshot: ConfigSnapshot) -> ConfigDiff:
+        diff = diff_config(self.snapshot, snapshot)
+        self.snapshot = snapshot
+        if not diff.changes:
+            return diff
+        selected = [(name, handler) for name, paths, handler in self._handlers if diff.changed(*paths)]
+        results = await asyncio.gather(
+            *(handler(diff, snapshot) for _, handler in selected), return_exceptions=True
+        )  # 子系统相互独立，并发执行，单个失败不影响其他
+        self.last = {
+            name: (str(r) or r.__class__.__name__) if isinstance(r, BaseException) else None
+            for (name, _), r in zip(selected, results)
+        }
+        return diff
+
+    async def __call__(self, event_flow: typing.AsyncGenerator[ConfigSnapshot, None], shared_instance: typing.Any = None) -> None:
+        async for snapshot in event_flow:
+            await self.dispatch(snapshot)
+        return None
+
+
 class ConfigFileEventMonitor(object):
     def __init__(self,
                  path: str,  # 监控目录
                  name: str,  # 监控的关键文件名字
                  reload: typing.Callable,  # 文件变更后的做法
-                 shared_instances  # 共享实例，里面存在可使用的对象
+                 shared_instances,  # 共享实例，里面存在可使用的对象
+                 config: typing.Optional[Config] = None,  # 指定时 event_flow 交付重新解析后的 ConfigSnapshot
+                 debounce: Time = DefaultDebounce,
                  ) -> None:
         loop = asyncio.get_event_loop()
         if loop.is_running():
@@ -67,6 +211,7 @@ class ConfigFileEventMonitor(object):
                 key_path=f"{path}/{name}",  # 要监控的配置文件路径
                 loop=loop,  # 当前正在运行的事件循环
                 queue=asyncio.Queue(maxsize=1),  # 绑定当前事件循环的队列，单元素缓存保持最新
+                debounce=debounce,
             )
         else:
             raise RuntimeError("Loop is not running")
@@ -74,16 +219,28 @@ class ConfigFileEventMonitor(object):
         self.path = path
         self.reload = reload
         self.shared_instances = shared_instances
+        self.reloader = ConfigReloader(config=config, path=self.handler.key_path) if config else None
         self.task = None
 
+    async def snapshot_flow(self) -> typing.AsyncGenerator[ConfigSnapshot, None]:
+        """
+        合并后的文件事件 -> 内容哈希校验 -> 重新解析，只交付真正变化了的配置
+        """
+        async for _ in self.handler.event_flow():
+            snapshot = await self.reloader.reload()
+            if snapshot is not None:
+                yield snapshot
+
     def start(self) -> None:
         if self.handler.exit:
             self.handler.exit = False
+            if self.reloader and self.reloader.snapshot is None:
+                self.reloader.prime()
             self.observer.schedule(self.handler, path=self.path, recursive=True)
             self.observer.start()
             self.task = asyncio.create_task(
                 self.reload(
-                    event_flow=self.handler.event_flow(),
+                    event_flow=self.snapshot_flow() if self.reloader else self.handler.event_flow(),
                     shared_instance=self.shared_instances
                 )
             )
@@ -92,9 +249,11 @@ class ConfigFileEventMonitor(object):
     async def stop(self) -> None:
         if not self.handler.exit:
             self.handler.exit = True
+            self.handler.cancel()
+            self.task.cancel()  # event_flow 阻塞在 queue.get()，看不到 exit 标志，直接取消
             try:
                 await asyncio.wait_for(self.task, timeout=10)
-            except asyncio.TimeoutError:
+            except (asyncio.CancelledError, asyncio.TimeoutError):
                 pass
             finally:
                 if self.observer.is_alive():
@@ -104,5 +263,7 @@ class ConfigFileEventMonitor(object):
 
 
 __all__ = [
-    "ConfigFileEventMonitor"
+    "ConfigFileEventMonitor",
+    "ConfigReloader",
+    "ConfigDispatcher",
 ]
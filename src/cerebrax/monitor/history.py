@@ -0,0 +1,360 @@
+"""
+资源历史的磁盘持久化与回放
+
+目录结构：<directory>/<aspect>/<分辨率>/<起始毫秒>-<pid>-<序号>.seg
+每个段文件是预先分配好大小的列式文件，通过 mmap 追加写入：
+
+    [0, H)                        头部：magic、容量、已写行数、schema 长度、头部长度 H、schema(JSON)
+    [H, H + 8 * capacity)         时间戳列
+    之后每 8 * capacity 字节      一个数据列
+
+H 是容纳 schema 的最小的 4096 整数倍，列名带完整标签、列数很多时头部随之变大。
+
+原始采样写入分辨率 1 的日志，同时在内存中按桶累加，桶结束时把均值写入 60 与 3600 的日志。
+原始层的目录名固定为 1，实际的采样间隔（Monitor.interval * multiples）记录在段头部，查询结果按它标注分辨率。
+查询只 mmap 与时间范围相交的段，并且只读取请求的列，不会把整个文件读入内存；
+超过保留期的段在轮转新段和查询时删除，停止采样之后旧数据同样会被清理。
+"""
+from src.cerebrax.common_depend import (
+    os,
+    typing,
+    time,
+    json,
+    mmap,
+    struct,
+    pathlib,
+    threading,
+)
+from src.cerebrax import common_depend as depend  # 第一次写入或查询历史时才导入 numpy
+from src.cerebrax._types import (
+    DefaultHistoryDir,
+    HistoryResolutions,
+    DefaultSegmentSeconds,
+    DefaultHistoryRetention,
+)
+from src.cerebrax._container import RecordSchema
+from src.cerebrax.monitor.records import SnapshotEncoder
+
+Magic = b"CBXSEG02"
+HeaderAlign = 4096  # 头部按页对齐，数据列从页边界开始
+Header = struct.Struct("<8sQQIQ")  # magic, capacity, count, meta 长度, 头部长度
+CountOffset = 16
+
+
+class Segment(object):
+    def __init__(self, path: pathlib.Path, writable: bool = False) -> None:
+        self.path = path
+        self._file = open(path, "r+b" if writable else "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+        except ValueError:  # 空文件
+            self._file.close()
+            raise
+        magic, self.capacity, _, meta_length, header_size = Header.unpack_from(self._mmap, 0)
+        if magic != Magic:
+            self.close()
+            raise ValueError(f"{path} is not a history segment.")
+        meta = json.loads(bytes(self._mmap[Header.size:Header.size + meta_length]))
+        self.schema = RecordSchema(meta["aspect"], meta["version"], tuple(meta["columns"]))
+        self.resolution = meta["resolution"]
+        self.start = meta["start"]
+        self._data = depend.np.frombuffer(
+            self._mmap, dtype="<f8", count=(len(self.schema.columns) + 1) * self.capacity, offset=header_size,
+        ).reshape(len(self.schema.columns) + 1, self.capacity)  # 第 0 行是时间戳，其余每行一列
+
+    @classmethod
+    def create(cls,
+               path: pathlib.Path,
+               schema: RecordSchema,
+               resolution: float,
+               start: float,
+               capacity: int,
+               ) -> "Segment":
+        meta = json.dumps({
+            "aspect": schema.aspect,
+            "version": schema.version,
+            "columns": schema.columns,
+            "resolution": resolution,
+            "start": start,
+        }).encode()
+        header_size = -(-(Header.size + len(meta)) // HeaderAlign) * HeaderAlign
+        with open(path, "wb") as f:
+            f.write(Header.pack(Magic, capacity, 0, len(meta), header_size) + meta)
+            f.truncate(header_size + 8 * capacity * (len(schema.columns) + 1))  # 稀疏文件，未写入的部分不占磁盘
+        return cls(path, writable=True)
+
+    @property
+    def count(self) -> int:
+        return struct.unpack_from("<Q", self._mmap, CountOffset)[0]
+
+    @property
+    def full(self) -> bool:
+        return self.count >= self.capacity
+
+    def append(self, timestamp: float, values: typing.Sequence[float]) -> None:
+        count = self.count
+        self._data[0, count] = timestamp
+        self._data[1:, count] = values
+        struct.pack_into("<Q", self._mmap, CountOffset, count + 1)  # 数据写完后再增加行数
+        return None
+
+    def read(self,
+             start: typing.Optional[float] = None,
+             end: typing.Optional[float] = None,
+             columns: typing.Optional[typing.Sequence[str]] = None,
+             ) -> typing.Tuple[typing.Any, typing.Dict[str, typing.Any]]:
+        """
+        返回 [start, end] 内的时间戳与各列（复制出来，可以在关闭段之后继续使用）
+        """
+        timestamps = self._data[0, :self.count]
+        lo = 0 if start is None else int(depend.np.searchsorted(timestamps, start, side="left"))
+        hi = len(timestamps) if end is None else int(depend.np.searchsorted(timestamps, end, side="right"))
+        index = {c: i for i, c in enumerate(self.schema.columns)}
+        names = self.schema.columns if columns is None else [c for c in columns if c in index]
+        return timestamps[lo:hi].copy(), {c: self._data[index[c] + 1, lo:hi].copy() for c in names}
+
+    def flush(self) -> None:
+        self._mmap.flush()
+        return None
+
+    def close(self) -> None:
+        self._data = None
+        self._mmap.close()
+        self._file.close()
+        return None
+
+
+class _Bucket(object):
+    """
+    下一级分辨率的累加器：同一桶内按列求均值，NaN 不参与计算
+    """
+    __slots__ = ("schema", "start", "sums", "counts")
+
+    def __init__(self, schema: RecordSchema, start: float) -> None:
+        self.schema = schema
+        self.start = start
+        self.sums = depend.np.zeros(len(schema.columns), dtype=depend.np.float64)
+        self.counts = depend.np.zeros(len(schema.columns), dtype=depend.np.int64)
+
+    def add(self, values: typing.Sequence[float]) -> None:
+        row = depend.np.asarray(values, dtype=depend.np.float64)
+        present = ~depend.np.isnan(row)
+        self.sums[present] += row[present]
+        self.counts += present
+        return None
+
+    def mean(self) -> typing.Any:
+        with depend.np.errstate(invalid="ignore", divide="ignore"):
+            return depend.np.where(self.counts > 0, self.sums / depend.np.maximum(self.counts, 1), depend.np.nan)
+
+
+def _segment_start(path: pathlib.Path) -> float:
+    return int(path.stem.split("-")[0]) / 1000
+
+
+class HistoryLog(object):
+    def __init__(self,
+                 directory: str = DefaultHistoryDir,
+                 resolutions: typing.Sequence[int] = HistoryResolutions,
+                 segment_seconds: typing.Optional[typing.Dict[int, int]] = None,
+                 retention: typing.Optional[typing.Dict[int, typing.Optional[int]]] = None,
+                 ) -> None:
+        self.directory = pathlib.Path(directory)  # 第一次写入时才创建
+        self.resolutions = tuple(sorted(resolutions))
+        self.segment_seconds = {**DefaultSegmentSeconds, **(segment_seconds or {})}
+        self.retention = {**DefaultHistoryRetention, **(retention or {})}
+        self.encoder = SnapshotEncoder()
+        self.intervals: typing.Dict[str, float] = {}  # 各 aspect 原始层的采样间隔（秒），由 ResourceChangesMonitor 设置
+        self._writers: typing.Dict[typing.Tuple[str, int], Segment] = {}
+        self._buckets: typing.Dict[typing.Tuple[str, int], _Bucket] = {}
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def _level_dir(self, aspect: str, resolution: int) -> pathlib.Path:
+        return self.directory.joinpath(aspect, str(resolution))
+
+    def _segments(self, aspect: str, resolution: int) -> typing.List[pathlib.Path]:
+        level_dir = self._level_dir(aspect, resolution)
+        if not level_dir.is_dir():
+            return []
+        return sorted(level_dir.glob("*.seg"), key=lambda p: (_segment_start(p), p.name))
+
+    def interval(self, aspect: str) -> float:
+        return self.intervals.get(aspect, self.resolutions[0])
+
+    def _compact(self, aspect: str, resolution: int, now: float) -> None:
+        """
+        删除超过保留期的段；段内所有行的时间都早于 起始时间 + segment_seconds
+        """
+        retention = self.retention.get(resolution)
+        if retention is None:
+            return None
+        for path in self._segments(aspect, resolution):
+            if _segment_start(path) + self.segment_seconds[resolution] < now - retention:
+                path.unlink(missing_ok=True)
+        return None
+
+    def _writer(self, aspect: str, resolution: int, schema: RecordSchema, timestamp: float) -> Segment:
+        key = (aspect, resolution)
+        writer = self._writers.get(key)
+        if writer is not None and (
+            writer.schema != schema or writer.full or timestamp >= writer.start + self.segment_seconds[resolution]
+        ):
+            self._writers.pop(key).close()
+            writer = None
+        if writer is None:
+            step = self.interval(aspect) if resolution == self.resolutions[0] else resolution  # 段内相邻两行的间隔
+            level_dir = self._level_dir(aspect, resolution)
+            level_dir.mkdir(parents=True, exist_ok=True)
+            self._compact(aspect, resolution, timestamp)
+            self._sequence += 1
+            writer = self._writers[key] = Segment.create(
+                level_dir.joinpath(f"{int(timestamp * 1000):015d}-{os.getpid()}-{self._sequence}.seg"),
+                schema=schema,
+                resolution=step,
+                start=timestamp,
+                capacity=max(int(-(-self.segment_seconds[resolution] // step)), 1),
+            )
+        return writer
+
+    def _write(self, aspect: str, level: int, schema: RecordSchema, timestamp: float, values: typing.Sequence[float]) -> None:
+        resolution = self.resolutions[level]
+        self._writer(aspect, resolution, schema, timestamp).append(timestamp, values)
+        if level + 1 >= len(self.resolutions):
+            return None
+        key, width = (aspect, self.resolutions[level + 1]), self.resolutions[level + 1]
+        bucket_start = timestamp // width * width
+        bucket = self._buckets.get(key)
+        if bucket is not None and (bucket.start != bucket_start or bucket.schema != schema):
+            self._flush_bucket(aspect, level + 1)
+            bucket = None
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket(schema, bucket_start)
+        bucket.add(values)
+        return None
+
+    def _flush_bucket(self, aspect: str, level: int) -> None:
+        bucket = self._buckets.pop((aspect, self.resolutions[level]), None)
+        if bucket is not None:
+            self._write(aspect, level, bucket.schema, bucket.start, bucket.mean())
+        return None
+
+    def append(self, aspect: str, snapshot: typing.Any, timestamp: typing.Optional[float] = None) -> None:
+        """
+        追加一次采样；在采样线程中调用
+        """
+        schema, values = self.encoder.values(aspect, snapshot)
+        with self._lock:
+            self._write(aspect, 0, schema, time.time() if timestamp is None else timestamp, values)
+        return None
+
+    def _resolution_for(self, aspect: str, start: typing.Optional[float]) -> int:
+        """
+        选择仍然保留着 start 时刻数据的最细分辨率；都不覆盖 start（或 start 为 None）时，
+        选择数据最早的分辨率，汇总层的时间戳是桶的起点，比较时加上桶宽
+        """
+        earliest = {}
+        for resolution in self.resolutions:
+            segments = self._segments(aspect, resolution)
+            if segments:
+                earliest[resolution] = _segment_start(segments[0])
+        if not earliest:
+            return self.resolutions[0]
+        if start is not None:
+            for resolution, first in earliest.items():
+                if first <= start:
+                    return resolution
+        covered = {
+            r: first + (r if r != self.resolutions[0] else 0) for r, first in earliest.items()
+        }
+        target = min(covered.values()) + self.interval(aspect)
+        return next(r for r, first in covered.items() if first <= target)
+
+    def query(self,
+              aspect: str,
+              start: typing.Optional[float] = None,
+              end: typing.Optional[float] = None,
+              columns: typing.Optional[typing.Sequence[str]] = None,
+              resolution: typing.Optional[float] = None,
+              ) -> typing.Dict[str, typing.Any]:
+        """
+        读取 [start, end] 内的历史（Unix 时间戳），不同 schema 版本之间缺失的列补 NaN；
+        resolution 可以是 60 / 3600，原始层可以写 1 或实际的采样间隔，其他值自动选择
+        """
+        self.compact(aspect)
+        if resolution == self.interval(aspect):
+            resolution = self.resolutions[0]
+        _resolution = resolution if resolution in self.resolutions else self._resolution_for(aspect, start)
+        span = self.segment_seconds[_resolution]
+        parts = []
+        version = 0  # 合并后的结果使用最新的 schema 版本
+        label = self.interval(aspect) if _resolution == self.resolutions[0] else _resolution
+        for path in self._segments(aspect, _resolution):
+            segment_start = _segment_start(path)
+            if (end is not None and segment_start > end) or (start is not None and segment_start + span < start):
+                continue
+            try:
+                segment = Segment(path)
+            except (OSError, ValueError):  # 已被清理或尚未写好头部
+                continue
+            try:
+                parts.append(segment.read(start=start, end=end, columns=columns))
+                version = max(version, segment.schema.version)
+                label = segment.resolution  # 原始层以写入时的采样间隔为准
+            finally:
+                segment.close()
+        names: typing.List[str] = []
+        for _, values in parts:
+            names.extend(c for c in values if c not in names)
+        timestamps = depend.np.concatenate([t for t, _ in parts]) if parts else depend.np.empty(0)
+        return {
+            "aspect": aspect,
+            "version": version,
+            "resolution": label,
+            "timestamp": timestamps,
+            "values": {
+                c: depend.np.concatenate([
+                    v[c] if c in v else depend.np.full(len(t), depend.np.nan) for t, v in parts
+                ]) if parts else depend.np.empty(0) for c in names
+            },
+        }
+
+    def compact(self, aspect: typing.Optional[str] = None, now: typing.Optional[float] = None) -> None:
+        """
+        删除超过保留期的段，aspect 为 None 时处理所有 aspect
+        """
+        _now = time.time() if now is None else now
+        if aspect is None:
+            aspects = [p.name for p in self.directory.iterdir() if p.is_dir()] if self.directory.is_dir() else []
+        else:
+            aspects = [aspect]
+        with self._lock:
+            for a in aspects:
+                for resolution in self.resolutions:
+                    self._compact(a, resolution, _now)
+        return None
+
+    def flush(self) -> None:
+        with self._lock:
+            for writer in self._writers.values():
+                writer.flush()
+        return None
+
+    def close(self) -> None:
+        """
+        写出未完成的桶并关闭所有段
+        """
+        with self._lock:
+            for level in range(1, len(self.resolutions)):
+                for aspect in [k[0] for k in self._buckets if k[1] == self.resolutions[level]]:
+                    self._flush_bucket(aspect, level)
+            for writer in self._writers.values():
+                writer.close()
+            self._writers.clear()
+        return None
+
+
+__all__ = [
+    "HistoryLog",
+    "Segment",
+]
@@ -0,0 +1,173 @@
+"""
+Prometheus 文本格式的指标导出
+
+所有指标都在事件发生时（请求结束、资源采样）预先聚合好，
+抓取 /metrics 时只做字符串拼接，不会再调用 psutil。
+"""
+from src.cerebrax.common_depend import (
+    typing,
+    bisect,
+    threading,
+)
+
+DefaultLatencyBuckets: typing.Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+# 字典类型的快照字段展开成标签时使用的标签名
+DictLabels: typing.Dict[str, str] = {
+    "disk_usages": "mountpoint",
+    "pernic_io_rates": "nic",
+    "perdisk_io_rates": "disk",
+    "processes": "process",
+    "quarantined": "mountpoint",
+}
+# psutil 中自启动以来单调递增的累计值字段：其下的数值导出为 counter，指标名加 _total
+CounterFields: typing.FrozenSet[str] = frozenset({
+    "cpu_times",
+    "cpu_stats",
+    "disk_io_counters",
+    "net_io_counters",
+    "io_counters",
+    "sin",
+    "sout",
+})
+ContentType = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: typing.Tuple[typing.Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels) + "}"
+
+
+def _flatten(name: str,
+             value: typing.Any,
+             labels: typing.Tuple[typing.Tuple[str, str], ...] = (),
+             field: str = "",
+             counter: bool = False,
+             ) -> typing.Iterator[typing.Tuple[str, typing.Tuple[typing.Tuple[str, str], ...], float, bool]]:
+    """
+    把 psutil 的 NamedTuple / dict 快照展开成 (指标名, 标签, 数值, 是否累计值)，非数值字段忽略
+    """
+    if isinstance(value, (bool, int, float)):
+        yield name, labels, float(value), counter
+    elif isinstance(value, tuple) and hasattr(value, "_fields"):
+        for field in value._fields:
+            yield from _flatten(f"{name}_{field}", getattr(value, field), labels, field, counter or field in CounterFields)
+    elif isinstance(value, typing.Mapping):
+        label = DictLabels.get(field, "key")
+        for k, v in value.items():
+            yield from _flatten(name, v, labels + ((label, str(k)),), field, counter)
+
+
+def flatten_snapshot(prefix: str, snapshot: typing.Any) -> typing.Iterator[typing.Tuple[str, float]]:
+    """
+    展开快照为 (带标签的列名, 数值)，例如 disk_disk_usages_percent{mountpoint="/"}
+    """
+    for name, labels, value, _ in _flatten(prefix, snapshot):
+        yield name + _format_labels(labels), value
+
+
+def render_snapshot(aspect: str, snapshot: typing.Any) -> str:
+    """
+    瞬时值导出为 gauge；累计值导出为 counter，按 Prometheus 的约定加 _total 后缀
+    """
+    lines: typing.Dict[str, typing.List[str]] = {}
+    types: typing.Dict[str, str] = {}
+    for name, labels, value, counter in _flatten(f"cerebrax_{aspect}", snapshot):
+        if counter:
+            name += "_total"
+        types[name] = "counter" if counter else "gauge"
+        lines.setdefault(name, []).append(f"{name}{_format_labels(labels)} {value!r}")
+    return "".join(
+        f"# TYPE {name} {types[name]}\n" + "\n".join(samples) + "\n" for name, samples in lines.items()
+    )
+
+
+class Histogram(object):
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: typing.Sequence[float] = DefaultLatencyBuckets) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)  # 最后一个是 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        return None
+
+    def render(self, name: str, labels: typing.Tuple[typing.Tuple[str, str], ...]) -> typing.List[str]:
+        lines, cumulative = [], 0
+        for le, count in zip(self.buckets, self.counts):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels + (('le', repr(le)),))} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {self.count}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {self.sum!r}")
+        lines.append(f"{name}_count{_format_labels(labels)} {self.count}")
+        return lines
+
+
+class MetricsCollector(object):
+    def __init__(self, buckets: typing.Sequence[float] = DefaultLatencyBuckets) -> None:
+        self._buckets = buckets
+        self._histograms: typing.Dict[str, Histogram] = {}
+        self._resources: typing.Dict[str, str] = {}  # aspect -> 已经渲染好的文本块
+        self._lock = threading.Lock()  # 采样可能发生在工作线程中
+
+    def observe_request(self, router: str, seconds: float) -> None:
+        histogram = self._histograms.get(router)
+        if histogram is None:
+            histogram = self._histograms.setdefault(router, Histogram(self._buckets))
+        histogram.observe(seconds)
+        return None
+
+    def update_resource(self, aspect: str, snapshot: typing.Any) -> None:
+        block = render_snapshot(aspect, snapshot)
+        with self._lock:
+            self._resources[aspect] = block
+        return None
+
+    @staticmethod
+    def render_proxy(proxy_handler: typing.Any) -> str:
+        running = bool(proxy_handler and proxy_handler.running)
+        pid = getattr(proxy_handler, "pid", None) or 0
+        text = (
+            "# TYPE cerebrax_proxy_running gauge\n"
+            f"cerebrax_proxy_running {int(running)}\n"
+            "# TYPE cerebrax_proxy_pid gauge\n"
+            f"cerebrax_proxy_pid {pid}\n"
+        )
+        restarts = getattr(proxy_handler, "restarts", None)
+        if restarts is not None:  # ProxySupervisor 托管时导出重启计数
+            text += (
+                "# TYPE cerebrax_proxy_restarts_total counter\n"
+                f"cerebrax_proxy_restarts_total {restarts}\n"
+                "# TYPE cerebrax_proxy_consecutive_failures gauge\n"
+                f"cerebrax_proxy_consecutive_failures {proxy_handler.failures}\n"
+            )
+        return text
+
+    def render(self, proxy_handler: typing.Any = None) -> str:
+        name = "cerebrax_request_duration_seconds"
+        lines = [f"# TYPE {name} histogram"]
+        for router, histogram in list(self._histograms.items()):
+            lines.extend(histogram.render(name, (("router", router),)))
+        with self._lock:
+            resources = "".join(self._resources.values())
+        return "\n".join(lines) + "\n" + self.render_proxy(proxy_handler) + resources
+
+
+__all__ = [
+    "Histogram",
+    "MetricsCollector",
+    "render_snapshot",
+    "flatten_snapshot",
+    "ContentType",
+]
@@ -0,0 +1,146 @@
+"""
+扁平、定长的快照记录
+
+psutil 快照是嵌套的 NamedTuple/dict，每次采样都要保留多层 Python 对象。
+这里把快照展开成固定列的 float64 记录，批量记录保存在 NumPy 结构化数组中，切片不复制数据；
+推送的帧与 /monitor/replay 都输出同一种列式 JSON，列名只出现一次。
+"""
+from src.cerebrax.common_depend import (
+    typing,
+    json,
+    threading,
+    functools,
+)
+from src.cerebrax import common_depend as depend  # 第一次编码批量记录时才导入 numpy
+from src.cerebrax._container import RecordSchema
+from src.cerebrax.monitor.metrics import flatten_snapshot
+
+DefaultBatchCapacity: int = 1024
+
+
+@functools.lru_cache(maxsize=256)
+def record_dtype(schema: RecordSchema) -> typing.Any:
+    # 列名包含标签（引号、花括号），放进定长子数组而不是作为字段名
+    return depend.np.dtype([("timestamp", "<f8"), ("values", "<f8", (len(schema.columns),))])
+
+
+class SnapshotEncoder(object):
+    """
+    为每个 aspect 维护当前的列布局，把快照编码为定长记录。
+    出现新列时生成新版本的 schema（旧列保持原有位置），缺失的列记为 NaN。
+    """
+    def __init__(self) -> None:
+        self._schemas: typing.Dict[str, RecordSchema] = {}
+        self._index: typing.Dict[str, typing.Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def schema(self, aspect: str) -> typing.Optional[RecordSchema]:
+        return self._schemas.get(aspect)
+
+    def _schema_for(self, aspect: str, row: typing.Dict[str, float]) -> RecordSchema:
+        schema = self._schemas.get(aspect)
+        if schema is not None and all(c in self._index[aspect] for c in row):
+            return schema
+        with self._lock:
+            schema = self._schemas.get(aspect)
+            columns = list(schema.columns) if schema else []
+            known = set(columns)
+            columns.extend(c for c in row if c not in known)
+            schema = RecordSchema(aspect, schema.version + 1 if schema else 1, tuple(columns))
+            self._schemas[aspect] = schema
+            self._index[aspect] = {c: i for i, c in enumerate(columns)}
+        return schema
+
+    def values(self, aspect: str, snapshot: typing.Any) -> typing.Tuple[RecordSchema, typing.List[float]]:
+        row = dict(flatten_snapshot(aspect, snapshot))
+        schema = self._schema_for(aspect, row)
+        return schema, [row.get(c, float("nan")) for c in schema.columns]
+
+
+
+class RecordBatch(object):
+    """
+    同一 schema 的一批记录，底层是按需倍增的结构化数组
+    """
+    def __init__(self, schema: RecordSchema, capacity: int = DefaultBatchCapacity) -> None:
+        self.schema = schema
+        self._array = depend.np.empty(max(int(capacity), 1), dtype=record_dtype(schema))
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def nbytes(self) -> int:
+        return self._size * record_dtype(self.schema).itemsize
+
+    def append(self, timestamp: float, values: typing.Sequence[float]) -> None:
+        if self._size == len(self._array):
+            array = depend.np.empty(len(self._array) * 2, dtype=self._array.dtype)
+            array[:self._size] = self._array
+            self._array = array
+        self._array[self._size] = (timestamp, values)
+        self._size += 1
+        return None
+
+    def view(self) -> typing.Any:
+        """
+        已写入部分的结构化数组视图（不复制）
+        """
+        return self._array[:self._size]
+
+    @property
+    def timestamps(self) -> typing.Any:
+        return self.view()["timestamp"]
+
+    @property
+    def values(self) -> typing.Any:
+        return self.view()["values"]
+
+    def column(self, name: str) -> typing.Any:
+        return self.values[:, self.schema.columns.index(name)]
+
+    @classmethod
+    def from_columns(cls,
+                     schema: RecordSchema,
+                     timestamps: typing.Any,
+                     columns: typing.Dict[str, typing.Any],
+                     ) -> "RecordBatch":
+        """
+        由时间戳数组与按列名组织的数组构造（例如 HistoryLog.query 的结果）
+        """
+        batch = cls(schema, capacity=len(timestamps))
+        view = batch._array[:len(timestamps)]
+        view["timestamp"] = timestamps
+        for i, name in enumerate(schema.columns):
+            view["values"][:, i] = columns[name]
+        batch._size = len(timestamps)
+        return batch
+
+    def to_json(self, **extra: typing.Any) -> str:
+        """
+        列式 JSON：列名只出现一次，NaN 输出为 null；extra 中的字段原样输出
+        """
+        values = self.values
+        missing = depend.np.isnan(values)
+        if missing.any():
+            rows = values.astype(object)
+            rows[missing] = None
+            rows = rows.tolist()
+        else:
+            rows = values.tolist()
+        return json.dumps({
+            "aspect": self.schema.aspect,
+            "version": self.schema.version,
+            **extra,
+            "columns": self.schema.columns,
+            "timestamp": self.timestamps.tolist(),
+            "values": rows,
+        }, separators=(",", ":"))
+
+
+__all__ = [
+    "SnapshotEncoder",
+    "RecordBatch",
+    "record_dtype",
+]
@@ -2,31 +2,47 @@ from src.cerebrax.common_depend import (
     asyncio,
     typing,
     uuid,
+    time,
+    functools,
 )
 from src.cerebrax._types import (
     ResourceTypes,
     CommonIterable,
     CollectionMethods,
     Interval,
+    DefaultIdleSlowdown,
 )
+from src.cerebrax.monitor.metrics import MetricsCollector
+from src.cerebrax.monitor.series import TimeSeriesStore
+from src.cerebrax.monitor.alerts import AlertEngine
+from src.cerebrax.monitor.stream import SnapshotStream, encode_frame
+from src.cerebrax.monitor.history import HistoryLog
+from src.cerebrax.monitor.broadcast import BroadcastChannel, Cursor, DefaultChannelCapacity
+from src.cerebrax.utils.collector import RateTrackers, get_network_snapshot, get_disk_snapshot
 
 
 class AsyncGeneratorCompatibleLayer(object):
     def __init__(self,
                  async_generator: typing.AsyncGenerator[typing.Any, None],
-                 communication_queue: asyncio.Queue,
+                 cursor: Cursor,
                  async_event: asyncio.Event,
                  ) -> None:
         self._async_generator = async_generator
-        self._communication_queue = communication_queue
+        self._cursor = cursor
         self._async_event = async_event
 
     def __aiter__(self):
         return self._async_generator
 
     async def __anext__(self):
-        async for item in self._async_generator:
-            yield item
+        return await self._async_generator.__anext__()
+
+    @property
+    def lagged(self) -> int:
+        """
+        消费太慢、被生产者覆盖而没有读到的快照数
+        """
+        return self._cursor.lagged
 
     def pause(self):
         self._async_event.clear()
@@ -35,82 +51,234 @@ class AsyncGeneratorCompatibleLayer(object):
         self._async_event.set()
 
     def clear(self):
-        while not self._communication_queue.empty():
-            try:
-                self._communication_queue.get_nowait()
-            except asyncio.QueueEmpty:
-                break
+        self._cursor.skip()
 
 class ResourceChangesMonitor(object):
-    def __init__(self, call: typing.Callable, aspect: CommonIterable = None, interval: Interval = None) -> None:
+    def __init__(self,
+                 call: typing.Callable,
+                 aspect: CommonIterable = None,
+                 interval: Interval = None,
+                 metrics: typing.Optional[MetricsCollector] = None,  # 采样时同步预聚合指标
+                 series: typing.Optional[TimeSeriesStore] = None,  # 采样时写入环形缓冲历史
+                 multiples: typing.Optional[typing.Dict[str, int]] = None,  # 各 aspect 的采样间隔 = interval * 倍数
+                 alerts: typing.Optional[AlertEngine] = None,  # 每次采样后评估告警规则
+                 slowdown: int = DefaultIdleSlowdown,  # 有告警规则的 aspect 空闲时最多放慢的倍数
+                 stream: typing.Optional[SnapshotStream] = None,  # 有远程订阅者时推送序列化好的快照
+                 history: typing.Optional[HistoryLog] = None,  # 采样时追加到磁盘上的历史日志
+                 pernic: bool = False,  # network 同时采集每块网卡的速率
+                 perdisk: bool = False,  # disk 同时采集每块磁盘的速率
+                 ) -> None:
         self.aspect = aspect if aspect else ResourceTypes
-        self.queues = {k: asyncio.Queue(maxsize=128) for k in self.aspect}
+        self.channels = {k: BroadcastChannel(DefaultChannelCapacity) for k in self.aspect}  # 每个消费者持有独立游标
         self.events = {k: asyncio.Event() for k in self.aspect}
         self._event_to_set()
         self.call = call
         self.interval = 1 if not interval else interval
-        self.methods = CollectionMethods
+        self.rates = RateTrackers()  # 速率按本监控两次采样之间计算，不与其他监控共享
+        self.methods = {
+            **CollectionMethods,
+            "network": functools.partial(get_network_snapshot, pernic=pernic, rates=self.rates),
+            "disk": functools.partial(get_disk_snapshot, perdisk=perdisk, rates=self.rates),
+        }
         self.producers = set()
-        self.consumer = None
+        self.consumer = None  # call 对应的消费者
+        self.consumers: typing.Set[asyncio.Task] = set()  # 包括 subscribe() 添加的所有消费者
         self.running = False
+        self.metrics = metrics
+        self.series = series
+        self.latest: typing.Dict[str, typing.Any] = {}  # 每个 aspect 最近一次的快照
+        _multiples = multiples if multiples else {}
+        self.multiples = {a: max(int(_multiples.get(a, 1)), 1) for a in self.aspect}
+        self.alerts = alerts
+        self.stream = stream
+        self.history = history
+        if history is not None:  # 历史的原始层按实际采样间隔标注分辨率
+            history.intervals.update({a: self.interval * self.multiples[a] for a in self.aspect})
+        self.slowdown = max(int(slowdown), 1)
+        self.current = dict(self.multiples)  # 自适应调整后的当前倍数
+        self.next_due = {a: 0 for a in self.aspect}  # 下一次采样的 tick
+        self.costs: typing.Dict[str, float] = {}  # 每个 aspect 最近一次的采集耗时(ms)
+        self.ticks = 0
+        self.overruns = 0  # 采集耗时超过一个 tick 而被跳过的 tick 数
+        self.last_cost = 0.0  # 最近一次整轮采集的耗时(ms)
+        self.total_cost = 0.0
+        self.errors: typing.Dict[str, int] = {a: 0 for a in self.aspect}  # 每个 aspect 采集或写入失败的次数
+        self.last_errors: typing.Dict[str, str] = {}  # 每个 aspect 最近一次失败的位置与原因
 
     def _event_to_set(self):
         for e in self.events.values():
             e.set()
 
-    async def _create_a_producer(self, i: str) -> None:
-        queue, event = self.queues[i], self.events[i]
-        while True:
-            if not event.is_set():
-                await event.wait()
-            snapshot = self.methods[i]()
+    def _failed(self, aspect: str, stage: str, e: BaseException) -> None:
+        self.errors[aspect] = self.errors.get(aspect, 0) + 1
+        self.last_errors[aspect] = f"{stage}: {str(e) or e.__class__.__name__}"
+        return None
+
+    def _collect(self, aspects: typing.List[str]) -> typing.Tuple[typing.Dict[str, typing.Any], typing.List[typing.Any], typing.List[typing.Any]]:
+        """
+        在工作线程中一次性采集本 tick 到期的所有 aspect，同时完成指标与历史的预聚合、告警评估，
+        有远程订阅者时顺带把快照序列化一次。
+        每个 aspect 的采集与每个写入目标单独捕获异常并计入 errors，不影响其他 aspect 与其他目标
+        """
+        snapshots, events, frames = {}, [], []
+        encode = self.stream is not None and self.stream.subscribers > 0
+        for a in aspects:
+            start = time.perf_counter()
             try:
-                await queue.put(snapshot)
-            except asyncio.CancelledError:
-                raise asyncio.CancelledError()
-            await asyncio.sleep(self.interval)
+                snapshot = self.methods[a]()
+            except Exception as e:
+                self._failed(a, "collect", e)
+                continue
+            sinks = (
+                ("metrics", self.metrics and self.metrics.update_resource),
+                ("series", self.series and self.series.record),
+                ("history", self.history and self.history.append),
+            )
+            for stage, sink in sinks:
+                if sink:
+                    try:
+                        sink(a, snapshot)
+                    except Exception as e:
+                        self._failed(a, stage, e)
+            if self.alerts is not None:
+                try:
+                    events.extend(self.alerts.evaluate(a, snapshot))
+                except Exception as e:
+                    self._failed(a, "alerts", e)
+            if encode:
+                try:
+                    frames.append(encode_frame(a, snapshot, encoder=self.stream.encoder))
+                except Exception as e:
+                    self._failed(a, "stream", e)
+            self.costs[a] = (time.perf_counter() - start) * 1000
+            snapshots[a] = snapshot
+        return snapshots, events, frames
 
-    async def create_producer(self):
-        for a in self.aspect:
-            task = asyncio.create_task(self._create_a_producer(a))
-            self.producers.add(task)
+    def _adapt(self, aspect: str) -> int:
+        """
+        有告警规则的 aspect：接近阈值时每个 tick 都采样，否则逐步放慢到 multiples * slowdown
+        """
+        if self.alerts is None or aspect not in self.alerts.aspects:
+            return self.multiples[aspect]
+        if self.alerts.near(aspect):
+            return 1
+        return min(self.current[aspect] * 2, self.multiples[aspect] * self.slowdown)
+
+    def _publish(self, aspect: str, snapshot: typing.Any) -> None:
+        self.channels[aspect].publish(snapshot)  # 写入环形缓冲，消费者慢不阻塞采样
+        return None
 
-    async def _create_a_consumer(self, i: str) -> typing.AsyncGenerator[typing.Any, None]:
-        queue, event = self.queues[i], self.events[i]
+    async def _sampler(self) -> None:
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        tick = 0
+        self.next_due = {a: 0 for a in self.aspect}  # 重新启动时 tick 从 0 开始
         while True:
+            # 暂停的 aspect 不采集
+            due = [a for a in self.aspect if self.next_due[a] <= tick and self.events[a].is_set()]
+            if due:
+                start = time.perf_counter()
+                snapshots, events, frames = await asyncio.to_thread(self._collect, due)
+                self.last_cost = (time.perf_counter() - start) * 1000
+                self.total_cost += self.last_cost
+                for a, snapshot in snapshots.items():
+                    self.latest[a] = snapshot
+                    self._publish(a, snapshot)
+                    self.current[a] = self._adapt(a)
+                for a in due:  # 采集失败的 aspect 按原节拍重试
+                    self.next_due[a] = tick + self.current[a]
+                if events:
+                    try:
+                        self.alerts.publish(events)
+                    except Exception as e:
+                        for a in snapshots:
+                            self._failed(a, "alerts", e)
+                if frames:
+                    try:
+                        self.stream.publish(frames)
+                    except Exception as e:
+                        for a in snapshots:
+                            self._failed(a, "stream", e)
+            self.ticks += 1
+            tick += 1
+            deadline += self.interval
+            now = loop.time()
+            if now > deadline:  # 采集超时，跳过错过的 tick，保持节拍对齐
+                missed = int((now - deadline) // self.interval) + 1
+                self.overruns += missed
+                tick += missed
+                deadline += missed * self.interval
+            await asyncio.sleep(deadline - now)
+
+    async def create_producer(self):
+        task = asyncio.create_task(self._sampler())
+        self.producers.add(task)
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "interval": self.interval,
+            "multiples": self.multiples,
+            "current_multiples": dict(self.current),
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "last_cost_ms": self.last_cost,
+            "mean_cost_ms": self.total_cost / self.ticks if self.ticks else 0.0,
+            "aspect_cost_ms": dict(self.costs),
+            "errors": dict(self.errors),
+            "last_errors": dict(self.last_errors),
+        }
+
+    async def _create_a_consumer(self, i: str, cursor: Cursor) -> typing.AsyncGenerator[typing.Any, None]:
+        event = self.events[i]
+        async for item in cursor:
             if not event.is_set():
                 await event.wait()
-            try:
-                item = await queue.get()
-                yield item
-            except asyncio.CancelledError:
-                raise asyncio.CancelledError()
+                continue  # 暂停期间积压的快照不再交付
+            yield item
 
-    def create_consumer(self):
-        async_generators = {
-            a: AsyncGeneratorCompatibleLayer(
-                async_generator=self._create_a_consumer(a),
-                communication_queue=self.queues[a],
+    def subscribe(self, call: typing.Callable) -> asyncio.Task:
+        """
+        增加一个消费者：call 接收 {aspect: AsyncGeneratorCompatibleLayer}，
+        每个消费者从各自的游标读取同一份快照，互不抢占
+        """
+        async_generators = {}
+        for a in self.aspect:
+            cursor = self.channels[a].cursor()
+            async_generators[a] = AsyncGeneratorCompatibleLayer(
+                async_generator=self._create_a_consumer(a, cursor),
+                cursor=cursor,
                 async_event=self.events[a],
-            ) for a in self.aspect}
-        self.consumer = asyncio.create_task(self.call(async_generators))
+            )
+        task = asyncio.create_task(call(async_generators))
+        self.consumers.add(task)
+        task.add_done_callback(self.consumers.discard)
+        return task
 
+    def create_consumer(self):
+        self.consumer = self.subscribe(self.call)
 
     async def start(self):
         if not self.running:
+            for channel in self.channels.values():
+                channel.reopen()
             self.create_consumer()
             await self.create_producer()
             self.running = True
 
     async def stop(self):
         if self.running:
+            # 先停生产者，再关闭通道；所有消费者（包括 subscribe() 添加的）都被取消并等待结束
             for p in self.producers:
-                try:
-                    p.cancel()
-                    await p
-                except asyncio.CancelledError:
-                    pass
+                p.cancel()
+            await asyncio.gather(*self.producers, return_exceptions=True)
+            for channel in self.channels.values():
+                channel.close()
+            consumers = list(self.consumers)
+            for c in consumers:
+                c.cancel()
+            await asyncio.gather(*consumers, return_exceptions=True)
             self.producers.clear()
+            self.consumers.clear()
             self.consumer = None
             self.running = False
 
@@ -0,0 +1,136 @@
+"""
+资源快照的环形缓冲时序存储
+
+每个 aspect 一个固定容量的二维 float64 数组（行是采样，列是 psutil 字段），
+追加为 O(1) 的单行写入，窗口查询基于 NumPy 向量化计算，不保留快照对象本身。
+"""
+from src.cerebrax.common_depend import (
+    typing,
+    time,
+    threading,
+)
+from src.cerebrax import common_depend as depend  # 第一次采样时才导入 numpy
+from src.cerebrax.monitor.metrics import flatten_snapshot
+
+DefaultCapacity = 3600  # 1 Hz 采样时保留一小时
+DefaultPercentiles: typing.Tuple[float, ...] = (50, 90, 99)
+
+
+class RingBuffer(object):
+    def __init__(self, columns: typing.Sequence[str], capacity: int = DefaultCapacity) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be greater than 0.")
+        self.columns = list(columns)
+        self.index = {c: i for i, c in enumerate(self.columns)}
+        self.capacity = capacity
+        self.timestamps = depend.np.zeros(capacity, dtype=depend.np.float64)
+        self.values = depend.np.full((capacity, len(self.columns)), depend.np.nan, dtype=depend.np.float64)
+        self._head = 0  # 下一次写入的位置
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def extend(self, columns: typing.Iterable[str]) -> None:
+        """
+        增加新的列（新挂载点、网卡、进程），已有的行在新列上记为 NaN
+        """
+        new = [c for c in columns if c not in self.index]
+        if not new:
+            return None
+        for c in new:
+            self.index[c] = len(self.columns)
+            self.columns.append(c)
+        padding = depend.np.full((self.capacity, len(new)), depend.np.nan, dtype=depend.np.float64)
+        self.values = depend.np.hstack((self.values, padding))
+        return None
+
+    def append(self, timestamp: float, row: typing.Mapping[str, float]) -> None:
+        if any(c not in self.index for c in row):
+            self.extend(row.keys())
+        values = self.values[self._head]
+        values.fill(depend.np.nan)  # 本次缺失的列（如卸载的挂载点）记为 NaN
+        for column, value in row.items():
+            values[self.index[column]] = value
+        self.timestamps[self._head] = timestamp
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+        return None
+
+    def _ordered(self) -> typing.Tuple[typing.Any, typing.Any]:
+        if self._size < self.capacity:
+            return self.timestamps[:self._size], self.values[:self._size]
+        order = depend.np.r_[self._head:self.capacity, 0:self._head]
+        return self.timestamps[order], self.values[order]
+
+    def window(self, seconds: typing.Optional[float] = None, now: typing.Optional[float] = None
+               ) -> typing.Tuple[typing.Any, typing.Any]:
+        """
+        返回最近 seconds 秒内按时间排序的 (timestamps, values)，seconds 为 None 时返回全部
+        """
+        timestamps, values = self._ordered()
+        if seconds is None:
+            return timestamps, values
+        start = (time.time() if now is None else now) - seconds
+        i = int(depend.np.searchsorted(timestamps, start, side="left"))
+        return timestamps[i:], values[i:]
+
+    def stats(self,
+              seconds: typing.Optional[float] = None,
+              percentiles: typing.Sequence[float] = DefaultPercentiles,
+              now: typing.Optional[float] = None,
+              ) -> typing.Dict[str, typing.Any]:
+        timestamps, values = self.window(seconds=seconds, now=now)
+        result: typing.Dict[str, typing.Any] = {"samples": int(len(timestamps)), "columns": {}}
+        if not len(timestamps):
+            return result
+        valid = ~depend.np.all(depend.np.isnan(values), axis=0)  # 窗口内完全没有数据的列跳过
+        data = values[:, valid]
+        names = [c for c, v in zip(self.columns, valid) if v]
+        aggregates = {
+            "min": depend.np.nanmin(data, axis=0),
+            "max": depend.np.nanmax(data, axis=0),
+            "mean": depend.np.nanmean(data, axis=0),
+            "last": data[-1],
+        }
+        if percentiles:
+            for p, row in zip(percentiles, depend.np.nanpercentile(data, list(percentiles), axis=0)):
+                aggregates[f"p{p:g}"] = row
+        result["columns"] = {
+            name: {k: float(v[i]) for k, v in aggregates.items()} for i, name in enumerate(names)
+        }
+        result["start"], result["end"] = float(timestamps[0]), float(timestamps[-1])
+        return result
+
+
+class TimeSeriesStore(object):
+    def __init__(self, capacity: int = DefaultCapacity) -> None:
+        self.capacity = capacity
+        self.buffers: typing.Dict[str, RingBuffer] = {}
+        self._lock = threading.Lock()  # 采样可能发生在工作线程中
+
+    def record(self, aspect: str, snapshot: typing.Any, timestamp: typing.Optional[float] = None) -> None:
+        row = dict(flatten_snapshot(aspect, snapshot))
+        with self._lock:
+            buffer = self.buffers.get(aspect)
+            if buffer is None:  # 之后出现的新列由 RingBuffer.append 扩展
+                buffer = self.buffers[aspect] = RingBuffer(columns=row.keys(), capacity=self.capacity)
+            buffer.append(time.time() if timestamp is None else timestamp, row)
+        return None
+
+    def stats(self,
+              aspect: str,
+              seconds: typing.Optional[float] = None,
+              percentiles: typing.Sequence[float] = DefaultPercentiles,
+              ) -> typing.Optional[typing.Dict[str, typing.Any]]:
+        with self._lock:
+            buffer = self.buffers.get(aspect)
+            if buffer is None:
+                return None
+            return buffer.stats(seconds=seconds, percentiles=percentiles)
+
+
+__all__ = [
+    "RingBuffer",
+    "TimeSeriesStore",
+]
@@ -0,0 +1,113 @@
+"""
+把资源快照推送给远程订阅者（SSE / WebSocket）
+
+每个快照在采样线程中展开为定长记录并序列化一次（RecordBatch 的列式 JSON），所有订阅者共享同一份文本；
+每个订阅者有独立的有界缓冲，满了丢弃最旧的帧，慢客户端不会拖慢采样或其他客户端。
+"""
+from src.cerebrax.common_depend import (
+    asyncio,
+    typing,
+    time,
+)
+from src.cerebrax.monitor.records import SnapshotEncoder, RecordBatch
+
+DefaultBufferSize: int = 16
+
+
+class Frame(typing.NamedTuple):
+    aspect: str
+    text: str  # JSON，WebSocket 直接发送
+    sse: bytes  # 已经编码好的 SSE 事件
+
+
+def encode_frame(aspect: str,
+                 snapshot: typing.Any,
+                 timestamp: typing.Optional[float] = None,
+                 encoder: typing.Optional[SnapshotEncoder] = None,  # 同一个流共用，列顺序保持稳定
+                 ) -> Frame:
+    schema, values = (encoder or SnapshotEncoder()).values(aspect, snapshot)
+    batch = RecordBatch(schema, capacity=1)
+    batch.append(time.time() if timestamp is None else timestamp, values)
+    text = batch.to_json()
+    return Frame(aspect, text, f"event: {aspect}\ndata: {text}\n\n".encode())
+
+
+class Subscriber(object):
+    __slots__ = ("aspects", "every", "queue", "dropped", "_counts")
+
+    def __init__(self,
+                 aspects: typing.Optional[typing.Iterable[str]] = None,  # None 表示全部
+                 every: int = 1,  # 降采样：每个 aspect 每 every 帧推送一帧
+                 maxsize: int = DefaultBufferSize,
+                 ) -> None:
+        self.aspects = set(aspects) if aspects else None
+        self.every = max(int(every), 1)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max(int(maxsize), 1))
+        self.dropped = 0
+        self._counts: typing.Dict[str, int] = {}
+
+    def offer(self, frame: Frame) -> None:
+        if self.aspects is not None and frame.aspect not in self.aspects:
+            return None
+        count = self._counts.get(frame.aspect, 0)
+        self._counts[frame.aspect] = count + 1
+        if count % self.every:
+            return None
+        try:
+            self.queue.put_nowait(frame)
+        except asyncio.QueueFull:
+            self.queue.get_nowait()
+            self.queue.put_nowait(frame)
+            self.dropped += 1
+        return None
+
+
+class SnapshotStream(object):
+    def __init__(self) -> None:
+        self._subscribers: typing.Set[Subscriber] = set()
+        self.encoder = SnapshotEncoder()  # 帧的列布局，新列出现时 version 加一
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self,
+                  aspects: typing.Optional[typing.Iterable[str]] = None,
+                  every: int = 1,
+                  maxsize: int = DefaultBufferSize,
+                  ) -> Subscriber:
+        subscriber = Subscriber(aspects=aspects, every=every, maxsize=maxsize)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+        return None
+
+    async def frames(self,
+                     aspects: typing.Optional[typing.Iterable[str]] = None,
+                     every: int = 1,
+                     maxsize: int = DefaultBufferSize,
+                     ) -> typing.AsyncGenerator[Frame, None]:
+        subscriber = self.subscribe(aspects=aspects, every=every, maxsize=maxsize)
+        try:
+            while True:
+                yield await subscriber.queue.get()
+        finally:
+            self.unsubscribe(subscriber)
+
+    def publish(self, frames: typing.Iterable[Frame]) -> None:
+        """
+        在事件循环中把本 tick 的帧分发给所有订阅者
+        """
+        for frame in frames:
+            for subscriber in list(self._subscribers):
+                subscriber.offer(frame)
+        return None
+
+
+__all__ = [
+    "Frame",
+    "SnapshotStream",
+    "encode_frame",
+]
@@ -1,75 +1,304 @@
 from src.cerebrax.common_depend import (
+    re,
     typing,
+    asyncio,
+    hashlib,
+    pathlib,
     platform as pf,
     aiopath,
     httpx
 )
-from src.cerebrax.internal import (
-    httpx_proxy_client as client,
-)
+from src.cerebrax import common_depend as depend  # cryptography 只在需要生成 p12 时导入
+from src.cerebrax import internal
 from src.cerebrax._types import (
     Platforms,
     OtherPlatformFormat,
+    CertificateFormats,
+    DefaultCertificateCacheDir,
 )
 
+CertificateUrl = "http://mitm.it/cert/{}"
+PemCertificate = re.compile(rb"-----BEGIN CERTIFICATE-----.+?-----END CERTIFICATE-----\n?", re.S)
+Fetcher = typing.Callable[[str], typing.Awaitable[bytes]]
+
+
+async def download_certificate(fmt: str, proxy: typing.Optional[str] = None) -> bytes:
+    """
+    经过运行中的代理从 mitm.it 下载证书，proxy 为代理地址，默认 127.0.0.1:8080
+    """
+    try:
+        response = await internal.proxy_client(proxy).get(url=CertificateUrl.format(fmt))
+        response.raise_for_status()
+    except httpx.HTTPError:
+        raise httpx.HTTPError("Proxy service not enabled.")
+    return response.content
+
+
+def proxy_fetcher(proxy: typing.Optional[str] = None) -> Fetcher:
+    async def fetch(fmt: str) -> bytes:
+        return await download_certificate(fmt, proxy=proxy)
+    return fetch
+
+
+def sync_export_certificate(confdir: str, fmt: str) -> bytes:
+    """
+    直接从 mitmproxy 配置目录读取 CA，缺少对应格式的文件时在本地转换
+    """
+    base = pathlib.Path(confdir)
+    cert_file = base.joinpath(f"mitmproxy-ca-cert.{fmt}")
+    if cert_file.is_file():
+        return cert_file.read_bytes()
+    pem_file = base.joinpath("mitmproxy-ca-cert.pem")
+    if pem_file.is_file():
+        pem = pem_file.read_bytes()
+    else:  # mitmproxy-ca.pem 同时包含私钥与证书，只取证书部分
+        match = PemCertificate.search(base.joinpath("mitmproxy-ca.pem").read_bytes())
+        if match is None:
+            raise FileNotFoundError(f"No CA certificate found in {confdir}")
+        pem = match.group(0)
+    if fmt in {"pem", "cer"}:  # mitmproxy 提供的 .cer 与 pem 内容相同
+        return pem
+    certificate = depend.x509.load_pem_x509_certificate(pem)
+    return depend.pkcs12.serialize_key_and_certificates(
+        name=b"mitmproxy",
+        key=None,
+        cert=certificate,
+        cas=None,
+        encryption_algorithm=depend.serialization.NoEncryption(),
+    )
+
+
+def confdir_fetcher(confdir: str) -> Fetcher:
+    async def fetch(fmt: str) -> bytes:
+        return await asyncio.to_thread(sync_export_certificate, confdir, fmt)  # 文件读取与转换放到工作线程
+    return fetch
+
+
+def confdir_generation(confdir: str) -> typing.Any:
+    """
+    以 CA 文件的修改时间作为 generation，mitmproxy 重新生成 CA 时缓存随之失效
+    """
+    for name in ("mitmproxy-ca-cert.pem", "mitmproxy-ca.pem"):
+        path = pathlib.Path(confdir).joinpath(name)
+        if path.is_file():
+            return "confdir", str(path), path.stat().st_mtime_ns
+    raise FileNotFoundError(f"No CA certificate found in {confdir}")
+
+
+class CertificateCache(object):
+    """
+    按 CA 指纹(pem 的 sha256)寻址的证书缓存，内存优先，其次磁盘。
+
+    generation 标识一次代理运行（例如 pid 与启动时间），只有 generation 变化时
+    才重新下载 pem 计算指纹；指纹不变则继续使用原有缓存，指纹变化（代理换了 CA）
+    时缺失的格式会在一个并发批次中全部下载。
+    """
+    def __init__(self, cache_dir: typing.Optional[str] = DefaultCertificateCacheDir) -> None:
+        self._cache_dir = aiopath.AsyncPath(cache_dir) if cache_dir else None
+        self._memory: typing.Dict[typing.Tuple[str, str], bytes] = {}  # (fingerprint, format) -> data
+        self._generation: typing.Any = None
+        self._fingerprint: typing.Optional[str] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def fingerprint(self) -> typing.Optional[str]:
+        return self._fingerprint
+
+    def invalidate(self) -> None:
+        self._generation = None
+        self._fingerprint = None
+        return None
+
+    async def _read_disk(self, fingerprint: str, fmt: str) -> typing.Optional[bytes]:
+        if self._cache_dir is None:
+            return None
+        path = self._cache_dir.joinpath(fingerprint, f"mitmproxy-ca-cert.{fmt}")
+        if not await path.is_file():
+            return None
+        return await path.read_bytes()
+
+    async def _write_disk(self, fingerprint: str, fmt: str, data: bytes) -> None:
+        if self._cache_dir is None:
+            return None
+        directory = self._cache_dir.joinpath(fingerprint)
+        await directory.mkdir(parents=True, exist_ok=True)
+        await directory.joinpath(f"mitmproxy-ca-cert.{fmt}").write_bytes(data)
+        return None
+
+    async def _refresh(self, fetch: Fetcher) -> None:
+        pem = await fetch("pem")
+        fingerprint = hashlib.sha256(pem).hexdigest()
+        self._memory[(fingerprint, "pem")] = pem
+        await self._write_disk(fingerprint, "pem", pem)
+        missing = []
+        for fmt in CertificateFormats:
+            if (fingerprint, fmt) in self._memory:
+                continue
+            data = await self._read_disk(fingerprint, fmt)
+            if data is None:
+                missing.append(fmt)
+            else:
+                self._memory[(fingerprint, fmt)] = data
+        downloads = await asyncio.gather(*(fetch(fmt) for fmt in missing))
+        for fmt, data in zip(missing, downloads):
+            self._memory[(fingerprint, fmt)] = data
+            await self._write_disk(fingerprint, fmt, data)
+        # 旧 CA 的内存条目不再有用
+        for key in [k for k in self._memory if k[0] != fingerprint]:
+            del self._memory[key]
+        self._fingerprint = fingerprint
+        return None
+
+    async def get(self,
+                  fmt: str,
+                  generation: typing.Any = None,
+                  fetch: typing.Optional[Fetcher] = None,  # 默认经过代理下载
+                  ) -> bytes:
+        if self._fingerprint is None or generation != self._generation:
+            async with self._lock:  # 并发请求只触发一次刷新
+                if self._fingerprint is None or generation != self._generation:
+                    await self._refresh(fetch if fetch else download_certificate)
+                    self._generation = generation
+        return self._memory[(self._fingerprint, fmt)]
+
+
+certificate_cache = CertificateCache()
+
+
+def resolve_certificate(platform: typing.Optional[str] = None,
+                        other_platform_format: typing.Optional[str] = None,
+                        ) -> typing.Tuple[str, str]:
+    """
+    返回 (平台名, 证书格式)
+    """
+    cert_platform = (platform or pf.system()).lower()
+    if cert_platform == "darwin":
+        cert_platform = "macos"
+    if cert_platform == "windows":
+        return cert_platform, "p12"
+    if cert_platform == "android":
+        return cert_platform, "cer"
+    if cert_platform in {"linux", "ios", "macos", "firefox"}:
+        return cert_platform, "pem"
+    if cert_platform in {"other-platform", "other-platforms"}:
+        return "other-platform", other_platform_format if other_platform_format in {"pem", "p12"} else "pem"
+    raise ValueError(
+        f'Platform "{platform}" is not supported.'
+        f' The platform must be "windows", "linux", "ios", "macos", "android", "firefox" or "other-platform".'
+    )
+
+
 class CertificateInstaller(object):
-    __slots__ = ('url', 'proxy', 'certificate_links')
+    __slots__ = ('proxy', 'cache', 'generation', 'confdir')
 
-    def __init__(self, proxy: str = "http://localhost:8080") -> None:
+    def __init__(self,
+                 proxy: typing.Optional[str] = None,  # 下载证书经过的代理地址，默认 127.0.0.1:8080
+                 cache: typing.Optional[CertificateCache] = None,
+                 generation: typing.Any = None,  # 代理的运行标识，变化时重新校验 CA 指纹
+                 confdir: typing.Optional[str] = None,  # 指定时直接读取 mitmproxy 配置目录，不需要代理在运行
+                 ) -> None:
         self.proxy = proxy
-        self.certificate_links = {
-            "windows": "http://mitm.it/cert/p12",
-            "linux": "http://mitm.it/cert/pem",
-            "ios": "http://mitm.it/cert/pem",
-            "macos": "http://mitm.it/cert/pem",
-            "android": "http://mitm.it/cert/cer",
-            "firefox": "http://mitm.it/cert/pem",
-            "other-platforms": {
-                "p12": "http://mitm.it/cert/p12",
-                "pem": "http://mitm.it/cert/pem",
-            }
-        }
+        self.cache = cache if cache else certificate_cache
+        self.generation = generation
+        self.confdir = confdir
+
+    async def export(self,
+                     platform: typing.Optional[Platforms] = None,
+                     other_platform_format: typing.Optional[OtherPlatformFormat] = None,
+                     ) -> typing.Tuple[str, bytes]:
+        """
+        返回 (文件名, 证书内容)
+        """
+        cert_platform, cert_format = resolve_certificate(
+            platform=platform,
+            other_platform_format=other_platform_format,
+        )
+        data = await self._get(cert_format)
+        return f"mitmproxy-ca-cert-{cert_platform}.{cert_format}", data
+
+    async def _get(self, cert_format: str) -> bytes:
+        if self.confdir:
+            return await self.cache.get(
+                cert_format,
+                generation=await asyncio.to_thread(confdir_generation, self.confdir),
+                fetch=confdir_fetcher(self.confdir),
+            )
+        return await self.cache.get(cert_format, generation=self.generation, fetch=proxy_fetcher(self.proxy))
+
+    @staticmethod
+    async def _write(save_dir: typing.Optional[str], filename: str, data: bytes) -> str:
+        cert_save_dir = aiopath.AsyncPath(save_dir or ".")
+        if not await cert_save_dir.is_dir():
+            await cert_save_dir.mkdir(parents=True, exist_ok=True)
+        cert_file = cert_save_dir.joinpath(filename)
+        # 内容相同则不再重写文件
+        if not await cert_file.is_file() or await cert_file.read_bytes() != data:
+            await cert_file.write_bytes(data)
+        return str(cert_file)
 
     async def install(self,
                       platform: typing.Optional[Platforms] = None,
                       other_platform_format: typing.Optional[OtherPlatformFormat] = None,
                       save_dir: typing.Optional[str] = None,
                       ) -> str:
-        cert_platform = platform or pf.system()
-        if cert_platform and cert_platform.lower() not in self.certificate_links.keys():
-            raise ValueError(
-                f'Platform "{platform}" is not supported.'
-                f' The platform must be "windows", "linux", "ios", "macos", "android", "firefox" or "other-platforms".'
-            )
-        if cert_platform == 'Darwin':
-            cert_platform = 'macOS'
-        cert_save_dir = aiopath.AsyncPath(save_dir)
-        if not await cert_save_dir.is_dir():
-            cert_save_dir.mkdir(parents=True, exist_ok=True)
-        cert_url = self.certificate_links[cert_platform.lower()]
-        if isinstance(cert_url, typing.Dict):
-            if not other_platform_format or other_platform_format not in {'pem', 'p12'}:
-                cert_url = cert_url["pem"]
-            else:
-                cert_url = cert_url[other_platform_format]
-        cert_file = cert_save_dir.joinpath(
-            f'mitmproxy-ca-cert-{cert_platform.lower()}.{cert_url.rsplit(
-                sep="/", maxsplit=1)[-1]}'
+        filename, data = await self.export(
+            platform=platform,
+            other_platform_format=other_platform_format,
         )
-        try:
-            response = await client.get(url=cert_url)
-            response.raise_for_status()
-            data = response.text if cert_file.suffix == "/pem" else response.content
-            is_bytes = isinstance(data, bytes)
-            async with cert_file.open(
-                    mode = "wb" if is_bytes else "wt",
-                    encoding = None if is_bytes else "ascii",
-            ) as file:
-                await file.write(data)
-        except httpx.HTTPError:
-            raise httpx.HTTPError("Proxy service not enabled.")
-        return str(cert_file)
+        return await self._write(save_dir, filename, data)
+
+    async def install_many(self,
+                           items: typing.Iterable[typing.Tuple[
+                               typing.Optional[Platforms],
+                               typing.Optional[OtherPlatformFormat],
+                               typing.Optional[str],
+                           ]],  # (platform, other_platform_format, save_dir)
+                           ) -> typing.List[typing.Dict[str, typing.Any]]:
+        """
+        批量安装：每种格式只获取一次，相同的目标文件只写一次，所有写入并发进行，
+        返回与 items 一一对应的结果清单，单项失败不影响其他项
+        """
+        items = list(items)
+        resolved: typing.List[typing.Union[typing.Tuple[str, str], Exception]] = []
+        for platform, other_platform_format, _ in items:
+            try:
+                resolved.append(resolve_certificate(platform, other_platform_format))
+            except ValueError as e:
+                resolved.append(e)
+        formats = sorted({r[1] for r in resolved if isinstance(r, tuple)})
+        contents = dict(zip(formats, await asyncio.gather(
+            *(self._get(fmt) for fmt in formats), return_exceptions=True
+        )))
+        writes: typing.Dict[typing.Tuple[str, str], typing.Awaitable[str]] = {}
+        for (_, _, save_dir), r in zip(items, resolved):
+            if isinstance(r, tuple) and not isinstance(contents[r[1]], BaseException):
+                key = (save_dir or ".", f"mitmproxy-ca-cert-{r[0]}.{r[1]}")
+                if key not in writes:
+                    writes[key] = self._write(key[0], key[1], contents[r[1]])
+        paths = dict(zip(writes.keys(), await asyncio.gather(*writes.values(), return_exceptions=True)))
+        manifest = []
+        for (platform, _, save_dir), r in zip(items, resolved):
+            entry = {"platform": platform, "format": None, "save_dir": save_dir, "path": None, "error": None}
+            if isinstance(r, Exception):
+                entry["error"] = str(r)
+            else:
+                entry["platform"], entry["format"] = r
+                result = contents[r[1]]
+                if not isinstance(result, BaseException):
+                    result = paths[(save_dir or ".", f"mitmproxy-ca-cert-{r[0]}.{r[1]}")]
+                if isinstance(result, BaseException):
+                    entry["error"] = str(result) or result.__class__.__name__
+                else:
+                    entry["path"] = result
+            manifest.append(entry)
+        return manifest
 
 __all__ = [
+    'CertificateCache',
     'CertificateInstaller',
+    'certificate_cache',
+    'resolve_certificate',
+    'download_certificate',
+    'proxy_fetcher',
+    'sync_export_certificate',
 ]
@@ -1,52 +1,306 @@
 from src.cerebrax.common_depend import (
     typing,
     asyncio,
-    subprocess,
-    os,
+    time,
     signal,
+    os,
+)
+from src.cerebrax._types import (
+    Time,
+    ProxyStates,
+    DefaultProxyHost,
+    DefaultProxyPort,
+    DefaultStopTimeout,
+    DefaultProxyConfdir,
 )
+from src.cerebrax._container import ProxyStateChange
+from src.cerebrax.utils import collector
+
+
+def bind_address(startup_command: typing.List[str]) -> typing.Tuple[str, int]:
+    """
+    从 mitmproxy 的启动命令中解析绑定地址（-p/--listen-port、--listen-host），保留 0.0.0.0 / ::
+    """
+    host, port = DefaultProxyHost, DefaultProxyPort
+    args = iter(startup_command[1:])
+    for arg in args:
+        option, _, value = arg.partition("=")
+        if option in {"-p", "--listen-port", "--listen-host"} and not value:
+            value = next(args, "")
+        if option in {"-p", "--listen-port"} and value.isdigit():
+            port = int(value)
+        elif option == "--listen-host" and value:
+            host = value
+    return host, port
+
+
+def listen_address(startup_command: typing.List[str]) -> typing.Tuple[str, int]:
+    """
+    本机连接代理时使用的地址：绑定在所有网卡上时通过 127.0.0.1 连接
+    """
+    host, port = bind_address(startup_command)
+    return ("127.0.0.1" if host in {"0.0.0.0", "::", ""} else host), port
+
+
+def proxy_confdir(startup_command: typing.List[str]) -> str:
+    """
+    从启动命令中解析 mitmproxy 的配置目录（--set confdir=...），默认 ~/.mitmproxy
+    """
+    confdir = DefaultProxyConfdir
+    args = iter(startup_command[1:])
+    for arg in args:
+        option, _, value = arg.partition("=")
+        if option != "--set":
+            continue
+        if not value:
+            value = next(args, "")
+        key, _, path = value.partition("=")
+        if key == "confdir" and path:
+            confdir = os.path.expanduser(path)
+    return confdir
+
+
+def with_listen_port(startup_command: typing.List[str],
+                     port: int,
+                     host: typing.Optional[str] = None,
+                     web_port: typing.Optional[int] = None,
+                     ) -> typing.List[str]:
+    """
+    返回把监听端口替换为 port 的启动命令副本；
+    host 指定时同时替换 --listen-host，web_port 指定且命令是 mitmweb 时替换 --web-port
+    """
+    replaced = {"-p", "--listen-port"}
+    if host is not None:
+        replaced.add("--listen-host")
+    if web_port is not None:
+        replaced.add("--web-port")
+    command, args = [startup_command[0]], iter(startup_command[1:])
+    for arg in args:
+        option, _, value = arg.partition("=")
+        if option in replaced:
+            if not value:
+                next(args, None)
+            continue
+        command.append(arg)
+    command += ["-p", str(port)]
+    if host is not None:
+        command += ["--listen-host", host]
+    if web_port is not None and startup_command[0] == "mitmweb":  # 每个 mitmweb 实例都会打开自己的 Web 界面
+        command += ["--web-port", str(web_port)]
+    return command
+
+
+async def probe_port(host: str, port: int, timeout: Time, interval: Time = 0.01) -> bool:
+    """
+    非阻塞地尝试 TCP 连接，直到端口可连接或超时
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(host, port),
+                timeout=max(deadline - loop.time(), interval),
+            )
+        except (OSError, asyncio.TimeoutError):
+            if loop.time() >= deadline:
+                return False
+            await asyncio.sleep(interval)
+        else:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except OSError:
+                pass
+            return True
+
 
 class ProxyHandler(object):
-    def __init__(self, startup_command: typing.List[str]) -> None:
+    def __init__(self,
+                 startup_command: typing.List[str],
+                 ready_timeout: Time = 0,  # 大于 0 时探测到端口可连接才进入 running
+                 stop_timeout: Time = DefaultStopTimeout,  # SIGTERM 后等待退出的时间，超时发送 SIGKILL
+                 ) -> None:
         self._startup_command = startup_command
-        self.popen = None
+        self._ready_timeout = ready_timeout
+        self._stop_timeout = stop_timeout
+        self.address = listen_address(startup_command)
+        self.process: typing.Optional[asyncio.subprocess.Process] = None
         self.running = False
-        self._check_task = None
-
-    async def check_alive(self) -> None:
-        while True:
-            return_code = self.popen.poll()
-            if return_code:
-                self.running = False
-                self.popen = None
-                break
+        self.state: ProxyStates = "idle"
+        self.returncode: typing.Optional[int] = None
+        self.started_at: typing.Optional[float] = None  # time.monotonic()
+        self.ready_latency: typing.Optional[float] = None  # 从启动到端口可连接的耗时(s)
+        self.stop_latency: typing.Optional[float] = None  # 最近一次 stop() 的耗时(s)
+        self._exit_future: typing.Optional[asyncio.Future] = None
+        self._ready_future: typing.Optional[asyncio.Future] = None
+        self._watch_task: typing.Optional[asyncio.Task] = None
+        self._ready_task: typing.Optional[asyncio.Task] = None
+        self._subscribers: typing.Set[asyncio.Queue] = set()
+
+    @property
+    def ready(self) -> typing.Optional[asyncio.Future]:
+        """
+        本次启动的就绪结果：True 表示已就绪，False 表示在就绪前退出或探测超时
+        """
+        return self._ready_future
+
+    @property
+    def pid(self) -> typing.Optional[int]:
+        return self.process.pid if self.process else None
+
+    # ------------------------------ 状态事件流 ------------------------------
+    def subscribe(self, maxsize: int = 16) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=maxsize)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+        return None
+
+    async def state_changes(self, maxsize: int = 16) -> typing.AsyncGenerator[ProxyStateChange, None]:
+        queue = self.subscribe(maxsize=maxsize)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            self.unsubscribe(queue)
+
+    def _transition(self, state: ProxyStates) -> None:
+        self.state = state
+        self.running = state == "running"
+        change = ProxyStateChange(state, self.pid, self.returncode, time.monotonic())
+        for queue in self._subscribers:
             try:
-                await asyncio.sleep(1)
-            except asyncio.CancelledError:
-                raise asyncio.CancelledError()
-
-    def start(self) -> None:
-        if not self.popen:
-            self.running = True
-            self.popen = subprocess.Popen(self._startup_command)
-            self._check_task = asyncio.create_task(self.check_alive())
-
-    async def stop(self) -> None:
-        if self.popen and self.running:
-            os.kill(self.popen.pid, signal.SIGTERM)
-            self._check_task.cancel()
+                queue.put_nowait(change)
+            except asyncio.QueueFull:
+                queue.get_nowait()  # 丢弃最旧的事件，订阅者慢不阻塞代理
+                queue.put_nowait(change)
+        return None
+
+    # ------------------------------ 子进程管理 ------------------------------
+    async def _watch(self, process: asyncio.subprocess.Process) -> None:
+        returncode = await process.wait()  # 由事件循环的 child watcher 唤醒，不再轮询
+        self.returncode = returncode
+        collector.process_tracker.untrack(str(process.pid))
+        self._transition("exited")
+        if not self._ready_future.done():
+            self._ready_future.set_result(False)
+        if not self._exit_future.done():
+            self._exit_future.set_result(returncode)
+        return None
+
+    async def _probe_ready(self) -> None:
+        host, port = self.address
+        ready = await probe_port(host=host, port=port, timeout=self._ready_timeout)
+        if self._ready_future.done():  # 探测期间进程已经退出
+            return None
+        if ready and self.returncode is None:
+            self.ready_latency = time.monotonic() - self.started_at
+            self._transition("running")
+        elif self.returncode is None:  # 探测超时视为启动失败：结束子进程，状态变为 exited
+            await self._terminate(self._stop_timeout)
+        if not self._ready_future.done():
+            self._ready_future.set_result(ready)
+        return None
+
+    async def start(self) -> None:
+        if self.process and self.returncode is None:
+            return None
+        loop = asyncio.get_running_loop()
+        self.returncode = None
+        self.ready_latency = None
+        self.started_at = time.monotonic()
+        self._exit_future = loop.create_future()
+        self._ready_future = loop.create_future()
+        self._transition("starting")
+        try:
+            self.process = await asyncio.create_subprocess_exec(*self._startup_command)
+        except OSError:
+            self.process = None
+            self._transition("exited")
+            self._ready_future.set_result(False)
+            self._exit_future.set_result(None)
+            raise
+        collector.process_tracker.track(str(self.process.pid), self.process.pid)
+        self._watch_task = asyncio.create_task(self._watch(self.process))
+        if self._ready_timeout > 0:
+            self._ready_task = asyncio.create_task(self._probe_ready())
+        else:
+            self.ready_latency = time.monotonic() - self.started_at
+            self._transition("running")
+            self._ready_future.set_result(True)
+        return None
+
+    async def wait_ready(self, timeout: typing.Optional[Time] = None) -> bool:
+        """
+        等待本次启动就绪，超时、进程提前退出或尚未启动时返回 False
+        """
+        if self._ready_future is None:
+            return False
+        try:
+            return await asyncio.wait_for(asyncio.shield(self._ready_future), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+
+    async def wait_exit(self) -> typing.Optional[int]:
+        if self._exit_future is None:
+            return self.returncode
+        return await asyncio.shield(self._exit_future)
+
+    def _send_signal(self, signum: int) -> None:
+        try:
+            self.process.send_signal(signum)
+        except ProcessLookupError:
+            pass  # 已经退出，等待 watcher 回收
+        return None
+
+    async def _terminate(self, timeout: Time) -> None:
+        if self.process and self.returncode is None:
+            start = time.monotonic()
+            self._transition("stopping")
+            self._send_signal(signal.SIGTERM)
             try:
-                await self._check_task
-            except asyncio.CancelledError:
-                pass
-            self.popen = None
-            self.running = False
-            self._check_task = None
-        if self._check_task:
-            await self._check_task
-            self._check_task = None
+                await asyncio.wait_for(self.wait_exit(), timeout=timeout)
+            except asyncio.TimeoutError:
+                self._send_signal(signal.SIGKILL)
+                await self.wait_exit()
+            self.stop_latency = time.monotonic() - start
+        return None
+
+    async def stop(self, timeout: typing.Optional[Time] = None) -> None:
+        """
+        SIGTERM -> 在 timeout 内等待退出 -> 超时升级为 SIGKILL，
+        退出码由 watcher 的 process.wait() 回收，不会留下僵尸进程，也不阻塞事件循环
+        """
+        await self._terminate(self._stop_timeout if timeout is None else timeout)
+        if self._ready_task:
+            self._ready_task.cancel()
+            self._ready_task = None
+        self._watch_task = None
+        return None
+
+
+async def stop_all(handlers: typing.Iterable[typing.Any], timeout: typing.Optional[Time] = None) -> None:
+    """
+    并发停止多个代理（ProxyHandler / ProxySupervisor / ProxyPool），单个失败不影响其他
+    """
+    _handlers = [h for h in handlers if h is not None]
+    if _handlers:
+        await asyncio.gather(
+            *(h.stop() if timeout is None else h.stop(timeout=timeout) for h in _handlers),
+            return_exceptions=True,
+        )
+    return None
 
 
 __all__ = [
-    "ProxyHandler"
+    "ProxyHandler",
+    "stop_all",
+    "listen_address",
+    "bind_address",
+    "proxy_confdir",
+    "with_listen_port",
+    "probe_port",
 ]
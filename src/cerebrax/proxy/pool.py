@@ -0,0 +1,173 @@
+"""
+多个 mitmproxy 实例组成的代理池
+
+前端在启动命令配置的地址（可以是 0.0.0.0）上接受客户端连接，
+按策略（最少连接 / 按客户端地址哈希）选择一个就绪实例并双向转发字节流。
+实例只监听 127.0.0.1，端口由系统分配的空闲端口中选取，不会被局域网设备绕过前端直接访问；
+mitmweb 实例同时分配各自的 Web 界面端口，避免都去占用默认的 8081。
+"""
+from src.cerebrax.common_depend import (
+    typing,
+    asyncio,
+    zlib,
+    socket,
+)
+from src.cerebrax._types import Time, BalanceStrategies, DefaultBalanceStrategy
+from src.cerebrax.proxy.handler import bind_address, with_listen_port, stop_all
+
+BufferSize = 64 * 1024
+MemberHost = "127.0.0.1"
+
+
+def _unused_port(host: str, exclude: typing.Collection[int]) -> int:
+    """
+    由系统分配一个当前空闲的端口，跳过 exclude 中已经分配出去的端口
+    """
+    while True:
+        with socket.socket() as s:
+            s.bind((host, 0))
+            port = s.getsockname()[1]
+        if port not in exclude:
+            return port
+
+
+async def _relay(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    try:
+        while True:
+            data = await reader.read(BufferSize)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+    except (ConnectionError, OSError):
+        pass
+    finally:
+        try:
+            if writer.can_write_eof():
+                writer.write_eof()
+        except (ConnectionError, OSError):
+            pass
+    return None
+
+
+class ProxyPool(object):
+    def __init__(self,
+                 startup_command: typing.List[str],
+                 factory: typing.Callable[[typing.List[str]], typing.Any],  # command -> ProxyHandler / ProxySupervisor
+                 strategy: BalanceStrategies = DefaultBalanceStrategy,
+                 ) -> None:
+        self._startup_command = startup_command
+        self._factory = factory
+        self.strategy = strategy
+        self.host, self.port = bind_address(startup_command)  # 前端绑定地址，保留 0.0.0.0
+        self.members: typing.Dict[int, typing.Any] = {}  # port -> 实例
+        self.web_ports: typing.Dict[int, int] = {}  # port -> mitmweb 实例的 Web 界面端口
+        self.connections: typing.Dict[int, int] = {}  # port -> 当前转发中的连接数
+        self._server: typing.Optional[asyncio.AbstractServer] = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def size(self) -> int:
+        return len(self.members)
+
+    def _ready_ports(self) -> typing.List[int]:
+        return sorted(p for p, m in self.members.items() if m.running)
+
+    def choose(self, client: typing.Any) -> typing.Optional[int]:
+        ports = self._ready_ports()
+        if not ports:
+            return None
+        if self.strategy == "hash-by-client":
+            key = str(client[0] if isinstance(client, tuple) else client).encode()
+            return ports[zlib.crc32(key) % len(ports)]
+        return min(ports, key=lambda p: self.connections.get(p, 0))
+
+    def _release(self, port: int) -> None:
+        if port in self.connections:  # 缩容时 _remove 已经删除了该端口
+            self.connections[port] = max(self.connections[port] - 1, 0)
+        return None
+
+    async def _handle(self, client_reader: asyncio.StreamReader, client_writer: asyncio.StreamWriter) -> None:
+        port = self.choose(client_writer.get_extra_info("peername"))
+        if port is None:
+            client_writer.close()
+            return None
+        self.connections[port] = self.connections.get(port, 0) + 1
+        try:
+            upstream_reader, upstream_writer = await asyncio.open_connection(MemberHost, port)
+        except OSError:
+            self._release(port)
+            client_writer.close()
+            return None
+        try:
+            await asyncio.gather(
+                _relay(client_reader, upstream_writer),
+                _relay(upstream_reader, client_writer),
+            )
+        finally:
+            self._release(port)
+            upstream_writer.close()
+            client_writer.close()
+        return None
+
+    async def _add(self) -> None:
+        allocated = {self.port, *self.members, *self.web_ports.values()}
+        port = _unused_port(MemberHost, allocated)
+        web_port = None
+        if self._startup_command[0] == "mitmweb":
+            web_port = self.web_ports[port] = _unused_port(MemberHost, allocated | {port})
+        member = self._factory(with_listen_port(self._startup_command, port, host=MemberHost, web_port=web_port))
+        self.members[port] = member
+        self.connections.setdefault(port, 0)
+        await member.start()
+        return None
+
+    async def _remove(self, count: int, timeout: typing.Optional[Time] = None) -> None:
+        ports = sorted(self.members, reverse=True)[:count]  # 从端口最大的实例开始缩容
+        members = [self.members.pop(port) for port in ports]
+        for port in ports:
+            self.connections.pop(port, None)
+            self.web_ports.pop(port, None)
+        await stop_all(members, timeout=timeout)
+        return None
+
+    async def scale(self, size: int, timeout: typing.Optional[Time] = None) -> None:
+        if size < 0:
+            raise ValueError("size must be greater than or equal to 0.")
+        async with self._lock:
+            while self.size < size:
+                await self._add()
+            if self.size > size:
+                await self._remove(self.size - size, timeout=timeout)
+            if size and self._server is None:
+                self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            elif not size and self._server is not None:
+                self._server.close()
+                await self._server.wait_closed()
+                self._server = None
+        return None
+
+    async def stop(self, timeout: typing.Optional[Time] = None) -> None:
+        await self.scale(0, timeout=timeout)
+        return None
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "address": f"{self.host}:{self.port}",
+            "strategy": self.strategy,
+            "size": self.size,
+            "members": [
+                {
+                    "port": port,
+                    "web_port": self.web_ports.get(port),
+                    "state": member.state,
+                    "pid": member.pid,
+                    "connections": self.connections.get(port, 0),
+                } for port, member in sorted(self.members.items())
+            ],
+        }
+
+
+__all__ = [
+    "ProxyPool",
+]
@@ -0,0 +1,126 @@
+from src.cerebrax.common_depend import (
+    typing,
+    asyncio,
+)
+from src.cerebrax._types import (
+    Time,
+    ProxyStates,
+    DefaultStopTimeout,
+)
+from src.cerebrax._models import RestartPolicy
+from src.cerebrax.proxy.handler import ProxyHandler
+
+
+class ProxySupervisor(object):
+    """
+    托管 ProxyHandler：子进程意外退出或就绪探测超时后按指数退避自动重启，
+    主动 stop() 的退出不会触发重启。
+    """
+    def __init__(self,
+                 startup_command: typing.List[str],
+                 restart_policy: typing.Optional[RestartPolicy] = None,
+                 ready_timeout: Time = 0,
+                 stop_timeout: Time = DefaultStopTimeout,
+                 ) -> None:
+        self.handler = ProxyHandler(
+            startup_command=startup_command,
+            ready_timeout=ready_timeout,
+            stop_timeout=stop_timeout,
+        )
+        self.policy = restart_policy if restart_policy else RestartPolicy(enabled=True)
+        self.restarts = 0  # 累计重启次数
+        self.failures = 0  # 连续失败次数
+        self.gave_up = False
+        self.last_returncode: typing.Optional[int] = None
+        self._stopping = False
+        self._task: typing.Optional[asyncio.Task] = None
+
+    @property
+    def supervising(self) -> bool:
+        return bool(self._task and not self._task.done())
+
+    @property
+    def running(self) -> bool:
+        return self.handler.running
+
+    @property
+    def state(self) -> ProxyStates:
+        if self.supervising and self.handler.state in {"idle", "exited"}:
+            return "restarting"
+        return self.handler.state
+
+    @property
+    def pid(self) -> typing.Optional[int]:
+        return self.handler.pid
+
+    @property
+    def ready_latency(self) -> typing.Optional[float]:
+        return self.handler.ready_latency
+
+    async def wait_ready(self, timeout: typing.Optional[Time] = None) -> bool:
+        return await self.handler.wait_ready(timeout=timeout)
+
+    def backoff(self) -> float:
+        delay = self.policy.backoff_initial * self.policy.backoff_factor ** max(self.failures - 1, 0)
+        return min(delay, self.policy.backoff_max)
+
+    def stats(self) -> typing.Dict[str, typing.Any]:
+        return {
+            "state": self.state,
+            "pid": self.pid,
+            "restarts": self.restarts,
+            "failures": self.failures,
+            "gave_up": self.gave_up,
+            "last_returncode": self.last_returncode,
+        }
+
+    async def _supervise(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started_at = loop.time()
+            ready = await asyncio.shield(self.handler.ready)
+            if not ready and self.handler.returncode is None:
+                await self.handler.stop()  # 就绪探测超时视为启动失败
+            self.last_returncode = await self.handler.wait_exit()
+            if self._stopping:
+                return None
+            if ready and loop.time() - started_at >= self.policy.reset_after:
+                self.failures = 0
+            self.failures += 1
+            if 0 <= self.policy.max_restarts < self.failures:
+                self.gave_up = True
+                return None
+            await asyncio.sleep(self.backoff())
+            try:
+                await self.handler.start()
+            except OSError:
+                pass  # 启动命令本身失败，下一轮按退避继续
+            self.restarts += 1
+
+    async def start(self) -> None:
+        if self.supervising:
+            return None
+        self._stopping = False
+        self.gave_up = False
+        self.failures = 0
+        await self.handler.start()
+        self._task = asyncio.create_task(self._supervise())
+        return None
+
+    async def stop(self, timeout: typing.Optional[Time] = None) -> None:
+        self._stopping = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.handler.stop(timeout=timeout)
+        self.last_returncode = self.handler.returncode
+        return None
+
+
+__all__ = [
+    "ProxySupervisor",
+]
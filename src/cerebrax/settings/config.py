@@ -1,8 +1,10 @@
 from src.cerebrax.common_depend import tomllib, asyncio, pathlib, typing
-from src.cerebrax._container import ConfigSnapshot
+from src.cerebrax._container import ConfigSnapshot, ConfigDiff
 from src.cerebrax._models import (
 LifespanConfig,
 ProxyConfig,
+ServerConfig,
+MonitorConfig,
 )
 
 class Loader(object):
@@ -36,6 +38,8 @@ class Parser(object):
         self.config = None
         self._lifespan_config = None
         self._proxy_config = None
+        self._server_config = None
+        self._monitor_config = None
 
     @property
     def lifespan_config(self) -> typing.Optional[LifespanConfig]:
@@ -45,6 +49,14 @@ class Parser(object):
     def proxy_config(self) -> typing.Optional[ProxyConfig]:
         return self._proxy_config
 
+    @property
+    def server_config(self) -> typing.Optional[ServerConfig]:
+        return self._server_config
+
+    @property
+    def monitor_config(self) -> typing.Optional[MonitorConfig]:
+        return self._monitor_config
+
     def parse_lifespan_config(self) -> None:
         _cfg = self.config.get("Lifespan", {})
         self._lifespan_config = LifespanConfig(**_cfg)
@@ -55,10 +67,22 @@ class Parser(object):
         self._proxy_config = ProxyConfig(**_cfg)
         return None
 
+    def parse_server_config(self) -> None:
+        _cfg = self.config.get("Server", {})
+        self._server_config = ServerConfig(**_cfg)
+        return None
+
+    def parse_monitor_config(self) -> None:
+        _cfg = self.config.get("Monitor", {})
+        self._monitor_config = MonitorConfig(**_cfg)
+        return None
+
     def parse(self, config: typing.Dict[str, typing.Any]) -> "Parser":
         self.config = config
         self.parse_lifespan_config()
         self.parse_proxy_config()
+        self.parse_server_config()
+        self.parse_monitor_config()
         return self
 
 
@@ -72,7 +96,9 @@ class Config(object):
         parser = self._parser.parse(config=cfg)
         config_snapshot =  ConfigSnapshot(
             lifespan_config=parser.lifespan_config,
-            proxy_config=parser.proxy_config
+            proxy_config=parser.proxy_config,
+            server_config=parser.server_config,
+            monitor_config=parser.monitor_config,
         )
         return config_snapshot
 
@@ -81,11 +107,48 @@ class Config(object):
         parser = self._parser.parse(config=cfg)
         config_snapshot = ConfigSnapshot(
             lifespan_config=parser.lifespan_config,
-            proxy_config=parser.proxy_config
+            proxy_config=parser.proxy_config,
+            server_config=parser.server_config,
+            monitor_config=parser.monitor_config,
         )
         return config_snapshot
 
 
+# ConfigSnapshot 字段 -> 配置文件中的节名
+SnapshotSections: typing.Dict[str, str] = {
+    "lifespan_config": "Lifespan",
+    "proxy_config": "Proxy",
+    "server_config": "Server",
+    "monitor_config": "Monitor",
+}
+
+
+def _diff(path: str, old: typing.Any, new: typing.Any, changes: typing.Dict[str, typing.Tuple[typing.Any, typing.Any]]) -> None:
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in old.keys() | new.keys():
+            _diff(f"{path}.{key}", old.get(key), new.get(key), changes)
+    elif old != new:
+        changes[path] = (old, new)
+    return None
+
+
+def diff_config(old: typing.Optional[ConfigSnapshot], new: ConfigSnapshot) -> ConfigDiff:
+    """
+    逐字段比较两个快照，old 为 None 时所有字段都视为变化
+    """
+    changes: typing.Dict[str, typing.Tuple[typing.Any, typing.Any]] = {}
+    for field, section in SnapshotSections.items():
+        old_model, new_model = getattr(old, field, None), getattr(new, field, None)
+        _diff(
+            section,
+            old_model.model_dump() if old_model is not None else None,
+            new_model.model_dump() if new_model is not None else None,
+            changes,
+        )
+    return ConfigDiff(changes)
+
+
 __all__ = [
     "Config",
+    "diff_config",
 ]
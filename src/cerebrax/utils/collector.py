@@ -1,5 +1,12 @@
 from src.cerebrax.common_depend import (
     psutil,
+    time,
+    typing,
+    threading,
+    select,
+    queue,
+    Future,
+    wait,
 )
 from src.cerebrax._container import (
     MemorySnapshot,
@@ -8,6 +15,8 @@ from src.cerebrax._container import (
     CPUSnapshot,
     NetworkSnapshot,
     DiskSnapshot,
+    ProcessStat,
+    ProcessSnapshot,
 )
 
 
@@ -42,25 +51,384 @@ def get_cpu_snapshot() -> CPUSnapshot:
     return cpu_snapshot
 
 
-def get_network_snapshot() -> NetworkSnapshot:
+def _counter_delta(previous: int, current: int) -> int:
+    """
+    累计计数器的增量；计数器回绕时按 32/64 位补齐，无法判断时视为计数器被重置
+    """
+    if current >= previous:
+        return current - previous
+    for bits in (32, 64):
+        if previous < 2 ** bits:
+            delta = current + 2 ** bits - previous
+            if delta <= 2 ** (bits - 1):  # 回绕后的增量应当远小于计数器范围
+                return delta
+    return current
+
+
+class RateTracker(object):
+    """
+    保存上一次的累计计数器，按 time.monotonic() 计算每秒增量。
+    counters 可以是 psutil 的 NamedTuple，也可以是 {名称: NamedTuple}（pernic/perdisk），
+    新出现的名称在下一次采样时才有速率，消失的名称直接丢弃。
+    """
+    __slots__ = ("_previous", "_timestamp")
+
+    def __init__(self) -> None:
+        self._previous: typing.Any = None
+        self._timestamp: typing.Optional[float] = None
+
+    @staticmethod
+    def _rate(previous: typing.Any, current: typing.Any, elapsed: float) -> typing.Any:
+        return type(current)(*(
+            _counter_delta(p, c) / elapsed for p, c in zip(previous, current)
+        ))
+
+    def update(self, counters: typing.Any) -> typing.Any:
+        now = time.monotonic()
+        previous, timestamp = self._previous, self._timestamp
+        self._previous, self._timestamp = counters, now
+        if previous is None or counters is None or now <= timestamp:
+            return None
+        elapsed = now - timestamp
+        if isinstance(counters, dict):
+            return {
+                k: self._rate(previous[k], v, elapsed) for k, v in counters.items() if k in previous
+            }
+        return self._rate(previous, counters, elapsed)
+
+
+class RateTrackers(object):
+    """
+    一个 ResourceChangesMonitor 持有的全部速率状态：两个监控各自计算两次采样之间的速率，互不干扰
+    """
+    __slots__ = ("network", "pernic", "disk", "perdisk")
+
+    def __init__(self) -> None:
+        self.network, self.pernic = RateTracker(), RateTracker()
+        self.disk, self.perdisk = RateTracker(), RateTracker()
+
+
+def get_network_snapshot(pernic: bool = False, rates: typing.Optional[RateTrackers] = None) -> NetworkSnapshot:
+    """
+    rates 为 None 时只返回累计计数器，不计算速率
+    """
+    net_io_counters = psutil.net_io_counters(pernic=False, nowrap=True)
     network_snapshot = NetworkSnapshot(
-        psutil.net_io_counters(pernic=False, nowrap=True)
+        net_io_counters,
+        rates.network.update(net_io_counters) if rates else None,
+        rates.pernic.update(psutil.net_io_counters(pernic=True, nowrap=True)) if rates and pernic else None,
     )
     return network_snapshot
 
 
-def get_disk_snapshot() -> DiskSnapshot:
-    disk_partitions = psutil.disk_partitions(all=False)
+MountsFile = "/proc/self/mounts"
+MountsRefreshInterval = 60  # 无法监听挂载表时，每隔多少秒重新枚举分区
+ProbeTimeout = 0.2  # 一轮 disk_usage 探测的总时限(s)
+ProbeWorkers = 2  # 常驻的 disk_usage 探测线程数
+QuarantineInitial = 30  # 挂载点探测超时后的隔离时间(s)，再次超时翻倍
+QuarantineMax = 600
+
+
+class MountTable(object):
+    """
+    缓存 disk_partitions 的结果。Linux 上挂载表变化时 /proc/self/mounts 会触发 POLLPRI，
+    每次采样只做一次非阻塞的 poll；其他平台按 MountsRefreshInterval 定期刷新。
+    """
+    def __init__(self, refresh_interval: float = MountsRefreshInterval) -> None:
+        self._refresh_interval = refresh_interval
+        self._partitions: typing.Optional[typing.List[typing.Any]] = None
+        self._refreshed_at = 0.0
+        self._file = None
+        self._poll = None
+        try:
+            self._file = open(MountsFile, "rb")
+            self._poll = select.poll()
+            self._poll.register(self._file, select.POLLPRI | select.POLLERR)
+        except (OSError, AttributeError):  # 没有 /proc 或没有 select.poll
+            if self._file is not None:
+                self._file.close()
+            self._file, self._poll = None, None
+
+    def _changed(self) -> bool:
+        if self._poll is not None:
+            return bool(self._poll.poll(0))
+        return time.monotonic() - self._refreshed_at >= self._refresh_interval
+
+    def partitions(self) -> typing.List[typing.Any]:
+        if self._partitions is None or self._changed():
+            if self._file is not None:  # 读到末尾才会重新等待下一次变化
+                self._file.seek(0)
+                self._file.read()
+            self._partitions = psutil.disk_partitions(all=False)
+            self._refreshed_at = time.monotonic()
+        return self._partitions
+
+
+def _probe(future: Future, path: str) -> None:
+    if not future.set_running_or_notify_cancel():  # 排队期间整轮已经超时，被取消
+        return None
+    try:
+        future.set_result(psutil.disk_usage(path))
+    except BaseException as e:
+        future.set_exception(e)
+    return None
+
+
+class DiskUsageProber(object):
+    """
+    disk_usage 由少量常驻的守护线程从队列中取出执行，整轮最多等待 timeout 秒。
+    超时的挂载点（例如失联的 NFS）被隔离一段时间，期间不再探测；
+    仍未返回的探测不会重复发起，卡住的挂载点最多占用一个线程。
+    卡住的线程不计入常驻数量：超时时补充一个线程，卡住的探测返回后多出来的线程退出，
+    线程数最多为 workers + 卡住的挂载点数；超时时仍在排队的探测直接取消。
+    不使用 ThreadPoolExecutor：解释器退出时会 join 线程池的线程，卡住的探测会阻止进程退出。
+    """
+    def __init__(self,
+                 timeout: float = ProbeTimeout,
+                 quarantine: float = QuarantineInitial,
+                 quarantine_max: float = QuarantineMax,
+                 workers: int = ProbeWorkers,
+                 ) -> None:
+        self._timeout = timeout
+        self._quarantine = quarantine
+        self._quarantine_max = quarantine_max
+        self._workers = max(int(workers), 1)
+        self._queue: queue.Queue = queue.Queue()
+        self._threads = 0  # 存活的探测线程
+        self._stuck = 0  # 其中正在执行超时探测的线程
+        self._lock = threading.Lock()
+        self._inflight: typing.Dict[str, Future] = {}
+        self._penalty: typing.Dict[str, float] = {}  # 挂载点 -> 下一次的隔离时长
+        self._until: typing.Dict[str, float] = {}  # 挂载点 -> 隔离结束的 time.monotonic()
+
+    def quarantined(self) -> typing.Dict[str, float]:
+        now = time.monotonic()
+        return {p: until - now for p, until in self._until.items() if until > now}
+
+    def _isolate(self, path: str) -> None:
+        penalty = self._penalty.get(path, self._quarantine)
+        self._until[path] = time.monotonic() + penalty
+        self._penalty[path] = min(penalty * 2, self._quarantine_max)
+        return None
+
+    @property
+    def threads(self) -> int:
+        return self._threads
+
+    def _work(self) -> None:
+        while True:
+            future, path = self._queue.get()
+            _probe(future, path)
+            with self._lock:
+                if self._threads - self._stuck > self._workers:  # 卡住期间补充的线程，多余的退出
+                    self._threads -= 1
+                    return None
+
+    def _submit(self, path: str) -> Future:
+        future = Future()
+        with self._lock:
+            if self._threads - self._stuck < self._workers:
+                self._threads += 1
+                threading.Thread(target=self._work, name="disk-usage", daemon=True).start()
+        self._queue.put((future, path))
+        return future
+
+    def _stalled(self, path: str, future: Future) -> None:
+        """
+        探测正在执行但超时：该线程暂时卡住，补充一个线程；探测返回后才允许再次发起
+        """
+        with self._lock:
+            self._stuck += 1
+        future.add_done_callback(lambda _: self._resume(path))
+        return None
+
+    def _resume(self, path: str) -> None:
+        self._inflight.pop(path, None)
+        with self._lock:
+            self._stuck -= 1
+        return None
+
+    def usages(self, paths: typing.Iterable[str]) -> typing.Dict[str, typing.Any]:
+        now = time.monotonic()
+        pending: typing.Dict[str, Future] = {}
+        for path in paths:
+            if self._until.get(path, 0) > now:
+                continue
+            if path in self._inflight:  # 隔离期满但上一次探测仍未返回，继续隔离
+                self._isolate(path)
+                continue
+            pending[path] = self._inflight[path] = self._submit(path)
+        if pending:
+            wait(pending.values(), timeout=self._timeout)
+        usages = {}
+        for path, future in pending.items():
+            if not future.done() and future.cancel():  # 超时时还在队列中，前面的探测占住了线程
+                self._isolate(path)
+                self._inflight.pop(path, None)
+                continue
+            if not future.done():  # 超时时正在执行：隔离，探测返回后才允许再次发起
+                self._isolate(path)
+                self._stalled(path, future)
+                continue
+            self._inflight.pop(path, None)
+            try:
+                usages[path] = future.result()
+            except OSError:
+                continue
+            self._penalty.pop(path, None)
+            self._until.pop(path, None)
+        return usages
+
+
+mount_table = MountTable()
+disk_usage_prober = DiskUsageProber()
+
+
+def get_disk_snapshot(perdisk: bool = False, rates: typing.Optional[RateTrackers] = None) -> DiskSnapshot:
+    disk_partitions = mount_table.partitions()
     paths = [m.mountpoint for m in disk_partitions]
-    disk_usages = {p: psutil.disk_usage(p) for p in paths}
+    disk_usages = disk_usage_prober.usages(paths)
+    disk_io_counters = psutil.disk_io_counters(perdisk=False, nowrap=True)
     disk_snapshot = DiskSnapshot(
         disk_usages,
         disk_partitions,
-        psutil.disk_io_counters(perdisk=False, nowrap=True),
+        disk_io_counters,
+        rates.disk.update(disk_io_counters) if rates else None,
+        rates.perdisk.update(psutil.disk_io_counters(perdisk=True, nowrap=True)) if rates and perdisk else None,
+        disk_usage_prober.quarantined(),
     )
     return disk_snapshot
 
 
+class ProcessTracker(object):
+    """
+    跟踪受管理的子进程（mitmdump）与容器（按容器主进程及其子进程汇总）。
+
+    psutil.Process 句柄按 pid 缓存：cpu_percent(interval=None) 依赖同一句柄上一次的调用，
+    复用句柄才能得到两次采样之间的 CPU 占用，同时省去每次重新构造进程对象的开销。
+    track/untrack 在事件循环中调用，snapshot 在采样线程中调用。
+    """
+    def __init__(self) -> None:
+        self._targets: typing.Dict[str, typing.Tuple[str, int, bool]] = {}  # key -> (kind, pid, children)
+        self._handles: typing.Dict[int, psutil.Process] = {}
+        self._lock = threading.Lock()
+
+    def track(self, key: str, pid: int, kind: str = "process", children: bool = False) -> None:
+        with self._lock:
+            self._targets[key] = (kind, pid, children)
+        return None
+
+    def untrack(self, key: str) -> None:
+        with self._lock:
+            self._targets.pop(key, None)
+        return None
+
+    @property
+    def targets(self) -> typing.Dict[str, typing.Tuple[str, int, bool]]:
+        with self._lock:
+            return dict(self._targets)
+
+    def _handle(self, pid: int) -> psutil.Process:
+        handle = self._handles.get(pid)
+        if handle is None:
+            handle = self._handles[pid] = psutil.Process(pid)
+            handle.cpu_percent(interval=None)  # 第一次调用只建立基准
+        return handle
+
+    @staticmethod
+    def _sample(handle: psutil.Process) -> typing.Tuple[float, int, typing.Optional[int], int, typing.Any]:
+        with handle.oneshot():
+            try:
+                num_fds = handle.num_fds()
+            except (psutil.AccessDenied, AttributeError):  # Windows 没有 num_fds
+                num_fds = None
+            try:
+                io_counters = handle.io_counters()
+            except (psutil.AccessDenied, AttributeError):
+                io_counters = None
+            return (
+                handle.cpu_percent(interval=None),
+                handle.memory_info().rss,
+                num_fds,
+                handle.num_threads(),
+                io_counters,
+            )
+
+    @staticmethod
+    def _reason(e: psutil.Error) -> typing.Optional[str]:
+        """
+        进程已经退出时返回 None；僵尸进程、无权限等返回原因，该 pid 记为无法访问
+        """
+        if isinstance(e, psutil.NoSuchProcess) and not isinstance(e, psutil.ZombieProcess):
+            return None
+        return e.__class__.__name__
+
+    @staticmethod
+    def _sum(values: typing.List[typing.Any]) -> typing.Any:
+        values = [v for v in values if v is not None]
+        if not values:
+            return None
+        if isinstance(values[0], tuple):
+            return type(values[0])(*(sum(f) for f in zip(*values)))
+        return sum(values)
+
+    def snapshot(self) -> ProcessSnapshot:
+        """
+        单个 pid 采样失败（psutil.Error）只跳过该 pid，原因记录在 inaccessible 中
+        """
+        processes, sampled, inaccessible = {}, {}, {}
+
+        def failed(pid: int, e: psutil.Error) -> None:
+            reason = self._reason(e)
+            if reason is not None:
+                inaccessible[pid] = reason
+            return None
+
+        for key, (kind, pid, children) in self.targets.items():
+            try:
+                handles = [self._handle(pid)]
+            except psutil.Error as e:
+                failed(pid, e)
+                continue
+            try:
+                descendants = handles[0].children(recursive=True) if children else []
+            except psutil.Error as e:  # 仍然采样主进程
+                failed(pid, e)
+                descendants = []
+            for child in descendants:
+                try:
+                    handles.append(self._handle(child.pid))
+                except psutil.Error as e:
+                    failed(child.pid, e)
+            samples = []
+            for h in handles:
+                if h.pid not in sampled:  # 同一 pid 每轮只采一次，重复调用 cpu_percent 会得到 0
+                    try:
+                        sampled[h.pid] = self._sample(h)
+                    except psutil.Error as e:
+                        sampled[h.pid] = None
+                        failed(h.pid, e)
+                if sampled[h.pid] is not None:
+                    samples.append(sampled[h.pid])
+            if not samples:
+                continue
+            cpu, rss, fds, threads, io = zip(*samples)
+            processes[key] = ProcessStat(
+                kind, pid, sum(cpu), sum(rss), self._sum(list(fds)), sum(threads), len(samples), self._sum(list(io)),
+            )
+        # 退出的进程不再保留句柄，避免 pid 复用时沿用旧的 CPU 基准
+        for pid in [p for p in self._handles if sampled.get(p) is None]:
+            del self._handles[pid]
+        return ProcessSnapshot(processes, inaccessible)
+
+
+process_tracker = ProcessTracker()
+
+
+def get_process_snapshot() -> ProcessSnapshot:
+    return process_tracker.snapshot()
+
+
 __all__ = [
     "get_memory_snapshot",
     "get_swap_snapshot",
@@ -68,4 +436,13 @@ __all__ = [
     "get_network_snapshot",
     "get_disk_snapshot",
     "cpu_count",
+    "RateTracker",
+    "RateTrackers",
+    "ProcessTracker",
+    "process_tracker",
+    "get_process_snapshot",
+    "MountTable",
+    "DiskUsageProber",
+    "mount_table",
+    "disk_usage_prober",
 ]
@@ -12,6 +12,7 @@ DockerImageList,
 DefaultContainerQuery,
 ContainerRunArgs,
 )
+from src.cerebrax.utils import collector
 
 # image reference 镜像引用
 class DockerImages(object):
@@ -81,12 +82,23 @@ class DockerContainer(object):
         else:
             container = self.client.containers.run(**_args)
         self.container = container
+        self._track()
+
+    def _track(self):
+        """
+        以容器主进程为根，连同其子进程一起纳入 process 采样
+        """
+        self.container.reload()
+        pid = self.container.attrs.get("State", {}).get("Pid", 0)
+        if pid:
+            collector.process_tracker.track(self.container.short_id, pid, kind="container", children=True)
 
     def stop(self, rm: bool = False):
         if self.container:
             self.container.reload()
             if self.container.status == "running":
                 self.container.stop()
+                collector.process_tracker.untrack(self.container.short_id)
                 if rm:
                     self.container.remove(v=True)
                 self.container = None
@@ -106,6 +118,7 @@ class DockerContainer(object):
     def restart(self):
         if self.container:
             self.container.restart()
+            self._track()  # 重启后主进程 pid 会变化
 
 __all__ = [
     "DockerImages",
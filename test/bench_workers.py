@@ -0,0 +1,123 @@
+"""
+多进程模式的吞吐基准：用 WorkerSupervisor 分别以 1、2、4 ... 个 worker 启动 app，
+多个客户端进程通过长连接并发请求同一个接口，统计每秒完成的请求数。
+
+    python test/bench_workers.py --workers 1 2 4 --clients 8 --duration 5 --path /imports
+
+不是 pytest 用例（文件名不以 test_ 开头），需要手动运行；结果受 CPU 核数影响，
+只有当核数不少于 worker 数且客户端不是瓶颈时吞吐才会随 worker 数增长。
+
+记录的结果（1 个 vCPU，Python 3.11，asyncio + h11，--clients 8 --duration 5 --path /imports）：
+
+    workers   requests     req/s
+          1        895     179.0
+          2        892     178.4
+          4        884     176.8
+
+单核上多个 worker 只会争抢同一个 CPU，吞吐持平并随切换开销略降；在多核机器上按同样的命令重跑对比。
+"""
+import argparse
+import http.client
+import multiprocessing
+import pathlib
+import socket
+import sys
+import time
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "src" / "cerebrax" / "app"))  # app.py 按脚本目录导入
+
+from app import app  # noqa: E402
+from server import ServerHandler, SubServer  # noqa: E402
+import register  # noqa: E402
+
+
+def unused_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def inject(workers: int):
+    def initializer(server: SubServer, worker: int) -> None:
+        register.server = server
+        app.state.server = server
+        app.state.config_path = None  # 不监控配置文件
+        app.state.workers = workers
+        app.state.worker = worker
+        return None
+    return initializer
+
+
+def wait_until_serving(port: int, timeout: float = 10.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return None
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError("server did not start in time")
+
+
+def client(port: int, path: str, duration: float, results: multiprocessing.Queue) -> None:
+    connection = http.client.HTTPConnection("127.0.0.1", port)
+    count = 0
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        connection.request("GET", path)
+        response = connection.getresponse()
+        response.read()
+        if response.status == 200:
+            count += 1
+    connection.close()
+    results.put(count)
+    return None
+
+
+def bench(workers: int, clients: int, duration: float, path: str) -> int:
+    port = unused_port()
+    handler = ServerHandler(args={
+        "app": app,
+        "host": "127.0.0.1",
+        "port": port,
+        "log_level": "warning",
+        "access_log": False,
+    })
+    supervisor = handler.build_workers(workers=workers, initializer=inject(workers))
+    supervisor.start()
+    try:
+        wait_until_serving(port)
+        time.sleep(0.5)  # 等待所有 worker 进入 accept
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        processes = [
+            context.Process(target=client, args=(port, path, duration, results)) for _ in range(clients)
+        ]
+        for process in processes:
+            process.start()
+        total = sum(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+    finally:
+        supervisor.stop()
+    return total
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0)
+    parser.add_argument("--path", default="/imports")
+    args = parser.parse_args()
+    print(f"{'workers':>7} {'requests':>10} {'req/s':>9}")
+    for workers in args.workers:
+        total = bench(workers, args.clients, args.duration, args.path)
+        print(f"{workers:>7} {total:>10} {total / args.duration:>9.1f}")
+    return None
+
+
+if __name__ == "__main__":
+    main()
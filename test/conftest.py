@@ -0,0 +1,59 @@
+"""
+代理子进程测试用的假启动命令：用当前解释器运行一小段脚本代替 mitmdump，
+命令末尾带 -p <port>，listen_address 按真实命令的方式解析监听端口；
+脚本监听命令行中最后一个 -p 指定的端口，代理池替换端口后同样生效
+"""
+import pathlib
+import socket
+import sys
+import textwrap
+
+import pytest
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))  # 以仓库根目录导入 src.cerebrax
+
+
+def unused_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def free_port() -> int:
+    return unused_port()
+
+
+@pytest.fixture
+def fake_command(free_port):
+    """
+    fake_command(listen_after=0.1, ignore_sigterm=False, exit_code=None, crash_once=None, port=None)
+        listen_after    延迟多久开始监听端口，None 表示从不监听
+        ignore_sigterm  忽略 SIGTERM，只能被 SIGKILL 结束
+        exit_code       不为 None 时立即以该退出码退出
+        crash_once      标记文件路径：文件不存在时创建它并以退出码 1 退出，之后正常启动
+        port            监听端口，默认使用 free_port
+    """
+    def build(listen_after=0.1, ignore_sigterm=False, exit_code=None, crash_once=None, port=None):
+        _port = free_port if port is None else port
+        script = textwrap.dedent(f"""
+            import os, signal, socket, sys, time
+            if {ignore_sigterm!r}:
+                signal.signal(signal.SIGTERM, signal.SIG_IGN)
+            if {crash_once!r} is not None and not os.path.exists({crash_once!r}):
+                open({crash_once!r}, "w").close()
+                sys.exit(1)
+            if {exit_code!r} is not None:
+                sys.exit({exit_code!r})
+            if {listen_after!r} is not None:
+                time.sleep({listen_after!r})
+                server = socket.socket()
+                server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                port = [int(v) for k, v in zip(sys.argv, sys.argv[1:]) if k == "-p"][-1]
+                server.bind(("127.0.0.1", port))
+                server.listen()
+            while True:
+                time.sleep(1)
+        """)
+        return [sys.executable, "-c", script, "-p", str(_port)]
+    return build
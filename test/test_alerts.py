@@ -0,0 +1,58 @@
+"""
+AlertEngine：duration 之内的抖动不触发、触发与恢复各只报告一次、接近阈值时加快采样
+"""
+import typing
+
+from src.cerebrax._models import AlertRule
+from src.cerebrax.monitor.alerts import AlertEngine
+from src.cerebrax.monitor.resmon import ResourceChangesMonitor
+
+
+class CPU(typing.NamedTuple):
+    cpu_percent: float
+
+
+def _states(events):
+    return [(e.state, e.value) for e in events]
+
+
+def test_fires_only_after_duration_and_resets_on_dip():
+    engine = AlertEngine([AlertRule(name="cpu-high", aspect="cpu", metric="cpu_cpu_percent", threshold=90, duration=10)])
+    assert engine.evaluate("cpu", CPU(95), now=0) == []
+    assert engine.evaluate("cpu", CPU(95), now=5) == []
+    assert engine.evaluate("cpu", CPU(50), now=6) == []  # 未触发时回落，不报告恢复，重新计时
+    assert engine.evaluate("cpu", CPU(95), now=7) == []
+    assert engine.evaluate("cpu", CPU(95), now=16) == []
+    assert _states(engine.evaluate("cpu", CPU(96), now=17)) == [("firing", 96)]
+    assert engine.evaluate("cpu", CPU(97), now=18) == []  # 持续触发期间不重复报告
+    assert [e.rule for e in engine.active()] == ["cpu-high"]
+    assert _states(engine.evaluate("cpu", CPU(40), now=19)) == [("resolved", 40)]
+    assert engine.evaluate("cpu", CPU(40), now=20) == []
+    assert engine.active() == []
+
+
+def test_labelled_series_are_tracked_independently():
+    class Disk(typing.NamedTuple):
+        disk_usages: typing.Dict[str, float]
+
+    engine = AlertEngine([AlertRule(name="disk-full", aspect="disk", metric="disk_disk_usages", threshold=90)])
+    events = engine.evaluate("disk", Disk({"/": 95, "/data": 10}), now=0)
+    assert [e.series for e in events] == ['disk_disk_usages{mountpoint="/"}']
+    events = engine.evaluate("disk", Disk({"/": 95, "/data": 99}), now=1)
+    assert [e.series for e in events] == ['disk_disk_usages{mountpoint="/data"}']
+
+
+def test_near_threshold_speeds_up_sampling():
+    rule = AlertRule(name="cpu-high", aspect="cpu", metric="cpu_cpu_percent", threshold=90, margin=0.1)
+    engine = AlertEngine([rule])
+    monitor = ResourceChangesMonitor(call=None, aspect=["cpu"], multiples={"cpu": 2}, alerts=engine, slowdown=4)
+    engine.evaluate("cpu", CPU(10), now=0)
+    assert not engine.near("cpu")
+    backoff = [monitor._adapt("cpu")]
+    for _ in range(4):
+        monitor.current["cpu"] = backoff[-1]
+        backoff.append(monitor._adapt("cpu"))
+    assert backoff == [4, 8, 8, 8, 8]  # 空闲时逐步放慢到 multiples * slowdown
+    engine.evaluate("cpu", CPU(85), now=1)  # 距离阈值 10% 以内
+    assert engine.near("cpu")
+    assert monitor._adapt("cpu") == 1
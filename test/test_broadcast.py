@@ -0,0 +1,91 @@
+"""
+BroadcastChannel：每个游标独立读取，落后超过一圈时跳到最旧数据并记录丢失条数，关闭后等待者退出
+"""
+import asyncio
+
+import pytest
+
+from src.cerebrax.monitor.broadcast import BroadcastChannel, ChannelClosed
+
+
+def test_cursors_read_independently():
+    async def main():
+        channel = BroadcastChannel(capacity=8)
+        first, second = channel.cursor(), channel.cursor()
+        for i in range(3):
+            channel.publish(i)
+        assert [await first.get() for _ in range(3)] == [0, 1, 2]
+        assert await second.get() == 0  # 第一个游标读过的数据不会从第二个游标中消失
+        assert second.pending() == 2
+        late = channel.cursor()  # 只读取之后发布的数据
+        channel.publish(3)
+        assert await late.get() == 3
+        assert channel.cursor(latest=False).position == 0
+    asyncio.run(main())
+
+
+def test_slow_cursor_skips_to_oldest_and_counts_lag():
+    async def main():
+        channel = BroadcastChannel(capacity=4)
+        slow = channel.cursor()
+        for i in range(10):
+            channel.publish(i)  # 生产者从不等待
+        assert await slow.get() == 6
+        assert slow.lagged == 6
+        assert [await slow.get() for _ in range(3)] == [7, 8, 9]
+        slow.skip()
+        assert slow.pending() == 0
+    asyncio.run(main())
+
+
+def test_waiting_cursors_wake_on_publish_and_close():
+    async def main():
+        channel = BroadcastChannel(capacity=4)
+        cursors = [channel.cursor() for _ in range(3)]
+        waiters = [asyncio.create_task(c.get()) for c in cursors]
+        await asyncio.sleep(0)
+        channel.publish("x")
+        assert await asyncio.gather(*waiters) == ["x", "x", "x"]
+
+        async def drain(cursor):
+            return [item async for item in cursor]
+
+        readers = [asyncio.create_task(drain(c)) for c in cursors]
+        await asyncio.sleep(0)
+        channel.publish("y")
+        channel.close()
+        assert await asyncio.wait_for(asyncio.gather(*readers), timeout=1) == [["y"]] * 3
+        with pytest.raises(ChannelClosed):
+            channel.publish("z")
+        channel.reopen()
+        channel.publish("z")
+        assert await cursors[0].get() == "z"
+    asyncio.run(main())
+
+
+def test_monitor_fans_out_to_every_consumer_and_stops_them():
+    from src.cerebrax.monitor.resmon import ResourceChangesMonitor
+
+    async def main():
+        received = {"call": [], "extra": []}
+
+        def consumer(name):
+            async def call(async_generators):
+                async for snapshot in async_generators["memory"]:
+                    received[name].append(snapshot)
+            return call
+
+        monitor = ResourceChangesMonitor(call=consumer("call"), aspect=["memory"], interval=0.02)
+        await monitor.start()
+        monitor.subscribe(consumer("extra"))
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + 5
+        while min(len(v) for v in received.values()) < 3:
+            assert loop.time() < deadline
+            await asyncio.sleep(0.01)
+        tasks = list(monitor.consumers)
+        await monitor.stop()
+        assert all(t.done() for t in tasks) and not monitor.consumers
+        # 后加入的消费者从订阅之后开始读，读到的是同一份快照，没有被另一个消费者抢走
+        assert set(map(id, received["extra"])) <= set(map(id, received["call"]))
+    asyncio.run(main())
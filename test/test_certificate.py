@@ -0,0 +1,39 @@
+"""
+POST /proxy/certificate：confdir 模式下直接在响应体中返回证书，媒体类型与证书格式一致
+"""
+import pathlib
+import sys
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src.cerebrax._container import ConfigSnapshot
+from src.cerebrax._models import LifespanConfig, MonitorConfig, ProxyConfig
+from src.cerebrax.proxy import certificate
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "src" / "cerebrax" / "app"))  # app.py 按脚本目录导入
+
+
+@pytest.mark.parametrize("body, filename, media_type", [
+    ({"platform": "windows"}, "mitmproxy-ca-cert-windows.p12", "application/x-pkcs12"),
+    ({"platform": "other-platform", "other_platform_format": "p12"}, "mitmproxy-ca-cert-other-platform.p12", "application/x-pkcs12"),
+    ({"platform": "linux"}, "mitmproxy-ca-cert-linux.pem", "application/x-x509-ca-cert"),
+    ({"platform": "android"}, "mitmproxy-ca-cert-android.cer", "application/x-x509-ca-cert"),
+])
+def test_confdir_export_media_type(tmp_path, monkeypatch, body, filename, media_type):
+    from app import app  # 延迟导入：需要先把 src/cerebrax/app 加入 sys.path
+
+    for fmt in ("pem", "p12", "cer"):
+        tmp_path.joinpath(f"mitmproxy-ca-cert.{fmt}").write_bytes(fmt.encode())
+    monkeypatch.setattr(certificate, "certificate_cache", certificate.CertificateCache(cache_dir=None))
+    with TestClient(app) as client:
+        app.state.config_snapshot = ConfigSnapshot(  # lifespan 加载默认配置之后替换
+            lifespan_config=LifespanConfig(),
+            proxy_config=ProxyConfig(startup_command=["mitmdump", "--set", f"confdir={tmp_path}"]),
+            monitor_config=MonitorConfig(),
+        )
+        response = client.post("/proxy/certificate", json={**body, "source": "confdir"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == media_type
+    assert response.headers["content-disposition"] == f'attachment; filename="{filename}"'
+    assert response.content == filename.rsplit(".", 1)[-1].encode()
@@ -0,0 +1,102 @@
+"""
+配置差异与调度：diff_config 的字段路径、ConfigDispatcher 只调用受影响的子系统且单个失败互不影响
+"""
+import asyncio
+import pathlib
+import sys
+import types
+
+from src.cerebrax._container import ConfigSnapshot
+from src.cerebrax._models import LifespanConfig, MonitorConfig, ProxyConfig, ProxyPoolConfig
+from src.cerebrax.monitor.cfg import ConfigDispatcher
+from src.cerebrax.settings.config import diff_config
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "src" / "cerebrax" / "app"))  # app.py 按脚本目录导入
+
+
+def _snapshot(size=1, strategy="least-connections", command=None, interval=1, life_cycle=0):
+    return ConfigSnapshot(
+        lifespan_config=LifespanConfig(life_cycle=life_cycle),
+        proxy_config=ProxyConfig(
+            pool=ProxyPoolConfig(size=size, strategy=strategy),
+            startup_command=command or ["mitmdump"],
+        ),
+        monitor_config=MonitorConfig(interval=interval),
+    )
+
+
+def test_diff_config_reports_leaf_paths():
+    diff = diff_config(_snapshot(), _snapshot(size=3))
+    assert diff.changes == {"Proxy.pool.size": (1, 3)}
+    assert diff.sections == {"Proxy"}
+    assert diff.changed("Proxy.pool") and diff.changed("Proxy")  # 上级字段
+    assert not diff.changed("Proxy.startup_command", "Proxy.pool.strategy", "Monitor")
+    assert not diff_config(_snapshot(), _snapshot()).changes
+    assert diff_config(None, _snapshot()).sections >= {"Lifespan", "Proxy", "Monitor"}  # 没有旧快照时全部视为变化
+
+
+def test_dispatcher_only_runs_affected_handlers():
+    calls = []
+
+    def handler(name):
+        async def reconfigure(diff, snapshot):
+            calls.append(name)
+        return reconfigure
+
+    async def main():
+        dispatcher = ConfigDispatcher(snapshot=_snapshot())
+        dispatcher.register("proxy", ("Proxy.startup_command",), handler("proxy"))
+        dispatcher.register("proxy_pool", ("Proxy.startup_command", "Proxy.pool"), handler("proxy_pool"))
+        dispatcher.register("monitor", ("Monitor",), handler("monitor"))
+        await dispatcher.dispatch(_snapshot(size=2))
+        assert calls == ["proxy_pool"] and dispatcher.last == {"proxy_pool": None}
+        calls.clear()
+        await dispatcher.dispatch(_snapshot(size=2, command=["mitmweb"]))
+        assert sorted(calls) == ["proxy", "proxy_pool"]
+        calls.clear()
+        await dispatcher.dispatch(_snapshot(size=2, command=["mitmweb"], interval=5))
+        assert calls == ["monitor"]
+        calls.clear()
+        snapshot = _snapshot(size=2, command=["mitmweb"], interval=5)
+        diff = await dispatcher.dispatch(snapshot)  # 内容相同的新快照不调用任何子系统
+        assert not diff.changes and calls == []
+        assert dispatcher.snapshot is snapshot
+    asyncio.run(main())
+
+
+def test_dispatcher_isolates_handler_errors():
+    calls = []
+
+    async def broken(diff, snapshot):
+        raise RuntimeError("proxy failed to restart")
+
+    async def monitor(diff, snapshot):
+        await asyncio.sleep(0)
+        calls.append(snapshot.monitor_config.interval)
+
+    async def main():
+        dispatcher = ConfigDispatcher(snapshot=_snapshot())
+        dispatcher.register("proxy", ("Proxy",), broken)
+        dispatcher.register("monitor", ("Monitor",), monitor)
+        await dispatcher.dispatch(_snapshot(command=["mitmweb"], interval=2))
+        assert calls == [2]
+        assert dispatcher.last == {"proxy": "proxy failed to restart", "monitor": None}
+        await dispatcher.dispatch(_snapshot(command=["mitmweb"], interval=3))
+        assert dispatcher.last == {"monitor": None}  # 只记录最近一次调度的子系统
+    asyncio.run(main())
+
+
+def test_build_dispatcher_routes_by_config_section():
+    import reconfigure  # 延迟导入：需要先把 src/cerebrax/app 加入 sys.path
+
+    app = types.SimpleNamespace(state=types.SimpleNamespace())  # 没有运行中的代理与代理池
+
+    async def main():
+        dispatcher = reconfigure.build_dispatcher(app, snapshot=_snapshot())
+        await dispatcher.dispatch(_snapshot(size=2))
+        assert dispatcher.last == {"proxy_pool": None}
+        await dispatcher.dispatch(_snapshot(size=2, strategy="hash-by-client"))
+        assert dispatcher.last == {"proxy_pool": None}
+        await dispatcher.dispatch(_snapshot(size=2, strategy="hash-by-client", command=["mitmweb"]))
+        assert dispatcher.last == {"proxy": None, "proxy_pool": None}
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+配置热重载：文件事件的去抖合并、内容哈希跳过未变化的保存、解析失败保留旧快照
+"""
+import asyncio
+import pathlib
+import shutil
+
+from src.cerebrax.monitor.cfg import ConfigFileEventHandler, ConfigFileEventMonitor, ConfigReloader
+from src.cerebrax.settings.config import Config
+
+SETTINGS = pathlib.Path(__file__).resolve().parents[1] / "src" / "cerebrax" / "settings" / "settings.toml"
+
+
+def _settings(tmp_path) -> pathlib.Path:
+    path = tmp_path / "settings.toml"
+    shutil.copy(SETTINGS, path)
+    return path
+
+
+def _replace(path: pathlib.Path, old: str, new: str) -> None:
+    text = path.read_text()
+    assert old in text
+    path.write_text(text.replace(old, new, 1))
+
+
+def test_events_within_window_are_coalesced():
+    async def main():
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(maxsize=1)
+        handler = ConfigFileEventHandler("/etc/app/settings.toml", loop, queue, debounce=0.05)
+        for _ in range(5):
+            handler._signal("/etc/app/settings.toml")
+            await asyncio.sleep(0.01)  # 间隔小于 debounce，窗口不断顺延
+        handler._signal("/etc/app/other.toml")  # 不是监控的文件
+        await asyncio.sleep(0.03)
+        assert handler.batches == 0  # 最后一个事件之后还没有静默够 debounce
+        await asyncio.sleep(0.1)
+        assert (handler.events, handler.batches) == (5, 1)
+        assert queue.qsize() == 1 and await handler.get_new_item() == "/etc/app/settings.toml"
+        handler._signal("/etc/app/settings.toml")
+        await asyncio.sleep(0.1)
+        assert (handler.events, handler.batches) == (6, 2)  # 静默之后的新事件单独交付
+        handler.cancel()
+    asyncio.run(main())
+
+
+def test_reload_skips_unchanged_content_and_bumps_version(tmp_path):
+    path = _settings(tmp_path)
+    reloader = ConfigReloader(config=Config(str(path)), path=str(path))
+    initial = reloader.prime()
+
+    async def main():
+        path.write_text(path.read_text())  # 保存但内容不变
+        assert await reloader.reload() is None
+        assert reloader.skipped == 1 and reloader.version == 0
+        assert reloader.snapshot is initial
+        _replace(path, "interval = 1", "interval = 3")
+        snapshot = await reloader.reload()
+        assert snapshot is not None and snapshot is reloader.snapshot
+        assert snapshot.monitor_config.interval == 3
+        assert reloader.version == 1 and reloader.error is None
+        assert await reloader.reload() is None  # 同一内容只重新解析一次
+        assert reloader.skipped == 2
+    asyncio.run(main())
+
+
+def test_reload_keeps_previous_snapshot_on_parse_error(tmp_path):
+    path = _settings(tmp_path)
+    reloader = ConfigReloader(config=Config(str(path)), path=str(path))
+    initial = reloader.prime()
+    text = path.read_text()
+
+    async def main():
+        path.write_text(text + "\n[Monitor\n")  # 保存到一半的文件
+        assert await reloader.reload() is None
+        assert reloader.error
+        assert reloader.snapshot is initial and reloader.version == 0
+        path.write_text(text.replace("interval = 1", "interval = 2", 1))
+        snapshot = await reloader.reload()
+        assert snapshot.monitor_config.interval == 2
+        assert reloader.error is None and reloader.version == 1
+    asyncio.run(main())
+
+
+def test_monitor_delivers_one_snapshot_per_burst_of_saves(tmp_path):
+    path = _settings(tmp_path)
+    delivered = []
+
+    async def reload(event_flow, shared_instance=None):
+        async for snapshot in event_flow:
+            delivered.append(snapshot)
+
+    async def main():
+        monitor = ConfigFileEventMonitor(
+            path=str(tmp_path), name="settings.toml", reload=reload,
+            shared_instances=None, config=Config(str(path)), debounce=0.2,
+        )
+        monitor.start()
+        try:
+            await asyncio.sleep(0.1)  # 等待 observer 开始监听
+            for interval in (2, 3, 4):  # 一次保存在文件系统上产生多个事件
+                _replace(path, "interval = %d" % (interval - 1), "interval = %d" % interval)
+                await asyncio.sleep(0.02)
+            for _ in range(50):
+                if delivered:
+                    break
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(0.3)
+        finally:
+            await monitor.stop()
+        assert [s.monitor_config.interval for s in delivered] == [4]
+        assert monitor.handler.events >= 3 and monitor.handler.batches == 1
+        assert monitor.reloader.version == 1
+    asyncio.run(main())
@@ -0,0 +1,51 @@
+"""
+DiskUsageProber：常驻线程复用、卡住的挂载点被隔离且只占用一个补充线程
+"""
+import collections
+import threading
+import time
+
+from src.cerebrax.utils import collector
+from src.cerebrax.utils.collector import DiskUsageProber
+
+Usage = collections.namedtuple("Usage", "total used free percent")
+
+
+def _fake_disk_usage(hung: threading.Event):
+    def disk_usage(path):
+        if path.startswith("/hung"):
+            hung.wait()
+        return Usage(100, 40, 60, 40.0)
+    return disk_usage
+
+
+def test_threads_are_reused(monkeypatch):
+    monkeypatch.setattr(collector.psutil, "disk_usage", _fake_disk_usage(threading.Event()))
+    prober = DiskUsageProber(timeout=1, workers=2)
+    for _ in range(20):
+        assert set(prober.usages(["/", "/a", "/b"])) == {"/", "/a", "/b"}
+    assert prober.threads == 2
+
+
+def test_hung_mount_is_quarantined_and_released(monkeypatch):
+    hung = threading.Event()
+    monkeypatch.setattr(collector.psutil, "disk_usage", _fake_disk_usage(hung))
+    prober = DiskUsageProber(timeout=0.2, quarantine=0.05, workers=2)
+    try:
+        usages = prober.usages(["/hung", "/", "/a"])
+        assert set(usages) == {"/", "/a"}
+        assert "/hung" in prober.quarantined()
+        time.sleep(0.1)  # 隔离期满但探测仍未返回：继续隔离，不重复发起
+        for _ in range(5):
+            assert set(prober.usages(["/hung", "/", "/a"])) == {"/", "/a"}
+        assert prober.threads == 3  # 两个常驻线程 + 下一轮补充的一个线程
+    finally:
+        hung.set()
+    deadline = time.monotonic() + 2
+    while prober.threads > 2 and time.monotonic() < deadline:
+        prober.usages(["/"])  # 卡住的探测返回后，多出来的线程取到下一个任务后退出
+        time.sleep(0.01)
+    assert prober.threads == 2
+    time.sleep(0.7)  # 第二次隔离为 0.1s
+    assert set(prober.usages(["/hung", "/"])) == {"/hung", "/"}
+    assert prober.quarantined() == {}
@@ -0,0 +1,75 @@
+"""
+HistoryLog：写入后重新打开读取、汇总层的均值、保留期清理与原始层的分辨率标注
+"""
+import time
+import typing
+
+from src.cerebrax.monitor.history import HistoryLog
+
+
+class Sample(typing.NamedTuple):
+    used: float
+    free: float
+
+
+T0 = time.time() // 3600 * 3600 - 7200  # 两小时前的整点：桶边界对齐，且在原始层的保留期内
+
+
+def _log(directory, **kwargs):
+    return HistoryLog(directory=str(directory), **kwargs)
+
+
+def test_write_and_reopen(tmp_path):
+    log = _log(tmp_path)
+    for i in range(10):
+        log.append("memory", Sample(used=i, free=100 - i), timestamp=T0 + i)
+    log.close()
+    reopened = _log(tmp_path)
+    result = reopened.query("memory", start=T0 + 2, end=T0 + 5, columns=["memory_used"])
+    assert result["resolution"] == 1
+    assert result["timestamp"].tolist() == [T0 + 2, T0 + 3, T0 + 4, T0 + 5]
+    assert list(result["values"]) == ["memory_used"]
+    assert result["values"]["memory_used"].tolist() == [2, 3, 4, 5]
+
+
+def test_rollup_writes_bucket_means(tmp_path):
+    log = _log(tmp_path)
+    for i in range(180):  # 三个完整的分钟桶
+        log.append("memory", Sample(used=i, free=0), timestamp=T0 + i)
+    log.close()  # 写出最后一个未完成的桶
+    result = _log(tmp_path).query("memory", resolution=60)
+    assert result["resolution"] == 60
+    assert result["timestamp"].tolist() == [T0, T0 + 60, T0 + 120]
+    assert result["values"]["memory_used"].tolist() == [29.5, 89.5, 149.5]
+    hourly = _log(tmp_path).query("memory", resolution=3600)
+    assert hourly["values"]["memory_used"].tolist() == [89.5]
+
+
+def test_retention_is_applied_on_query(tmp_path):
+    now = time.time()
+    log = _log(tmp_path, segment_seconds={1: 10}, retention={1: 20})
+    for i in range(50):
+        log.append("memory", Sample(used=i, free=0), timestamp=now - 50 + i)
+    log.close()
+    before = sorted((tmp_path / "memory" / "1").glob("*.seg"))
+    reopened = _log(tmp_path, segment_seconds={1: 10}, retention={1: 20})
+    result = reopened.query("memory", resolution=1)  # 不再写入，查询时同样清理
+    after = sorted((tmp_path / "memory" / "1").glob("*.seg"))
+    assert len(after) < len(before)
+    assert result["timestamp"].min() >= now - 40  # 段的结束时间早于 now - 20 的已经删除
+    reopened.compact(now=now + 10_000)
+    assert not list((tmp_path / "memory" / "1").glob("*.seg"))
+    assert list((tmp_path / "memory" / "60").glob("*.seg"))  # 汇总层的保留期更长
+
+
+def test_raw_resolution_uses_sampling_interval(tmp_path):
+    log = _log(tmp_path)
+    log.intervals["memory"] = 5
+    for i in range(4):
+        log.append("memory", Sample(used=i, free=0), timestamp=T0 + 5 * i)
+    log.close()
+    assert log.query("memory", resolution=5)["resolution"] == 5
+    reopened = _log(tmp_path)  # 没有设置 intervals 时以段头部记录的间隔为准
+    result = reopened.query("memory", resolution=1)
+    assert result["resolution"] == 5
+    assert result["values"]["memory_used"].tolist() == [0, 1, 2, 3]
@@ -0,0 +1,38 @@
+"""
+render_snapshot：瞬时值导出为 gauge，psutil 的累计值导出为带 _total 后缀的 counter
+"""
+import typing
+
+from src.cerebrax.monitor.metrics import render_snapshot, flatten_snapshot
+
+
+class IO(typing.NamedTuple):
+    bytes_sent: int
+    bytes_recv: int
+
+
+class Swap(typing.NamedTuple):
+    percent: float
+    sin: int
+
+
+class Snapshot(typing.NamedTuple):
+    net_io_counters: IO
+    swap_memory: Swap
+
+
+def test_counters_get_total_suffix():
+    text = render_snapshot("x", Snapshot(IO(10, 20), Swap(1.5, 7)))
+    assert "# TYPE cerebrax_x_net_io_counters_bytes_sent_total counter\ncerebrax_x_net_io_counters_bytes_sent_total 10.0\n" in text
+    assert "# TYPE cerebrax_x_swap_memory_sin_total counter\n" in text
+    assert "# TYPE cerebrax_x_swap_memory_percent gauge\ncerebrax_x_swap_memory_percent 1.5\n" in text
+    assert "# TYPE cerebrax_x_net_io_counters_bytes_sent gauge" not in text
+
+
+def test_column_names_are_unchanged():
+    assert dict(flatten_snapshot("x", Snapshot(IO(10, 20), Swap(1.5, 7)))) == {
+        "x_net_io_counters_bytes_sent": 10.0,
+        "x_net_io_counters_bytes_recv": 20.0,
+        "x_swap_memory_percent": 1.5,
+        "x_swap_memory_sin": 7.0,
+    }
@@ -0,0 +1,40 @@
+"""
+ProcessTracker：单个 pid 无权限或成为僵尸进程时跳过并记录，其他 pid 照常采样
+"""
+import os
+import subprocess
+import sys
+
+import psutil
+
+from src.cerebrax.utils.collector import ProcessTracker
+
+
+def test_inaccessible_pids_are_recorded_and_skipped(monkeypatch):
+    children = [subprocess.Popen([sys.executable, "-c", "import time; time.sleep(30)"]) for _ in range(3)]
+    denied, zombie, gone = (c.pid for c in children)
+    sample = ProcessTracker._sample
+
+    def fake_sample(handle):
+        if handle.pid == denied:
+            raise psutil.AccessDenied(handle.pid)
+        if handle.pid == zombie:
+            raise psutil.ZombieProcess(handle.pid)
+        if handle.pid == gone:
+            raise psutil.NoSuchProcess(handle.pid)
+        return sample(handle)
+
+    monkeypatch.setattr(ProcessTracker, "_sample", staticmethod(fake_sample))
+    tracker = ProcessTracker()
+    tracker.track("self", os.getpid())
+    for child in children:
+        tracker.track(str(child.pid), child.pid)
+    try:
+        snapshot = tracker.snapshot()
+    finally:
+        for child in children:
+            child.kill()
+            child.wait()
+    assert set(snapshot.processes) == {"self"}
+    assert snapshot.processes["self"].rss > 0
+    assert snapshot.inaccessible == {denied: "AccessDenied", zombie: "ZombieProcess"}  # 已退出的进程不算
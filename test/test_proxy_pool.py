@@ -0,0 +1,131 @@
+"""
+ProxyPool：实例选择策略、扩缩容、实例启动命令，以及通过 POST /proxy/pool 创建代理池
+"""
+import asyncio
+import pathlib
+import socket
+import sys
+
+from fastapi.testclient import TestClient
+
+from src.cerebrax._container import ConfigSnapshot
+from src.cerebrax._models import LifespanConfig, MonitorConfig, ProxyConfig, ProxyPoolConfig
+from src.cerebrax.proxy.handler import ProxyHandler, bind_address
+from src.cerebrax.proxy.pool import ProxyPool, MemberHost
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "src" / "cerebrax" / "app"))  # app.py 按脚本目录导入
+
+
+class FakeMember(object):
+    def __init__(self, command, running=True):
+        self.command = command
+        self.running = running
+        self.state = "running" if running else "starting"
+        self.pid = None
+
+    async def start(self):
+        return None
+
+    async def stop(self, timeout=None):
+        self.running = False
+        self.state = "exited"
+        return None
+
+
+def _pool(strategy="least-connections", command=None):
+    created = []
+
+    def factory(cmd):
+        created.append(FakeMember(cmd))
+        return created[-1]
+    pool = ProxyPool(command or ["mitmdump", "--listen-host", "0.0.0.0", "-p", "0"], factory=factory, strategy=strategy)
+    return pool, created
+
+
+def _option(command, option):
+    return command[command.index(option) + 1]
+
+
+def test_choose_least_connections():
+    pool, _ = _pool()
+    pool.members = {9001: FakeMember([]), 9002: FakeMember([]), 9003: FakeMember([], running=False)}
+    pool.connections = {9001: 2, 9002: 1, 9003: 0}
+    assert pool.choose(("10.0.0.1", 50000)) == 9002  # 9003 尚未就绪
+    pool.connections[9002] = 5
+    assert pool.choose(("10.0.0.1", 50000)) == 9001
+    pool.members = {}
+    assert pool.choose(("10.0.0.1", 50000)) is None
+
+
+def test_choose_hash_by_client_is_sticky():
+    pool, _ = _pool(strategy="hash-by-client")
+    pool.members = {port: FakeMember([]) for port in (9001, 9002, 9003)}
+    clients = [(f"10.0.0.{i}", 40000 + i) for i in range(32)]
+    first = [pool.choose(client) for client in clients]
+    assert first == [pool.choose((host, 1)) for host, _ in clients]  # 只按客户端地址，与源端口无关
+    assert len(set(first)) > 1
+
+
+def test_scale_up_and_down():
+    async def main():
+        pool, created = _pool()
+        await pool.scale(3)
+        assert pool.size == 3 and pool._server is not None
+        assert len(set(pool.members)) == 3 and pool.port not in pool.members
+        for member in created:
+            assert _option(member.command, "--listen-host") == MemberHost
+            assert int(_option(member.command, "-p")) in pool.members
+        await pool.scale(1)
+        assert pool.size == 1
+        assert sum(not m.running for m in created) == 2
+        assert set(pool.connections) == set(pool.members)
+        await pool.scale(0)
+        assert pool.size == 0 and pool._server is None
+        assert all(not m.running for m in created)
+    asyncio.run(main())
+
+
+def test_front_binds_configured_host_and_mitmweb_gets_web_ports():
+    async def main():
+        pool, created = _pool(command=["mitmweb", "--listen-host", "0.0.0.0", "-p", "0", "--web-port", "8081"])
+        assert pool.host == "0.0.0.0"
+        await pool.scale(2)
+        web_ports = [int(_option(m.command, "--web-port")) for m in created]
+        assert 8081 not in web_ports
+        assert len(set(web_ports) | set(pool.members)) == 4  # 代理端口与 Web 界面端口互不重叠
+        assert all(m.command.count("--web-port") == 1 for m in created)
+        await pool.stop()
+    asyncio.run(main())
+
+
+def test_post_pool_through_api(fake_command, free_port):
+    from app import app  # 延迟导入：需要先把 src/cerebrax/app 加入 sys.path
+
+    command = fake_command(listen_after=0, port=free_port)
+    proxy_config = ProxyConfig.model_construct(  # 假启动命令不是 mitmproxy 的模式名，跳过校验
+        **{**ProxyConfig().__dict__, "startup_command": command, "pool": ProxyPoolConfig(size=2)},
+    )
+    with TestClient(app) as client:
+        app.state.config_snapshot = ConfigSnapshot(  # lifespan 加载默认配置之后替换
+            lifespan_config=LifespanConfig(),
+            proxy_config=proxy_config,
+            monitor_config=MonitorConfig(),
+        )
+        response = client.post("/proxy/pool", json={"size": 2})
+        assert response.status_code == 200
+        stats = response.json()
+        assert stats["size"] == 2
+        assert stats["address"] == "127.0.0.1:%d" % free_port
+        assert all(member["port"] != free_port for member in stats["members"])
+        proxy_pool = app.state.shared_instances.proxy_pool
+        assert isinstance(proxy_pool, ProxyPool)
+        members = list(proxy_pool.members.values())
+        assert all(isinstance(m, ProxyHandler) for m in members)
+        assert client.post("/proxy/start").status_code == 409  # 前端占用了监听端口
+        with socket.create_connection(bind_address(command)):  # 前端已经在监听
+            pass
+        response = client.post("/proxy/pool", json={"size": 0})
+        assert response.status_code == 200
+        assert app.state.shared_instances.proxy_pool is None
+        assert proxy_pool.size == 0
+        assert all(m.state == "exited" for m in members)
@@ -0,0 +1,61 @@
+"""
+ProxyHandler.stop：SIGTERM 优雅退出与超时后升级为 SIGKILL
+"""
+import asyncio
+import signal
+
+from src.cerebrax.proxy.handler import ProxyHandler, stop_all
+
+from conftest import unused_port
+
+
+def test_stop_with_sigterm_is_fast(fake_command):
+    async def main():
+        handler = ProxyHandler(fake_command(listen_after=0), ready_timeout=5, stop_timeout=5)
+        await handler.start()
+        assert await handler.wait_ready(timeout=5) is True
+        await handler.stop()
+        assert handler.returncode == -signal.SIGTERM
+        assert handler.stop_latency < 0.5
+        assert handler.state == "exited"
+    asyncio.run(main())
+
+
+def test_stop_escalates_to_sigkill(fake_command):
+    async def main():
+        handler = ProxyHandler(fake_command(listen_after=0, ignore_sigterm=True), ready_timeout=5, stop_timeout=0.3)
+        await handler.start()
+        assert await handler.wait_ready(timeout=5) is True
+        await handler.stop()
+        assert handler.returncode == -signal.SIGKILL
+        assert 0.3 <= handler.stop_latency < 2
+        assert handler.state == "exited"
+    asyncio.run(main())
+
+
+def test_stop_timeout_argument_overrides_config(fake_command):
+    async def main():
+        handler = ProxyHandler(fake_command(listen_after=0, ignore_sigterm=True), ready_timeout=5, stop_timeout=30)
+        await handler.start()
+        assert await handler.wait_ready(timeout=5) is True
+        await handler.stop(timeout=0.1)
+        assert handler.returncode == -signal.SIGKILL
+        assert handler.stop_latency < 2
+    asyncio.run(main())
+
+
+def test_stop_all_runs_concurrently(fake_command):
+    async def main():
+        handlers = [
+            ProxyHandler(fake_command(listen_after=0, ignore_sigterm=True, port=unused_port()), ready_timeout=5, stop_timeout=0.3)
+            for _ in range(3)
+        ]
+        for handler in handlers:
+            await handler.start()
+        assert all(await asyncio.gather(*(h.wait_ready(timeout=5) for h in handlers)))  # SIGTERM 已被忽略
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await stop_all(handlers)
+        assert loop.time() - start < 0.3 * len(handlers)  # 并发等待，不是逐个等待超时
+        assert all(h.returncode == -signal.SIGKILL for h in handlers)
+    asyncio.run(main())
@@ -0,0 +1,86 @@
+"""
+就绪探测与 ProxySupervisor 的自动重启
+"""
+import asyncio
+
+from src.cerebrax._models import RestartPolicy
+from src.cerebrax.proxy.handler import ProxyHandler
+from src.cerebrax.proxy.supervisor import ProxySupervisor
+
+
+async def _wait_for(predicate, timeout=10.0, interval=0.01):
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not predicate():
+        assert loop.time() < deadline, "condition not reached in time"
+        await asyncio.sleep(interval)
+
+
+def test_ready_after_port_accepts_connections(fake_command):
+    async def main():
+        handler = ProxyHandler(fake_command(listen_after=0.2), ready_timeout=5, stop_timeout=1)
+        await handler.start()
+        assert handler.state == "starting"
+        assert await handler.wait_ready(timeout=5) is True
+        assert handler.state == "running"
+        assert handler.ready_latency >= 0.2
+        await handler.stop()
+        assert handler.state == "exited"
+    asyncio.run(main())
+
+
+def test_probe_timeout_terminates_child(fake_command):
+    async def main():
+        handler = ProxyHandler(fake_command(listen_after=None), ready_timeout=0.3, stop_timeout=1)
+        await handler.start()
+        assert await handler.wait_ready(timeout=5) is False
+        assert handler.state == "exited"
+        assert handler.returncode is not None
+    asyncio.run(main())
+
+
+def test_ready_is_false_when_child_exits_early(fake_command):
+    async def main():
+        handler = ProxyHandler(fake_command(exit_code=3), ready_timeout=5, stop_timeout=1)
+        await handler.start()
+        assert await handler.wait_ready(timeout=5) is False
+        assert await handler.wait_exit() == 3
+        assert handler.state == "exited"
+    asyncio.run(main())
+
+
+def test_supervisor_restarts_after_crash(fake_command, tmp_path):
+    async def main():
+        supervisor = ProxySupervisor(
+            fake_command(listen_after=0.05, crash_once=str(tmp_path / "crashed")),
+            restart_policy=RestartPolicy(enabled=True, backoff_initial=0.05),
+            ready_timeout=5,
+            stop_timeout=1,
+        )
+        await supervisor.start()
+        await _wait_for(lambda: supervisor.running)
+        assert supervisor.restarts == 1
+        assert supervisor.last_returncode == 1
+        assert supervisor.gave_up is False
+        await supervisor.stop()
+        assert supervisor.state == "exited"
+        assert supervisor.restarts == 1  # 主动停止不会触发重启
+    asyncio.run(main())
+
+
+def test_supervisor_backs_off_and_gives_up(fake_command):
+    async def main():
+        policy = RestartPolicy(enabled=True, max_restarts=3, backoff_initial=0.05, backoff_factor=2.0)
+        supervisor = ProxySupervisor(fake_command(exit_code=1), restart_policy=policy, stop_timeout=1)
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        await supervisor.start()
+        await _wait_for(lambda: supervisor.gave_up)
+        elapsed = loop.time() - start
+        assert supervisor.restarts == 3
+        assert supervisor.failures == 4
+        assert supervisor.stats()["gave_up"] is True
+        assert elapsed >= 0.05 + 0.1 + 0.2  # 三次重启前的退避时间之和
+        assert not supervisor.supervising
+        await supervisor.stop()
+    asyncio.run(main())
@@ -0,0 +1,28 @@
+"""
+速率状态由每个 ResourceChangesMonitor 持有，pernic/perdisk 从配置传入采集函数
+"""
+from src.cerebrax._models import MonitorConfig
+from src.cerebrax.monitor.resmon import ResourceChangesMonitor
+
+
+async def _discard(async_generators):
+    return None
+
+
+def test_each_monitor_owns_its_rate_trackers():
+    first = ResourceChangesMonitor(call=_discard, aspect=["network", "disk"], pernic=True, perdisk=True)
+    second = ResourceChangesMonitor(call=_discard, aspect=["network", "disk"])
+    assert first.rates is not second.rates
+    assert first.methods["network"]().net_io_rates is None  # 第一次采样只建立基准
+    snapshot = first.methods["network"]()
+    assert snapshot.net_io_rates is not None
+    assert isinstance(snapshot.pernic_io_rates, dict)
+    assert second.methods["network"]().net_io_rates is None  # 不受 first 的采样影响
+    assert second.methods["network"]().pernic_io_rates is None
+    first.methods["disk"]()
+    assert isinstance(first.methods["disk"]().perdisk_io_rates, dict)
+
+
+def test_config_flags_default_off():
+    config = MonitorConfig(pernic=True)
+    assert config.pernic is True and config.perdisk is False
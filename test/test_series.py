@@ -0,0 +1,64 @@
+"""
+RingBuffer：写满后回绕、新增列、时间窗口与统计；/monitor/history 的百分位校验
+"""
+import math
+import pathlib
+import sys
+import typing
+
+from fastapi.testclient import TestClient
+
+from src.cerebrax.monitor.series import RingBuffer, TimeSeriesStore
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1] / "src" / "cerebrax" / "app"))  # app.py 按脚本目录导入
+
+
+def test_wraparound_keeps_latest_rows_in_order():
+    buffer = RingBuffer(columns=["a"], capacity=4)
+    for i in range(10):
+        buffer.append(float(i), {"a": i * 10})
+    timestamps, values = buffer.window()
+    assert len(buffer) == 4
+    assert timestamps.tolist() == [6, 7, 8, 9]
+    assert values[:, 0].tolist() == [60, 70, 80, 90]
+
+
+def test_extend_pads_existing_rows_with_nan():
+    buffer = RingBuffer(columns=["a"], capacity=4)
+    buffer.append(1.0, {"a": 1})
+    buffer.append(2.0, {"a": 2, "b": 20})  # 新列自动扩展
+    buffer.append(3.0, {"b": 30})  # 缺失的列记为 NaN
+    assert buffer.columns == ["a", "b"]
+    _, values = buffer.window()
+    assert math.isnan(values[0, 1]) and values[1].tolist() == [2, 20]
+    assert math.isnan(values[2, 0]) and values[2, 1] == 30
+
+
+def test_window_and_stats():
+    buffer = RingBuffer(columns=["a"], capacity=8)
+    for i in range(12):  # 回绕之后按时间窗口截取
+        buffer.append(100.0 + i, {"a": i})
+    timestamps, values = buffer.window(seconds=3, now=111.0)
+    assert timestamps.tolist() == [108, 109, 110, 111]
+    stats = buffer.stats(seconds=3, now=111.0, percentiles=[50])
+    assert stats["samples"] == 4
+    assert stats["columns"]["a"] == {"min": 8, "max": 11, "mean": 9.5, "last": 11, "p50": 9.5}
+    assert buffer.window(seconds=1, now=500.0)[0].tolist() == []
+
+
+class Memory(typing.NamedTuple):
+    used: float
+
+
+def test_history_rejects_out_of_range_percentiles(monkeypatch):
+    from app import app  # 延迟导入：需要先把 src/cerebrax/app 加入 sys.path
+
+    series = TimeSeriesStore()
+    series.record("memory", Memory(used=1.0), timestamp=1.0)
+    monkeypatch.setattr(app.state, "series", series)
+    client = TestClient(app)
+    assert client.get("/monitor/history/memory", params={"percentiles": [150]}).status_code == 422
+    assert client.get("/monitor/history/memory", params={"percentiles": [-1]}).status_code == 422
+    response = client.get("/monitor/history/memory", params={"percentiles": [0, 100]})
+    assert response.status_code == 200
+    assert set(response.json()["columns"]["memory_used"]) >= {"p0", "p100"}
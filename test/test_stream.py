@@ -0,0 +1,54 @@
+"""
+SnapshotStream：订阅者缓冲满时丢弃最旧的帧、按 aspect 过滤与降采样、帧只编码一次
+"""
+import asyncio
+import json
+import typing
+
+from src.cerebrax.monitor.stream import SnapshotStream, Subscriber, Frame, encode_frame
+
+
+class Memory(typing.NamedTuple):
+    used: float
+
+
+def _frames(aspect, count):
+    return [Frame(aspect, str(i), b"") for i in range(count)]
+
+
+def test_full_buffer_drops_oldest():
+    async def main():
+        subscriber = Subscriber(maxsize=3)
+        for frame in _frames("memory", 5):
+            subscriber.offer(frame)  # 从不等待
+        assert subscriber.dropped == 2
+        assert [subscriber.queue.get_nowait().text for _ in range(3)] == ["2", "3", "4"]
+    asyncio.run(main())
+
+
+def test_filter_and_downsample():
+    async def main():
+        subscriber = Subscriber(aspects=["cpu"], every=2, maxsize=10)
+        for frame in _frames("memory", 3) + _frames("cpu", 5):
+            subscriber.offer(frame)
+        assert [subscriber.queue.get_nowait().text for _ in range(subscriber.queue.qsize())] == ["0", "2", "4"]
+    asyncio.run(main())
+
+
+def test_slow_subscriber_does_not_affect_others():
+    async def main():
+        stream = SnapshotStream()
+        slow = stream.subscribe(maxsize=1)
+        fast = stream.subscribe(maxsize=10)
+        frame = encode_frame("memory", Memory(used=1.0), timestamp=5.0, encoder=stream.encoder)
+        stream.publish([frame] * 4)
+        assert slow.dropped == 3 and slow.queue.qsize() == 1
+        assert fast.dropped == 0 and fast.queue.qsize() == 4
+        assert fast.queue.get_nowait() is frame  # 所有订阅者共享同一份已经编码好的帧
+        assert json.loads(frame.text) == {
+            "aspect": "memory", "version": 1, "columns": ["memory_used"], "timestamp": [5.0], "values": [[1.0]],
+        }
+        assert frame.sse == f"event: memory\ndata: {frame.text}\n\n".encode()
+        stream.unsubscribe(slow)
+        assert stream.subscribers == 1
+    asyncio.run(main())